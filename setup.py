@@ -12,7 +12,7 @@ setup(
     package_dir={'': 'src'},
     packages=find_packages(where='src'),
     include_package_data=True,
-    package_data={'': ['resources/*.csv']},
+    package_data={'': ['resources/*.csv', 'resources/*.json']},
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/AsoSoft/AsoSoft-Library-py",
@@ -27,6 +27,7 @@ setup(
     install_requires=["regex >= 2023.0.0"],
     extras_require={
         "dev": ["pytest>=7.0", "twine>=4.0.2"],
+        "stats": ["numpy>=1.17"],
     },
     python_requires=">=3.8"
 )
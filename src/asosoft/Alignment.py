@@ -0,0 +1,90 @@
+# Source <=> output alignment of the conversions, made in the same pass as the conversion (the *Aligned functions,
+# e.g. NormalizeAligned, KurdishG2PAligned, Ar2LaAligned and Pipeline.run_aligned; the plain functions are not changed).
+# An alignment is an array of offsets: offsets[i] is the position in the source of the i-th output character
+# and offsets[len(output)] = len(source). The alignments of two stages are composed by compose(first, second).
+
+from array import array
+from .Patterns import compile_pattern
+
+def identity(length):
+    return array("i", range(length + 1))
+
+# alignment of stage2(stage1(text)) from the alignments of the stages
+def compose(first, second):
+    return array("i", [first[i] for i in second])
+
+# source span (start, end) of the output span [start, end)
+def SourceSpan(offsets, start, end):
+    if start >= end:
+        return offsets[start], offsets[start]
+    # the end of the last character is the start of the next source character
+    last = offsets[end - 1]
+    for following in offsets[end:]:
+        if following > last:
+            return offsets[start], following
+    return offsets[start], offsets[-1]
+
+# an output span which is produced from [start, end) of the input: its characters are spread over the input span
+def spread(output, start, end, length):
+    width = end - start
+    if length == width:
+        output.extend(range(start, end))
+    elif width <= 0:
+        output.extend([start] * length)
+    else:
+        output.extend(start + k * width // length for k in range(length))
+
+# aligned form of pattern.sub (replacement: a template or a function); offsets is the alignment of text
+def sub_aligned(pattern, replacement, text, offsets):
+    local = array("i")
+    sb = []
+    last = 0
+    for m in pattern.finditer(text):
+        start, end = m.span()
+        sb.append(text[last:start])
+        local.extend(range(last, start))
+        new = replacement(m) if callable(replacement) else m.expand(replacement)
+        sb.append(new)
+        spread(local, start, end, len(new))
+        last = end
+    if not sb:
+        return text, offsets
+    sb.append(text[last:])
+    local.extend(range(last, len(text) + 1))
+    return "".join(sb), compose(offsets, local)
+
+# aligned form of translate_by_list (each rule is applied with engine.sub, same as the fused steps)
+def translate_aligned(text, replace_list, engine, offsets):
+    for i in range(0, len(replace_list), 2):
+        text, offsets = sub_aligned(compile_pattern(replace_list[i], engine), replace_list[i + 1], text, offsets)
+    return text, offsets
+
+# aligned form of a character table (ch => replacement; a function ch => replacement or None)
+def translate_chars_aligned(text, replacement, offsets):
+    sb = []
+    local = array("i")
+    for i, ch in enumerate(text):
+        new = replacement(ch)
+        if new is None:
+            new = ch
+        sb.append(new)
+        spread(local, i, i + 1, len(new))
+    local.append(len(text))
+    return "".join(sb), compose(offsets, local)
+
+def strip_aligned(text, offsets, chars=None, left=True, right=True):
+    start, end = 0, len(text)
+    if left:
+        start = end - len(text.lstrip(chars))
+    if right:
+        end = start + len(text[start:].rstrip(chars))
+    if start == 0 and end == len(text):
+        return text, offsets
+    return text[start:end], offsets[start:end] + offsets[-1:]
+
+# alignment of an output which is not aligned by its stage (the characters are spread over the whole input)
+def spread_aligned(source, output, offsets):
+    local = array("i")
+    spread(local, 0, len(source), len(output))
+    local.append(len(source))
+    return output, compose(offsets, local)
@@ -0,0 +1,67 @@
+# Character translation layer shared by the normalizers, numeral converters and legacy-font converters.
+# A replace list ([pattern1, replacement1, pattern2, replacement2, ...], applied one after another) is
+# compiled once into steps: each run of literal character rules (e.g. "ي|ى" => "ی") becomes one step of
+# str.replace calls and the other rules (multi-character or context rules) remain precompiled regexes.
+# The output is the same as applying the rules one by one with re.sub.
+# (str.replace finds a character much faster than a regex pass or str.translate on Arabic-script text,
+# and it is skipped when the character is not in the text.)
+
+import regex
+from .Patterns import compile_pattern
+
+# pattern characters which are not literals
+regex_special = set(".^$*+?{}[]\\|()")
+
+compiled_lists = {}
+
+# Applies the replace list on the text (same as a loop of re.sub with the engine)
+def translate_by_list(text, replace_list, engine=regex):
+    key = (engine.__name__, tuple(replace_list))
+    steps = compiled_lists.get(key)
+    if steps is None:
+        steps = compiled_lists[key] = compile_replace_list(replace_list, engine)
+    for step in steps:
+        text = step(text)
+    return text
+
+def compile_replace_list(replace_list, engine=regex):
+    steps = []
+    pairs = []
+    for i in range(0, len(replace_list), 2):
+        pattern, replacement = replace_list[i], replace_list[i + 1]
+        chars = literal_chars(pattern)
+        if chars is not None and "\\" not in replacement:
+            pairs.extend((ch, replacement) for ch in chars)
+            continue
+        if pairs:
+            steps.append(replace_step(pairs))
+            pairs = []
+        steps.append(regex_step(compile_pattern(pattern, engine), replacement))
+    if pairs:
+        steps.append(replace_step(pairs))
+    return steps
+
+# Applies a codepage (dict of old => new, applied one after another)
+def translate_by_map(text, mapping):
+    for old, new in mapping.items():
+        if old in text:
+            text = text.replace(old, new)
+    return text
+
+# characters of a pattern like "ي|ى" (None if it is not an alternation of literal characters)
+def literal_chars(pattern):
+    chars = pattern.split("|")
+    if all(len(ch) == 1 and ch not in regex_special for ch in chars):
+        return chars
+    return None
+
+def replace_step(pairs):
+    def step(text):
+        for old, new in pairs:
+            if old in text:
+                text = text.replace(old, new)
+        return text
+    return step
+
+def regex_step(pattern, replacement):
+    return lambda text: pattern.sub(replacement, text)
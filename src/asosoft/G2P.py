@@ -19,45 +19,53 @@
 import re
 import os
 import csv
-from .Normalize import UnifyNumerals
-from .Number2Word import Number2Word
+import regex
+from array import array
+from .Normalize import UnifyNumerals, numeral_replaces
+from .Number2Word import Number2Word, Number2WordTokens, Number2WordAligned
+from .Alignment import identity, compose, spread, sub_aligned, translate_aligned, strip_aligned
+from .CharTranslation import translate_by_list
+from .Patterns import compile_pattern
+from .PhonemeCache import PhonemeCache
+from .Tokenizer import ku, Tokenize, apply_around, apply_to_groups, add_group, token_indices
 from collections import OrderedDict
+from bisect import bisect_left
 
 # Normalizion
+g2p_normalization = [
+    "  +", " " ,
+    "دٚ", "ڎ",
+    "گٚ", "ڴ",
+    r"(^|\s)چ بکە", r"\1چبکە",
+    "َ", "ە",  # فتحه 
+    "ِ", "ی",  # کسره 
+    "ُ", "و",  # ضمه 
+    "ء", "ئ",  # Hamza   
+    "أ", "ئە",
+    "إ", "ئی",
+    "آ", "ئا",
+    "ظ|ذ|ض", "ز",
+    "ص|ث", "س",
+    "ط", "ت",
+    "ك", "ک",
+    "ي|ى", "ی",
+    "ه‌", "ە",
+    "ھ", "ه",
+    "ـ", "",  # tatweel
+    "؟", "?",
+    "،", ",",
+    "؛", ";",
+    r"\r", "",
+]
+
 def G2P_normalize(text):
-    s = [
-        "  +", " " ,
-        "دٚ", "ڎ",
-        "گٚ", "ڴ",
-        r"(^|\s)چ بکە", r"\1چبکە",
-        "َ", "ە",  # فتحه 
-        "ِ", "ی",  # کسره 
-        "ُ", "و",  # ضمه 
-        "ء", "ئ",  # Hamza   
-        "أ", "ئە",
-        "إ", "ئی",
-        "آ", "ئا",
-        "ظ|ذ|ض", "ز",
-        "ص|ث", "س",
-        "ط", "ت",
-        "ك", "ک",
-        "ي|ى", "ی",
-        "ه‌", "ە",
-        "ھ", "ه",
-        "ـ", "",  # tatweel
-        "؟", "?",
-        "،", ",",
-        "؛", ";",
-        r"\r", "",
-    ]
-    for i in range(0, len(s), 2):
-        text = re.sub(s[i], s[i + 1], text)
-    return text
+    return translate_by_list(text, g2p_normalization, re)
 
 history = {}
 path = os.path.dirname(__file__)
 G2P_exceptions = {}
 G2P_certain = {}
+G2P_replaces = []  # compiled G2P_exceptions and G2P_certain
 def load_replaces():
     with open(os.path.join(path, "resources/G2PExceptions.csv"), 'r', encoding="utf-8", newline='\n') as csvfile:
         reader = csv.reader(csvfile)
@@ -70,7 +78,44 @@ def load_replaces():
         next(reader)  # Skip the first row
         for row in reader:
             G2P_certain[row[0]] = row[1]
-
+    G2P_replaces.extend((compile_pattern(key, re), value) for key, value in list(G2P_exceptions.items()) + list(G2P_certain.items()))
+
+
+vowels = set("aeêouûiîüȯė")
+
+# options of the ambiguous units (runs of و up to 5 and of ی up to 2) with their flags:
+# (option, starts with vowel, ends with vowel, starts with ww)
+def unit_options(options):
+    return [(o, o[0] in vowels, o[-1] in vowels, o.startswith("ww")) for o in options]
+
+waw_units = {
+    5: unit_options(["uwuwu", "uwuww", "uwwuw", "uwûw", "wuwwu", "wuwuw", "wuwû", "wûww", "wwuwu", "wwuww", "wwûw", "wûwu", "ûwwu", "ûwuw", "ûwû"]),
+    4: unit_options(["uwwu", "uwuw", "uwû", "wwuw", "wwû", "wuww", "wuwu", "wûw", "ûwu", "ûww"]),
+    3: unit_options(["wuw", "wwu", "wû", "uww", "uwu", "ûw"]),
+    2: unit_options(["wu", "uw", "ww", "û"]),
+    1: unit_options(["u", "w"]),
+}
+ye_units = {2: unit_options(["îy", "yî"]), 1: unit_options(["y", "î"])}
+char_units = {}
+
+# segmentation of the word into units (each a list of options)
+def word_units(gr):
+    units = []
+    i, n = 0, len(gr)
+    while i < n:
+        ch = gr[i]
+        if ch == "و" or ch == "ی":
+            end = i + 1
+            while end < n and end - i < (5 if ch == "و" else 2) and gr[end] == ch:
+                end += 1
+            units.append((waw_units if ch == "و" else ye_units)[end - i])
+            i = end
+        else:
+            if ch not in char_units:
+                char_units[ch] = unit_options([ch])
+            units.append(char_units[ch])
+            i += 1
+    return units
 
 # GEN: generates all possible candidates:
 # e.g.  بوون => bûn, buwn, bwun
@@ -79,57 +124,20 @@ def Generator(gr):
     if len(G2P_exceptions) == 0:
         load_replaces()
 
-    # Converting exceptional words
-    for key, value in G2P_exceptions.items():
-        gr = re.sub(key, value, gr)
-
-    # Converting certain characters
-    for key, value in G2P_certain.items():
-        gr = re.sub(key, value, gr)
-
-    # Uncertainty in "و" and "ی"
-    CandList1 = [""]
-    while len(gr) > 0:
-        temp = []
-        if re.match("^ووووو", gr):
-            temp.extend(["uwuwu", "uwuww", "uwwuw", "uwûw", "wuwwu", "wuwuw", "wuwû", "wûww", "wwuwu", "wwuww", "wwûw", "wûwu", "ûwwu", "ûwuw", "ûwû"])
-            gr = gr[5:]
-        elif re.match("^وووو", gr):
-            temp.extend(["uwwu", "uwuw", "uwû", "wwuw", "wwû", "wuww", "wuwu", "wûw", "ûwu", "ûww"])
-            gr = gr[4:]
-        elif re.match("^ووو", gr):
-            temp.extend(["wuw", "wwu", "wû", "uww", "uwu", "ûw"])
-            gr = gr[3:]
-        elif re.match("^وو", gr):
-            temp.extend(["wu", "uw", "ww", "û"])
-            gr = gr[2:]
-        elif re.match("^و", gr):
-            temp.extend(["u", "w"])
-            gr = gr[1:]
-        elif re.match("^یی", gr):
-            temp.extend(["îy", "yî"])
-            gr = gr[2:]
-        elif re.match("^ی", gr):
-            temp.extend(["y", "î"])
-            gr = gr[1:]
-        else:
-            temp.append(gr[0])
-            gr = gr[1:]
-
-        Count = len(CandList1)
-        TempList = list(CandList1)
-        CandList1.clear()
-
-        for i in range(Count):
-            for j in range(len(temp)):
-                WW = bool(re.match("^ww", temp[j]))
-                IsPreviousVowel = bool(re.search("[aeêouûiîüȯė]$", TempList[i]))
-                IsNowVowel = bool(re.match("^[aeêouûiîüȯė]", temp[j]))
-                ConsonantBeforeWW = not IsPreviousVowel and WW
-                hiatus = IsPreviousVowel and IsNowVowel
-
-                if not hiatus and not ConsonantBeforeWW:
-                    CandList1.append(TempList[i] + temp[j])
+    # Converting exceptional words and certain characters
+    for pattern, value in G2P_replaces:
+        gr = pattern.sub(value, gr)
+
+    # Uncertainty in "و" and "ی": the word is segmented into units with their options (e.g. وو => wu, uw, ww, û)
+    # and each candidate keeps whether it ends with a vowel
+    CandList1 = [("", False)]
+    for options in word_units(gr):
+        CandList1 = [(cand + option, endsVowel)
+                     for cand, previousVowel in CandList1
+                     for option, startsVowel, endsVowel, WW in options
+                     # no hiatus and no consonant before ww
+                     if not (startsVowel if previousVowel else WW)]
+    CandList1 = [cand for cand, endsVowel in CandList1]
 
     # Adding "i" between Consonant Clusters
     Candidates = i_insertion(CandList1)
@@ -142,30 +150,28 @@ def Generator(gr):
     if cCount > 1:
         i = cCount - 1
         while i > -1:
-            if re.search("ˈ[^aeêouûiîüȯė]+(ˈ|$)", OutputCandidates[i]) or re.search("[aeêouûiîüȯė][^aeêouûiîüȯėˈ]{4,}", OutputCandidates[i]):
+            if vowelless_syllable.search(OutputCandidates[i]) or long_coda.search(OutputCandidates[i]):
                 del OutputCandidates[i]
             i -= 1
 
     return OutputCandidates
 
+vowelless_syllable = compile_pattern("ˈ[^aeêouûiîüȯė]+(ˈ|$)", re)
+long_coda = compile_pattern("[aeêouûiîüȯė][^aeêouûiîüȯėˈ]{4,}", re)
+
 # insertion of hidden /i/ vowel
 # e.g. brd => bird, brid, birid
 def i_insertion(Cands):
     Candidates = []
-    for i in range(len(Cands)):
-        ThisCand = []
-        if Cands[i]:
-            ThisCand.append(Cands[i][0])
-            for j in range(1, len(Cands[i])):
-                Count = len(ThisCand)
-                TempList = ThisCand.copy()
-                ThisCand.clear()
-                for k in range(Count):
-                    ThisCand.append(TempList[k] + Cands[i][j])
-                    if re.search(r'[^aeêouûiîüȯė][^aeêouûiîüȯė]', Cands[i][j - 1:j + 1]):
-                        ThisCand.append(TempList[k] + "i" + Cands[i][j])
-        else:
-            ThisCand.append(Cands[i])
+    for cand in Cands:
+        ThisCand = [cand[:1]]
+        consonant = [ch not in vowels for ch in cand]
+        for j in range(1, len(cand)):
+            ch = cand[j]
+            if consonant[j - 1] and consonant[j]:
+                ThisCand = [x for prefix in ThisCand for x in (prefix + ch, prefix + "i" + ch)]
+            else:
+                ThisCand = [prefix + ch for prefix in ThisCand]
         Candidates.extend(ThisCand)
     return Candidates
 
@@ -175,31 +181,59 @@ def syllabification(Candidates):
     cCount = len(Candidates)
     for i in range(cCount):
         # Onset C(C)V
-        Candidates[i] = re.sub(r"([^aeêouûiîȯėwy][wy]|[^aeêouûiîȯė])([aeêouûiîȯė])", r"ˈ\1\2", Candidates[i])
+        Candidates[i] = syllable_onset.sub(mark_syllable, Candidates[i])
         # if no ˈ at beginig  (grˈtin => ˈgrˈtin)
-        Candidates[i] = re.sub(r"^([^ˈ])", r"ˈ\1", Candidates[i])
+        if Candidates[i] and Candidates[i][0] != "ˈ":
+            Candidates[i] = "ˈ" + Candidates[i]
         # add candidate ( 'be'sye => + 'bes'ye)
-        if re.search(r"[aeêouûiîȯė][^aeêouûiîȯė]?ˈ[^aeêouûiîȯėwy][wy]", Candidates[i]):
-            Candidates.append(re.sub(r"([aeêouûiîȯė][^aeêouûiîȯė]?)ˈ([^aeêouûiîȯėwy])([wy])", r"\1\2ˈ\3", Candidates[i]))
+        alternative, count = syllable_glide.subn(move_syllable_mark, Candidates[i])
+        if count:
+            Candidates.append(alternative)
     return Candidates
 
+# (a function replacement is much faster than a template like r"ˈ\1\2")
+syllable_onset = compile_pattern(r"([^aeêouûiîȯėwy][wy]|[^aeêouûiîȯė])([aeêouûiîȯė])", re)
+syllable_glide = compile_pattern(r"([aeêouûiîȯė][^aeêouûiîȯė]?)ˈ([^aeêouûiîȯėwy])([wy])", re)
+mark_syllable = lambda m: "ˈ" + m.group()
+move_syllable_mark = lambda m: m.group(1) + m.group(2) + "ˈ" + m.group(3)
+
 # Sonority Sequencing Principle in EVAL needs phoneme ranking 
 def sonority_index(ch):
-    c = str(ch)
-    if re.search(r"[wy]", c):  # Approximant
-        return 6
-    if re.search(r"[lłrř]", c):  # Lateral
-        return 5
-    if re.search(r"[mn]", c):  # Nasal
-        return 4
-    if re.search(r"[fvszşjxẍƹḧh]", c):  # Fricative
-        return 3
-    if re.search(r"[cç]", c):  # Affricate
-        return 2
-    else:  # Stop
-        return 1
+    return sonority_ranks.get(ch, 1)  # Stop: 1
+
+sonority_ranks = {ch: rank for chars, rank in [
+    ("wy", 6),            # Approximant
+    ("lłrř", 5),          # Lateral
+    ("mn", 4),            # Nasal
+    ("fvszşjxẍƹḧh", 3),   # Fricative
+    ("cç", 2),            # Affricate
+] for ch in chars}
 
      
+# patterns of the penalties in EVAL
+complex_onset = compile_pattern(r"ˈ([^aeêouûiîȯėˈ]{2,}[wy]|[^aeêouûiîȯėˈ]+[^wy])[aeêouûiîȯė]", re)
+complex_coda = compile_pattern(r"[aeêouûiîȯė][^aeêouûiîȯėˈ]{3}", re)
+glide_nucleus_glide = compile_pattern(r"[^aeêouûiîȯėˈ][wy][aeêouûiîȯė][wy][^aeêouûiîȯėˈ]", re)
+coda_clusters = compile_pattern(r"(?<=[aeêouûiîȯė])[^aeêouûiîȯėˈ]{2,}", re)
+stan_suffix = compile_pattern(r"[^aeêouûiîȯėˈ]ˈsiˈtaˈ?n", re)
+it_im_exceptions = compile_pattern(r"(rift|neft|kurt|girt|xirt|germ|term|port)", re)
+it_im_suffix = compile_pattern(r"[aeêouûiîȯė]([^aeêouûiîyȯėˈ]m|[^aeêouûiîysşxwˈ]t)$", re)
+consonant_yî = compile_pattern(r"[^aeêouûiîȯė]ˈyî", re)
+onset_glide = compile_pattern(r"(?<!^)ˈ[^aeêouûiî][wy]", re)
+cluster_ye = compile_pattern(r"[^aeêouûiî]ˈ[^aeêouûiî][y][aeêouûî]", re)
+wîw = compile_pattern(r"[^aeêouûiî]wîˈw", re)
+ix_coda = compile_pattern(r"[^aeêouûiî]ixˈ", re)
+heł_onset = compile_pattern(r"^ˈhe(ł[^aeêouûiîˈ]ˈ|ˈłi)", re)
+w_coda = compile_pattern(r"[aêoûî][w][^aeêouûiîˈ]", re)
+uw_coda = compile_pattern(r"uw(ˈ|$)", re)
+ri_syllable = compile_pattern(r"[aeêouûiî][^aeêouûiîˈ]ˈriˈ", re)
+inserted_i = compile_pattern(r"([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])i([^aeêouûiîˈ])", re)
+double_coda = compile_pattern(r"([^aeêouûiîˈ])([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])", re)
+inserted_i_syllable = compile_pattern(r"([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])iˈ([^aeêouûiîˈ])", re)
+inserted_i_onset = compile_pattern(r"[aeêouûiî]ˈ([^aeêouûiîˈ])i([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])", re)
+i_and_marks = compile_pattern("[iˈ]", re)
+vowels_and_marks = compile_pattern("[aeêouûiîˈ]", re)
+
 # EVAL: specifies a penalty number for each syllabified candidate
 def EVAL(Candidates):
     output = {}
@@ -209,16 +243,16 @@ def EVAL(Candidates):
             P = 0
             # ================= types of penalties ============
             # Complex Onset
-            P += len(re.findall(r"ˈ([^aeêouûiîȯėˈ]{2,}[wy]|[^aeêouûiîȯėˈ]+[^wy])[aeêouûiîȯė]", candidate)) * 20
+            P += len(complex_onset.findall(candidate)) * 20
 
             # Complex Coda
             if candidate != "ˈpoynt":
-                P += len(re.findall(r"[aeêouûiîȯė][^aeêouûiîȯėˈ]{3}", candidate)) * 10
+                P += len(complex_coda.findall(candidate)) * 10
 
-            P += len(re.findall(r"[^aeêouûiîȯėˈ][wy][aeêouûiîȯė][wy][^aeêouûiîȯėˈ]", candidate)) * 20
+            P += len(glide_nucleus_glide.findall(candidate)) * 20
 
             # SSP: ascending Sonority in coda
-            codas = re.findall(r"(?<=[aeêouûiîȯė])[^aeêouûiîȯėˈ]{2,}", candidate)
+            codas = coda_clusters.findall(candidate)
             for coda in codas:
                 chars = coda
                 for j in range(len(chars) - 1):
@@ -231,12 +265,12 @@ def EVAL(Candidates):
             P += candidate.count("kˈr") * 3
 
             #  ('kurd'si'tan => 'kur'dis'tan) 
-            P += len(re.findall(r"[^aeêouûiîȯėˈ]ˈsiˈtaˈ?n", candidate)) * 3
+            P += len(stan_suffix.findall(candidate)) * 3
 
             #"(kewt|newt|ḧewt|rext|sext|dest|pest|řast|mest|pişt|wîst|hest|bîst|heşt|şest)"                    
             # suffix /it/ and /im/ ('sert => 'se'rit) ('xewt !! 'xe'wit / 'xewt)
-            if not re.search(r"(rift|neft|kurt|girt|xirt|germ|term|port)", candidate):
-                P += len(re.findall(r"[aeêouûiîȯė]([^aeêouûiîyȯėˈ]m|[^aeêouûiîysşxwˈ]t)$", candidate)) * 3
+            if not it_im_exceptions.search(candidate):
+                P += len(it_im_suffix.findall(candidate)) * 3
 
             # (ˈdyu/ => ˈdîw) and (ˈkwiř => ˈkuř)
             P += candidate.count("yu") * 5
@@ -253,58 +287,58 @@ def EVAL(Candidates):
             # ˈdiˈrêˈjayˈyî => ˈdiˈrêˈjaˈyîy  (not heyyî and teyyî)
             # ˈdiˈrêjˈyî => ˈdiˈrêˈjîy
             # (NOT ˈḧeyˈyî  teyˈyî")
-            P += len(re.findall(r"[^aeêouûiîȯė]ˈyî", candidate)) * 3
+            P += len(consonant_yî.findall(candidate)) * 3
 
             # [CV]'CyV => [CV]C'yV (ˈdiˈrêˈjyî => ˈdiˈrêˈjîy) ('bes'tye'tî => 'best'ye'tî)
-            P += len(re.findall(r"(?<!^)ˈ[^aeêouûiî][wy]", candidate)) * 3
+            P += len(onset_glide.findall(candidate)) * 3
 
             # C'CyV => CC'yV  (bir'dyan => bird'yan) ˈswênˈdyan
-            P += len(re.findall(r"[^aeêouûiî]ˈ[^aeêouûiî][y][aeêouûî]", candidate)) * 2
+            P += len(cluster_ye.findall(candidate)) * 2
 
             # twîˈwur => tu'yûr
-            P += len(re.findall(r"[^aeêouûiî]wîˈw", candidate)) * 3
+            P += len(wîw.findall(candidate)) * 3
             #===========================
             # Cix (řê'kix'raw => řêk'xi'raw
-            P += len(re.findall(r"[^aeêouûiî]ixˈ", candidate)) * 2
+            P += len(ix_coda.findall(candidate)) * 2
 
             # ^'hełC' => ^'heł'C
-            P += len(re.findall(r"^ˈhe(ł[^aeêouûiîˈ]ˈ|ˈłi)", candidate)) * 3
+            P += len(heł_onset.findall(candidate)) * 3
 
             # (he'jarn => 'he'ja'rin)
             P += candidate.count(r"rn") * 5
 
             # ('xawn => 'xa'win) ('pyawn => pya'win)
-            P += len(re.findall(r"[aêoûî][w][^aeêouûiîˈ]", candidate)) * 5
+            P += len(w_coda.findall(candidate)) * 5
 
             # 
-            P += len(re.findall(r"uw(ˈ|$)", candidate)) * 5
+            P += len(uw_coda.findall(candidate)) * 5
             #===========================
 
             # ('lab'ri'di'nî => 'la'bir'di'nî)
-            P += len(re.findall(r"[aeêouûiî][^aeêouûiîˈ]ˈriˈ", candidate)) * 5
+            P += len(ri_syllable.findall(candidate)) * 5
             
             # 'ser'nic, 'dek'rid, gir'fit => 'se'rinc, 'de'kird, 'gi'rift  (NOT gir'tin)
-            pat = re.search(r"([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])i([^aeêouûiîˈ])", candidate)
+            pat = inserted_i.search(candidate)
             if pat:
-                C = re.sub("[iˈ]", "", pat.group())
+                C = i_and_marks.sub("", pat.group())
                 if sonority_index(C[1]) > sonority_index(C[2]):
                     P += 3
             # ('sern'cê => 'se'rin'cê) 
-            pat = re.search(r"([^aeêouûiîˈ])([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])", candidate)
+            pat = double_coda.search(candidate)
             if pat:
-                C = re.sub("[iˈ]", "", pat.group())
+                C = i_and_marks.sub("", pat.group())
                 if sonority_index(C[0]) > sonority_index(C[1]):
                     P += 3
             # ('ser'ni'cê => 'se'rin'cê) 
-            pat = re.search(r"([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])iˈ([^aeêouûiîˈ])", candidate)
+            pat = inserted_i_syllable.search(candidate)
             if pat:
-                C = re.sub("[iˈ]", "", pat.group())
+                C = i_and_marks.sub("", pat.group())
                 if sonority_index(C[0]) > sonority_index(C[1]) and sonority_index(C[1]) > sonority_index(C[2]):
                     P += 3
             # ('gi'rit'nê => 'gir'ti'nê)  ('ku'şit'ne => 'kuş'ti'ne)
-            pat = re.search(r"[aeêouûiî]ˈ([^aeêouûiîˈ])i([^aeêouûiîˈ])ˈ([^aeêouûiîˈ])", candidate)
+            pat = inserted_i_onset.search(candidate)
             if pat:
-                C = re.sub("[aeêouûiîˈ]", "", pat.group())
+                C = vowels_and_marks.sub("", pat.group())
                 if sonority_index(C[2]) >= sonority_index(C[1]):
                     P += 3
             Penalty[candidate] = P
@@ -325,46 +359,235 @@ def evaluator(gr, Candidates):
    
 def word_G2P(gr, SingleOutputPerWord):
     # Check history for speed up
-    if gr not in history:
-        history[gr] = evaluator(gr, Generator(gr))
-    return history[gr].split('¶')[0] if SingleOutputPerWord else history[gr]
-
-# Converts Central Kurdish text in standard Arabic script into syllabified phonemic Latin script (i.e. graphemes to phonems)
-def KurdishG2P(text, convertNumbersToWord=False, backMergeConjunction=True, singleOutputPerWord=True):
-    sb = []
+    output = history.get(gr)
+    if output is None:
+        output = history[gr] = evaluator(gr, Generator(gr))
+    return output.split('¶')[0] if SingleOutputPerWord else output
+
+# Keeps the word cache (history) in a compact PhonemeCache (several times less memory, a bit slower lookups),
+# or in a dict again if not enable; the cached words are kept
+def UseCompactG2PCache(enable=True):
+    global history
+    if enable and not isinstance(history, PhonemeCache):
+        history = PhonemeCache(history)
+    elif not enable and isinstance(history, PhonemeCache):
+        history = dict(history.items())
+    return history
+
+# Prepares the input text of G2P (numerals, normalization and trimming)
+def G2P_prepare(text, convertNumbersToWord=False):
     text = UnifyNumerals(text, "en")
     if convertNumbersToWord:
         text = Number2Word(text)
+    return G2P_normalize(text.strip())
 
-    text = G2P_normalize(text.strip())
+# G2P_prepare with the alignment of the output to the text
+def G2P_prepare_aligned(text, convertNumbersToWord=False):
+    text, offsets = translate_aligned(text, numeral_replaces["en"], regex, identity(len(text)))
+    if convertNumbersToWord:
+        text, offsets = Number2WordAligned(text, offsets)
+    text, offsets = strip_aligned(text, offsets)
+    return translate_aligned(text, g2p_normalization, re, offsets)
+
+# Kurdish words of the text which are converted one by one in KurdishG2P
+def G2P_words(text, convertNumbersToWord=False):
+    return [word for word in kurdish_words.findall(G2P_prepare(text, convertNumbersToWord)) if word != "و"]
+
+kurdish_words = compile_pattern(f"[{ku}]+", re)
+
+# G2P of a list of words (e.g. in a worker process); the output can be merged into history
+def words_G2P(words):
+    return {gr: evaluator(gr, Generator(gr)) for gr in words}
+
+# Converts Central Kurdish text in standard Arabic script into syllabified phonemic Latin script (i.e. graphemes to phonems)
+def KurdishG2P(text, convertNumbersToWord=False, backMergeConjunction=True, singleOutputPerWord=True):
+    text = G2P_prepare(text, convertNumbersToWord)
+    output = conjunction_G2P(words_phonemes(text, singleOutputPerWord), backMergeConjunction)
+
+    return output.rstrip()
 
-    ku = "ئابپتجچحخدرڕزژسشعغفڤقکگلڵمنوۆەهیێ" + "ۋۉۊڎڴݵݸ"
-    wordss = re.findall(f"([{ku}]+|[^{ku}]+)", text)
-    for word in wordss:
-        if re.search(f"[{ku}]", word) and word != "و":
-            sb.append(word_G2P(re.sub(f"[^{ku}]+", "", word), singleOutputPerWord))
+# KurdishG2P with the alignment of the output to the text: (output, offsets) (see Alignment.py);
+# the phonemes of a word are spread over the letters of the word
+def KurdishG2PAligned(text, convertNumbersToWord=False, backMergeConjunction=True, singleOutputPerWord=True):
+    text, offsets = G2P_prepare_aligned(text, convertNumbersToWord)
+    sb = []
+    local = array("i")
+    position = 0
+    for word in Tokenize(text):
+        output = word_G2P(word, singleOutputPerWord) if word[0] in ku and word != "و" else word
+        sb.append(output)
+        spread(local, position, position + len(word), len(output))
+        position += len(word)
+    local.append(len(text))
+    output, offsets = "".join(sb), compose(offsets, local)
+
+    output, offsets = sub_aligned(conjunction_start, r"\1ˈwe", output, offsets)
+    if not backMergeConjunction:
+        output, offsets = sub_aligned(conjunction_waw, "û", output, offsets)
+    else:
+        for pattern, replacement in conjunction_rules:
+            output, offsets = sub_aligned(pattern, replacement, output, offsets)
+    return strip_aligned(output, offsets, left=False)
+
+# G2P of the words of a prepared text (the other tokens and the conjunction و are not changed)
+def words_phonemes(text, singleOutputPerWord):
+    sb = []
+    for word in Tokenize(text):
+        if word[0] in ku and word != "و":
+            sb.append(word_G2P(word, singleOutputPerWord))
         else:
             sb.append(word)
-    output = ''.join(sb)
-    # conjunction و
-    output = re.sub("(^|[?!.] ?)" + "و", r"\1ˈwe", output)
+    return ''.join(sb)
+
+# ===== Streaming G2P =====
+# Converts a text which arrives in fragments (e.g. live TTS); feed() returns the phonemes of the words which are final
+# and finish() returns the rest. The outputs joined are the same as KurdishG2P of the whole text.
+# The text is cut after a white space when the next word is complete and cannot change the previous word
+# (i.e. its phonemes have no conjunction و or ¶, and it has no numbers or number signs), so the delay is about one word.
+class KurdishG2PStream:
+    def __init__(self, convertNumbersToWord=False, backMergeConjunction=True, singleOutputPerWord=True):
+        self.convertNumbersToWord = convertNumbersToWord
+        self.backMergeConjunction = backMergeConjunction
+        self.singleOutputPerWord = singleOutputPerWord
+        self.pending = ""     # the text which is not converted yet
+        self.started = False  # if a part of the text is converted (the text is stripped only at its beginning)
+
+    def feed(self, fragment):
+        self.pending += fragment
+        cut = self.cut_position()
+        if cut == 0:
+            return ""
+        output = self.convert(self.pending[:cut], False)
+        self.pending = self.pending[cut:]
+        self.started = True
+        return output
+
+    def finish(self):
+        output = self.convert(self.pending, True)
+        self.pending = ""
+        self.started = False
+        return output
+
+    # outputs of the fragments (and the rest at the end)
+    def stream(self, fragments):
+        for fragment in fragments:
+            output = self.feed(fragment)
+            if output:
+                yield output
+        output = self.finish()
+        if output:
+            yield output
+
+    # same as KurdishG2P, but the text is stripped only at the beginning (and at the end if last)
+    def convert(self, text, last):
+        text = UnifyNumerals(text, "en")
+        if self.convertNumbersToWord:
+            text = Number2Word(text)
+        if not self.started:
+            text = text.lstrip()
+        if last:
+            text = text.rstrip()
+        output = conjunction_G2P(words_phonemes(G2P_normalize(text), self.singleOutputPerWord), self.backMergeConjunction)
+        return output.rstrip() if last else output
+
+    # the last position (after a white space) where the pending text can be cut; 0 if there is no such position
+    def cut_position(self):
+        pieces = [(m.start(), m.end()) for m in stream_pieces.finditer(self.pending)]
+        first = 1 if self.pending[:1].isspace() else 0
+        # pieces[i] is a white space between the words pieces[i-1] and pieces[i+1]; pieces[i+2] shows that pieces[i+1] is complete
+        last = len(pieces) - 3
+        if (last - first) % 2 == 0:
+            last -= 1
+        for i in range(last, first, -2):
+            if self.can_cut(*(self.pending[start:end] for start, end in pieces[i - 1:i + 2])):
+                return pieces[i][1]
+        return 0
+
+    def can_cut(self, previous, space, word):
+        # "چ بکە" is joined by G2P_normalize; a number (sign) may join the previous word in Number2Word
+        if previous[-1] == "چ" or stream_number_chars.search(word):
+            return False
+        # the white space should remain (e.g. "\r" is removed) and the next word should have output
+        word = G2P_normalize(word)
+        if not G2P_normalize(space) or not word.strip():
+            return False
+        phonemes = words_phonemes(word, self.singleOutputPerWord)
+        return "و" not in phonemes and "¶" not in phonemes
+
+stream_pieces = compile_pattern(r"\s+|\S+", re)
+stream_number_chars = compile_pattern(r"[\d%$£€]", re)
+
+# Token-stream form of KurdishG2P (tokens of Tokenize); returns the tokens of the output
+def KurdishG2PTokens(tokens, convertNumbersToWord=False, backMergeConjunction=True, singleOutputPerWord=True):
+    # G2P_prepare
+    tokens = apply_around(tokens, foreign_numbers, lambda number: UnifyNumerals(number, "en"), 0, 0)
+    if convertNumbersToWord:
+        tokens = Number2WordTokens(tokens)
+    start, end = 0, len(tokens)
+    while start < end and tokens[start].isspace():
+        start += 1
+    while end > start and tokens[end - 1].isspace():
+        end -= 1
+    tokens = apply_around(tokens[start:end], g2p_normalization_chars, G2P_normalize, 1, 2)
+
+    tokens = [word_G2P(token, singleOutputPerWord) if token[0] in ku and token != "و" else token for token in tokens]
+    tokens = apply_to_groups(tokens, conjunction_groups(tokens), lambda text: conjunction_G2P(text, backMergeConjunction), False)
+    while tokens and not tokens[-1].rstrip():
+        tokens.pop()
+    if tokens:
+        tokens[-1] = tokens[-1].rstrip()
+    return tokens
+
+foreign_numbers = compile_pattern(r"(?:(?![0-9])\d)+", re)
+
+# characters which G2P_normalize changes (or uses as context)
+g2p_normalization_chars = compile_pattern(f"[\rَُِٚءأإآظذضصثطكيى\u200cھـ؟،؛]|  |(?<![{ku}])چ(?![{ku}])", re)
+
+# The conjunction rules do not cross white spaces; each و (or ¶) is converted with
+# its white-space-separated piece, the previous piece and the next white space.
+def conjunction_groups(tokens):
+    groups = []
+    for i in token_indices(tokens, conjunctions):
+        start, space = i, 0
+        while start > 0 and space < 2:
+            start -= 1
+            space += tokens[start].isspace()
+        if space == 2:
+            start += 1
+        end = i + 1
+        while end < len(tokens) and not tokens[end - 1].isspace():
+            end += 1
+        add_group(groups, start, end)
+    return groups
+
+conjunctions = compile_pattern("[و¶]", re)
+
+# conjunction و
+conjunction_start = compile_pattern("(^|[?!.] ?)" + "و", re)
+conjunction_waw = compile_pattern("و", re)
+conjunction_rules = [(compile_pattern(pattern, re), replacement) for pattern, replacement in [
+    # if there are candidates preceeding conjunction (e.g ˈbîst¶ˈbîˈsit و)
+    (r"(\w+)¶(\w+)¶(\w+) و", r"\1 و¶\2 و¶\3 و"),
+    (r"(\w+)¶(\w+) و", r"\1 و¶\2 و"),
+    # ('bi'ra + w => bi'raw)
+    (r"([aeêouûiî]) و", r"\1w"),
+    # ('be'fir + û => 'bef'rû)
+    (r"(?<=\w)ˈ([^aeêouûiî])i([^aeêouûiî]) و", r"\1ˈ\2û"),
+    # ('ser + û => 'se'rû)
+    # ('sard + û => 'sar'dû)
+    # ('min + û => 'mi'nû)
+    # ('bi'gir + û => 'bi'gi'rû) 
+    # ('gir'tin + û => 'gir'ti'nû)
+    (r"([^aeêouûiî]) و", r"ˈ\1û"),
+    # if conjunction makes candidates the same  (e.g ˈbîsˈtû¶ˈbîsˈtû)
+    (r"(\w+)¶\1(\s|$)", r"\1"),
+]]
+
+def conjunction_G2P(output, backMergeConjunction):
+    output = conjunction_start.sub(r"\1ˈwe", output)
     if not backMergeConjunction:
-        output = re.sub("و", "û", output)
+        output = output.replace("و", "û")
     else:
-        # if there are candidates preceeding conjunction (e.g ˈbîst¶ˈbîˈsit و)
-        output = re.sub(r"(\w+)¶(\w+)¶(\w+) و", r"\1 و¶\2 و¶\3 و", output)
-        output = re.sub(r"(\w+)¶(\w+) و", r"\1 و¶\2 و", output)
-        # ('bi'ra + w => bi'raw)
-        output = re.sub(r"([aeêouûiî]) و", r"\1w", output)
-        # ('be'fir + û => 'bef'rû)
-        output = re.sub(r"(?<=\w)ˈ([^aeêouûiî])i([^aeêouûiî]) و", r"\1ˈ\2û", output)
-        # ('ser + û => 'se'rû)
-        # ('sard + û => 'sar'dû)
-        # ('min + û => 'mi'nû)
-        # ('bi'gir + û => 'bi'gi'rû) 
-        # ('gir'tin + û => 'gir'ti'nû)
-        output = re.sub(r"([^aeêouûiî]) و", r"ˈ\1û", output)
-        # if conjunction makes candidates the same  (e.g ˈbîsˈtû¶ˈbîsˈtû)
-        output = re.sub(r"(\w+)¶\1(\s|$)", r"\1", output)
-
-    return output.rstrip()
\ No newline at end of file
+        for pattern, replacement in conjunction_rules:
+            output = pattern.sub(replacement, output)
+    return output
@@ -14,12 +14,17 @@
 
 import regex as re
 import html
+import html.entities
+import math
+import itertools
 import os
+from .CharTranslation import translate_by_list, translate_by_map
+from .Patterns import compile_pattern
+from .Tokenizer import apply_around, number_pattern
+from .Alignment import identity, sub_aligned, translate_aligned, translate_chars_aligned, strip_aligned
 
 def replace_by_list(text, replace_list):
-    for i in range(0, len(replace_list), 2):
-        text = re.sub(replace_list[i], replace_list[i + 1], text)
-    return text
+    return translate_by_list(text, replace_list)
 
 KU = "ئابپتجچحخدرڕزژسشعغفڤقکگلڵمنوۆەهھیێأإآثذصضطظكيىةڎۊؤ" + "\u064B-\u065F"
 JOINERS = "ئبپتثجچحخسشصضطظعغفڤقکكگلڵمنیيهھێ"
@@ -181,33 +186,7 @@ additional_replacements = load_normalizer_replaces("resources/NormalizeUnicodeAd
 
 # Unicode Normalization for Central Kurdish
 def Normalize(text, isOnlyKurdish=True, changeInitialR=True, deepUnicodeCorrectios=True, additionalUnicodeCorrections=True, usersReplaceList=None):
-    if usersReplaceList is None:
-        usersReplaceList = {}
-
-    replaces = {}
-
-    # Character-based replacement (ReplaceList and Private Use Area)
-    char_list = list(set(text))
-
-    if deepUnicodeCorrectios:
-        for key, value in deep_replacements.items():
-            if key in char_list:
-                replaces[key] = value
-
-    if additionalUnicodeCorrections:
-        for key, value in additional_replacements.items():
-            if key in char_list and key not in replaces:
-                replaces[key] = value
-
-    for key, value in usersReplaceList.items():
-        if key in char_list and key not in replaces:
-            replaces[key] = value
-
-    for ch in char_list:
-        if ch in replaces:  # ReplaceList
-            text = text.replace(ch, replaces[ch])
-        elif 57343 < ord(ch) < 63744:  # Private Use Area
-            text = text.replace(ch, '□')  # u25A1 White Square
+    text = normalize_chars(text, deepUnicodeCorrectios, additionalUnicodeCorrections, usersReplaceList)
 
     text = replace_by_list(text, normalization_replaces["NormalizeKurdish1"])
 
@@ -221,13 +200,70 @@ def Normalize(text, isOnlyKurdish=True, changeInitialR=True, deepUnicodeCorrecti
 
     return text
 
+# Character-based replacement of Normalize (ReplaceList and Private Use Area)
+# (priority: deep corrections, additional corrections, user's list)
+def normalize_chars(text, deepUnicodeCorrectios=True, additionalUnicodeCorrections=True, usersReplaceList=None):
+    tables = [table for use, table in [(deepUnicodeCorrectios, deep_replacements),
+                                       (additionalUnicodeCorrections, additional_replacements),
+                                       (True, usersReplaceList)] if use and table]
+    for ch in set(text):
+        for table in tables:
+            if ch in table:  # ReplaceList
+                text = text.replace(ch, table[ch])
+                break
+        else:
+            if 57343 < ord(ch) < 63744:  # Private Use Area
+                text = text.replace(ch, '□')  # u25A1 White Square
+    return text
+
+
+# Normalize with the alignment of the output to the text: (output, offsets) (see Alignment.py)
+def NormalizeAligned(text, isOnlyKurdish=True, changeInitialR=True, deepUnicodeCorrectios=True, additionalUnicodeCorrections=True, usersReplaceList=None):
+    text, offsets = normalize_chars_aligned(text, identity(len(text)), deepUnicodeCorrectios, additionalUnicodeCorrections, usersReplaceList)
+    replace_list = normalization_replaces["NormalizeKurdish1"]
+    if isOnlyKurdish:
+        replace_list = replace_list + normalization_replaces["NormalizeKurdish2"]
+        if changeInitialR:
+            replace_list = replace_list + normalization_replaces["NormalizeKurdish3"]
+    return translate_aligned(text, replace_list, re, offsets)
+
+def normalize_chars_aligned(text, offsets, deepUnicodeCorrectios=True, additionalUnicodeCorrections=True, usersReplaceList=None):
+    # same characters as normalize_chars (a replacement is not replaced again)
+    changes = {ch: normalize_chars(ch, deepUnicodeCorrectios, additionalUnicodeCorrections, usersReplaceList) for ch in set(text)}
+    return translate_chars_aligned(text, changes.get, offsets)
+
+def normalize_punctuations_aligned(text, offsets, seprateAllPunctuations):
+    replace_list = ['"', "\uF8FD"] + normalization_replaces["NormalizePunctuations1"]
+    replace_list += normalization_replaces["NormalizePunctuations3" if seprateAllPunctuations else "NormalizePunctuations2"]
+    text, offsets = translate_aligned(text, replace_list + ["\uF8FD", '"'], re, offsets)
+    return strip_aligned(text, offsets)
+
+def trim_line_aligned(line, offsets):
+    line, offsets = sub_aligned(trailing_zero_widths, "", *strip_aligned(line, offsets))
+    line, offsets = sub_aligned(leading_zero_widths, "", *strip_aligned(line, offsets))
+    return strip_aligned(line, offsets)
+
+trailing_zero_widths = compile_pattern("[\u200B\u200C\uFEFF]+$", re)
+leading_zero_widths = compile_pattern("^[\u200B\u200C\uFEFF]+", re)
+
+def replace_html_entity_aligned(text, offsets):
+    return sub_aligned(html_entity, lambda m: html.unescape(m.group(0)), text, offsets)
+
+html_entity = compile_pattern("&[a-zA-Z]+;", re)
 
 # Seperate digits from words (e.g. replacing "12a" with "12 a")
 def SeperateDigits(text):
     return replace_by_list(text, normalization_replaces["SeperateDigits"])
 
+# Token-stream form of SeperateDigits (tokens of Tokenize)
+def SeperateDigitsTokens(tokens):
+    return apply_around(tokens, number_pattern, SeperateDigits, 1, 3)
+
 # Normalize Punctuations
 def NormalizePunctuations(text, seprateAllPunctuations):
+    return normalize_punctuations(text, seprateAllPunctuations).strip()
+
+def normalize_punctuations(text, seprateAllPunctuations):
     text = text.replace('"', "\uF8FD")  # temp replacement
     text = replace_by_list(text, normalization_replaces["NormalizePunctuations1"])
     if not seprateAllPunctuations:
@@ -235,33 +271,384 @@ def NormalizePunctuations(text, seprateAllPunctuations):
     else:
         text = replace_by_list(text, normalization_replaces["NormalizePunctuations3"])
     text = text.replace("\uF8FD", '"')  # undo temp replacement
-    return text.strip()
+    return text
+
+# ===== Incremental normalization (e.g. for text editors) =====
+# Keeps a document and its normalized text: Normalize and (if normalizePunctuations) NormalizePunctuations.
+# The normalization rules do not cross line breaks, so an edit only re-normalizes its lines
+# (each line between two "\n", i.e. with the same context as in the document).
+# The lines are kept in LineBlocks, so an edit takes O(log n) plus the size of the edited lines.
+class IncrementalNormalizer:
+    def __init__(self, text="", normalizePunctuations=True, seprateAllPunctuations=False, isOnlyKurdish=True, changeInitialR=True, deepUnicodeCorrectios=True, additionalUnicodeCorrections=True, usersReplaceList=None):
+        self.normalizePunctuations = normalizePunctuations
+        self.seprateAllPunctuations = seprateAllPunctuations
+        self.normalizeOptions = (isOnlyKurdish, changeInitialR, deepUnicodeCorrectios, additionalUnicodeCorrections, usersReplaceList)
+        lines = text.split("\n")
+        self.lines = LineBlocks(lines, [self.normalize_line(line) for line in lines])
+
+    # the source document
+    @property
+    def source(self):
+        return "\n".join(self.lines.sources())
+
+    # the normalized document (the same as normalizing the whole source)
+    @property
+    def text(self):
+        lead, trail = self.strip_lengths()
+        return "\n".join(self.lines.outputs())[lead:self.lines.output_length() - trail]
+
+    def normalize_line(self, line):
+        text = Normalize("\n" + line + "\n", *self.normalizeOptions)
+        if self.normalizePunctuations:
+            text = normalize_punctuations(text, self.seprateAllPunctuations)
+        return text[1:-1]
+
+    # Replaces source[start:end] with the new text and re-normalizes the edited lines.
+    # Returns the change of the normalized text: (outStart, outEnd, outText) means that
+    # the previous text[outStart:outEnd] is replaced with outText.
+    def edit(self, start, end, text):
+        first, firstStart = self.line_at(start)
+        last, lastStart = self.line_at(end)
+        prefix = self.lines.line(first)[:start - firstStart]
+        suffix = self.lines.line(last)[end - lastStart:]
+        lines = (prefix + text + suffix).split("\n")
+        outputs = [self.normalize_line(line) for line in lines]
+
+        # the unchanged normalized text before and after the edited lines
+        outputLength = self.lines.output_length()
+        before = self.lines.starts(first)[1]
+        after = outputLength - (self.lines.starts(last)[1] + len(self.lines.output(last)))
+        oldLead, oldTrail = self.strip_lengths()
+        oldLength = outputLength - oldLead - oldTrail
+
+        self.lines.splice(first, last, lines, outputs)
+        lead, trail = self.strip_lengths()
+        length = self.lines.output_length() - lead - trail
+
+        common = max(0, before - lead) if lead == oldLead else 0
+        common = min(common, oldLength, length)
+        commonEnd = max(0, after - trail) if trail == oldTrail else 0
+        commonEnd = min(commonEnd, oldLength - common, length - common)
+        return common, oldLength - commonEnd, self.output_slice(lead + common, lead + length - commonEnd)
+
+    # ===== offset map =====
+    # the line of a source offset, and the offset where the line starts
+    def line_at(self, offset):
+        if not 0 <= offset <= self.lines.source_length():
+            raise IndexError("offset out of range")
+        return self.lines.line_of(offset, 0)
+
+    # the offset of a line in the source
+    def source_offset(self, line):
+        return self.lines.starts(line)[0]
+
+    # the offset of a line in the normalized text
+    def output_offset(self, line):
+        lead, trail = self.strip_lengths()
+        return min(max(0, self.lines.starts(line)[1] - lead), self.lines.output_length() - lead - trail)
+
+    # lengths of the white spaces removed by NormalizePunctuations at the beginning and the end of the text
+    def strip_lengths(self):
+        if not self.normalizePunctuations:
+            return 0, 0
+        lead = 0
+        for line in self.lines.outputs():
+            stripped = line.lstrip()
+            if stripped:
+                lead += len(line) - len(stripped)
+                break
+            lead += len(line) + 1
+        else:
+            return self.lines.output_length(), 0
+        trail = 0
+        for line in self.lines.outputs(True):
+            stripped = line.rstrip()
+            if stripped:
+                trail += len(line) - len(stripped)
+                break
+            trail += len(line) + 1
+        return lead, trail
+
+    # "\n".join(outputs)[start:end] (only the lines of the range are joined)
+    def output_slice(self, start, end):
+        if start >= end:
+            return ""
+        first, offset = self.lines.line_of(start, 1)
+        last = self.lines.line_of(end, 1)[0]
+        return "\n".join(self.lines.output(i) for i in range(first, last + 1))[start - offset:end - offset]
+
+# The source lines and the normalized lines of a document in blocks of about line_block_size lines, with
+# Fenwick trees of the line counts and the lengths of the blocks. Finding the line of an offset or the offset
+# of a line takes O(log n + line_block_size), and so does a splice of the lines (the trees are rebuilt only
+# when a block is split or removed).
+line_block_size = 64
+
+class LineBlocks:
+    def __init__(self, lines, outputs):
+        self.blocks = [[lines[i:i + line_block_size], outputs[i:i + line_block_size]]
+                       for i in range(0, len(lines), line_block_size)]
+        self.rebuild()
+
+    def rebuild(self):
+        self.counts = fenwick_tree([len(block[0]) for block in self.blocks])
+        self.lengths = [fenwick_tree([lines_length(block[column]) for block in self.blocks]) for column in (0, 1)]
+        self.count = fenwick_prefix(self.counts, len(self.blocks))
+
+    def __len__(self):
+        return self.count
+
+    # (block, index in the block) of a line
+    def find(self, line):
+        if not 0 <= line < self.count:
+            raise IndexError("line index out of range")
+        return fenwick_search(self.counts, line)
+
+    def line(self, line):
+        b, j = self.find(line)
+        return self.blocks[b][0][j]
+
+    def output(self, line):
+        b, j = self.find(line)
+        return self.blocks[b][1][j]
+
+    def sources(self):
+        for block in self.blocks:
+            yield from block[0]
+
+    def outputs(self, reverse=False):
+        for block in (reversed(self.blocks) if reverse else self.blocks):
+            yield from (reversed(block[1]) if reverse else block[1])
+
+    def source_length(self):
+        return fenwick_prefix(self.lengths[0], len(self.blocks)) - 1
+
+    def output_length(self):
+        return fenwick_prefix(self.lengths[1], len(self.blocks)) - 1
+
+    # offsets of a line in the source and in "\n".join(outputs)
+    def starts(self, line):
+        b, j = self.find(line)
+        return tuple(fenwick_prefix(self.lengths[c], b) + lines_length(self.blocks[b][c][:j]) for c in (0, 1))
+
+    # the line of an offset (column 0: source, 1: outputs) and the offset where the line starts
+    def line_of(self, offset, column):
+        b, rest = fenwick_search(self.lengths[column], offset)
+        if b == len(self.blocks):  # the end of the text
+            b -= 1
+            rest += lines_length(self.blocks[b][column])
+        lines = self.blocks[b][column]
+        j = 0
+        while j + 1 < len(lines) and rest >= len(lines[j]) + 1:
+            rest -= len(lines[j]) + 1
+            j += 1
+        return fenwick_prefix(self.counts, b) + j, offset - rest
+
+    # replaces the lines first..last with lines (and their outputs)
+    def splice(self, first, last, lines, outputs):
+        bFirst, jFirst = self.find(first)
+        bLast, jLast = self.find(last)
+        block = [self.blocks[bFirst][c][:jFirst] + new + self.blocks[bLast][c][jLast + 1:]
+                 for c, new in ((0, lines), (1, outputs))]
+        if bFirst == bLast and 0 < len(block[0]) <= 2 * line_block_size:
+            old = self.blocks[bFirst]
+            fenwick_add(self.counts, bFirst, len(block[0]) - len(old[0]))
+            for c in (0, 1):
+                fenwick_add(self.lengths[c], bFirst, lines_length(block[c]) - lines_length(old[c]))
+            self.count += len(block[0]) - len(old[0])
+            self.blocks[bFirst] = block
+        else:
+            self.blocks[bFirst:bLast + 1] = [[block[0][i:i + line_block_size], block[1][i:i + line_block_size]]
+                                             for i in range(0, len(block[0]), line_block_size)]
+            self.rebuild()
+
+# length of the lines joined with "\n" (plus one)
+def lines_length(lines):
+    return sum(map(len, lines)) + len(lines)
+
+# ===== Fenwick tree (binary indexed tree) of a list of values
+def fenwick_tree(values):
+    tree = [0] + values
+    for i in range(1, len(tree)):
+        j = i + (i & -i)
+        if j < len(tree):
+            tree[j] += tree[i]
+    return tree
+
+def fenwick_add(tree, index, delta):
+    index += 1
+    while index < len(tree):
+        tree[index] += delta
+        index += index & -index
+
+# sum of values[:index]
+def fenwick_prefix(tree, index):
+    total = 0
+    while index > 0:
+        total += tree[index]
+        index -= index & -index
+    return total
+
+# the largest index with sum(values[:index]) <= value, and value - sum(values[:index])
+def fenwick_search(tree, value):
+    index = 0
+    step = 1 << (len(tree).bit_length() - 1)
+    while step:
+        if index + step < len(tree) and tree[index + step] <= value:
+            index += step
+            value -= tree[index]
+        step >>= 1
+    return index, value
 
 # Trim white spaces of a line
 def TrimLine(line):
-    line = re.sub("[\u200B\u200C\uFEFF]+$", "", line.strip())
-    line = re.sub("^[\u200B\u200C\uFEFF]+", "", line.strip())
+    line = trailing_zero_widths.sub("", line.strip())
+    line = leading_zero_widths.sub("", line.strip())
     return line.strip()
 
 # HTML Entity replacement for web crawled texts (e.g. "&amp;eacute;" with "é")
 def ReplaceHtmlEntity(text):
-    return re.sub("&[a-zA-Z]+;", lambda m: html.unescape(m.group(0)), text)
+    return html_entity.sub(unescape_entity, text)
 
 # Replace URLs and Emails with a certain word (improves language models)
 def ReplaceUrlEmail(text):
-    text = re.sub(r"([a-zA-Z0-9_\-\.]+)@([a-zA-Z0-9_\-\.]+\.[a-zA-Z]{2,5})", "EmailAddress", text)
-    text = re.sub(r"((http[s]?|ftp)?://([\w-]+\.)+[\w-]+(/[\w-~./?%+&=]*)?)", "URL", text)
-    return text
+    return replace_by_list(text, url_email_replaces)
+
+url_email_replaces = [
+    r"([a-zA-Z0-9_\-\.]+)@([a-zA-Z0-9_\-\.]+\.[a-zA-Z]{2,5})", "EmailAddress",
+    r"((http[s]?|ftp)?://([\w-]+\.)+[\w-]+(/[\w-~./?%+&=]*)?)", "URL",
+]
+
+# Web cleanup of a crawled line: same as TrimLine(ReplaceUrlEmail(ReplaceHtmlEntity(line))).
+# Most lines have no "&", "@" or "://" and no spaces around them, so they are returned as they are.
+def CleanWebLine(line):
+    if "&" in line:
+        line = html_entity.sub(unescape_entity, line)
+    if "@" in line:
+        line = email_pattern.sub("EmailAddress", line)
+    # "EmailAddress" cannot make a new "://"
+    if "://" in line:
+        line = url_pattern.sub("URL", line)
+    if line and not line[0].isspace() and not line[-1].isspace() and line[0] not in zero_widths and line[-1] not in zero_widths:
+        return line
+    return TrimLine(line)
+
+# Web cleanup of the lines of a document or a stream (e.g. a crawled file); yields the cleaned lines
+def CleanWebLines(lines):
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    for line in lines:
+        yield CleanWebLine(line)
+
+email_pattern = compile_pattern(url_email_replaces[0], re)
+url_pattern = compile_pattern(url_email_replaces[2], re)
+zero_widths = "\u200B\u200C\uFEFF"
+# the named entities of HTML5 ("&amp;" => "&"); the other names are unescaped on each use (not kept)
+html_entities = {"&" + name: value for name, value in html.entities.html5.items() if name[-1] == ";" and name[:-1].isalpha()}
+
+def unescape_entity(m):
+    entity = m.group(0)
+    output = html_entities.get(entity)
+    return html.unescape(entity) if output is None else output
 
 # Character replacement for ANSI CodePage
 def Char2CharReplacment(text, codepage):
-    for key, value in codepage.items():
-        text = text.replace(key, value)
-    return text
+    return translate_by_map(text, codepage)
 
-# Word to Word Replacement
+# Word to Word Replacement (wordReplacements: a dict or a WordReplacer)
 def Word2WordReplacement(line, wordReplacements):
-    return re.sub(r"(?<![\w\u200C])[\w\u200C]+", lambda m: wordReplacements.get(m.group(0), m.group(0)), line)
+    if isinstance(wordReplacements, WordReplacer):
+        return wordReplacements.replace(line)
+    return word_pattern.sub(lambda m: wordReplacements.get(m.group(0), m.group(0)), line)
+
+word_pattern = compile_pattern(r"(?<![\w\u200C])[\w\u200C]+", re)
+next_word_pattern = compile_pattern(r"\s+([\w\u200C]+)", re)
+
+# A compiled word/phrase replacement dictionary for very large dictionaries (e.g. spelling corrections).
+# Keys are words or phrases (words separated by spaces); a phrase matches words separated by white spaces
+# and the longest phrase has priority. The lookups are in a hash table, so the cost per word does not
+# depend on the size of the dictionary.
+class WordReplacer:
+    def __init__(self, replacements=None):
+        self.replacements = {}  # words of the key joined by a space => replacement
+        self.maxLength = {}     # first word => number of words of its longest phrase
+        if replacements is not None:
+            self.update(replacements)
+
+    def __len__(self):
+        return len(self.replacements)
+
+    def __contains__(self, key):
+        return " ".join(word_pattern.findall(key)) in self.replacements
+
+    def add(self, key, replacement):
+        words = word_pattern.findall(key)
+        if not words:
+            return
+        self.replacements[" ".join(words)] = replacement
+        if len(words) > 1 and len(words) > self.maxLength.get(words[0], 1):
+            self.maxLength[words[0]] = len(words)
+
+    # a dict or (key, replacement) pairs
+    def update(self, replacements):
+        items = replacements.items() if isinstance(replacements, dict) else replacements
+        for key, replacement in items:
+            self.add(key, replacement)
+
+    # Loads a TSV file of "key<TAB>replacement" lines
+    @classmethod
+    def from_tsv(cls, file, keyColumn=0, replacementColumn=1, encoding="utf-8"):
+        replacer = cls()
+        with open(file, 'r', encoding=encoding) as f:
+            for line in f:
+                columns = line.rstrip("\r\n").split("\t")
+                if len(columns) > max(keyColumn, replacementColumn):
+                    replacer.add(columns[keyColumn], columns[replacementColumn])
+        return replacer
+
+    def replace(self, text):
+        replacements = self.replacements
+        if not self.maxLength:
+            return word_pattern.sub(lambda m: replacements.get(m.group(), m.group()), text)
+        output = []
+        last = 0
+        for m in word_pattern.finditer(text):
+            if m.start() < last:  # inside a replaced phrase
+                continue
+            replacement = None
+            end = m.end()
+            if m.group() in self.maxLength:
+                phrase = self.match_phrase(text, m)
+                if phrase:
+                    end, replacement = phrase
+            if replacement is None:
+                replacement = replacements.get(m.group())
+            if replacement is not None:
+                output.append(text[last:m.start()])
+                output.append(replacement)
+                last = end
+        output.append(text[last:])
+        return "".join(output)
+
+    # Replacing a batch (list, file, generator, ...) of texts
+    def replace_batch(self, texts):
+        for text in texts:
+            yield self.replace(text)
+
+    # (end, replacement) of the longest phrase which starts with the word m
+    def match_phrase(self, text, m):
+        words = [m.group()]
+        ends = [m.end()]
+        for _ in range(self.maxLength[words[0]] - 1):
+            next_word = next_word_pattern.match(text, ends[-1])
+            if not next_word:
+                break
+            words.append(next_word.group(1))
+            ends.append(next_word.end())
+        for length in range(len(words), 1, -1):
+            replacement = self.replacements.get(" ".join(words[:length]))
+            if replacement is not None:
+                return ends[length - 1], replacement
+        return None
 
 #  ===== Unifying Numerals =====
 digits = [
@@ -277,14 +664,14 @@ digits = [
     "۹", "٩", "9"
 ]
 
+numeral_replaces = {
+    "en": [x for i in range(0, len(digits), 3) for x in (digits[i] + "|" + digits[i + 1], digits[i + 2])],
+    "ar": [x for i in range(0, len(digits), 3) for x in (digits[i] + "|" + digits[i + 2], digits[i + 1])],
+}
+
 # unifies numeral characters into desired numeral type from en (0123456789) or ar (٠١٢٣٤٥٦٧٨٩).
 def UnifyNumerals(text, NumeralType):
-    for i in range(0, len(digits), 3):
-        if NumeralType == "en":
-            text = re.sub(digits[i] + "|" + digits[i + 1], digits[i + 2], text)
-        elif NumeralType == "ar":
-            text = re.sub(digits[i] + "|" + digits[i + 2], digits[i + 1], text)
-    return text
+    return translate_by_list(text, numeral_replaces.get(NumeralType, []))
 
 # ================= Converting Non-Standard Fonts  =================
 # Converts Kurdish text written in AliK fonts into Unicode standard
@@ -301,4 +688,106 @@ def Dylan2Unicode(text):
 
 # Converts Kurdish text written in Zarnegar fonts into Unicode standard
 def Zarnegar2Unicode(text):
-    return replace_by_list(text, normalization_replaces["Zarnegar2Unicode"])
\ No newline at end of file
+    return replace_by_list(text, normalization_replaces["Zarnegar2Unicode"])
+# ================= Detecting Non-Standard Fonts  =================
+# approximate letter frequencies (%) of Central Kurdish texts
+kurdish_letter_frequencies = {
+    "ە": 12.0, "ی": 9.0, "ا": 9.0, "ن": 6.0, "ر": 5.5, "و": 5.5, "ک": 4.5, "م": 4.5, "د": 4.5,
+    "ت": 3.5, "ب": 3.5, "ل": 3.0, "ه": 3.0, "ئ": 3.0, "س": 2.5, "ێ": 2.5, "ش": 2.0, "ز": 1.5,
+    "گ": 1.5, "ۆ": 1.5, "ڕ": 1.2, "پ": 1.2, "ڵ": 1.2, "ج": 1.0, "چ": 1.0, "خ": 0.8, "ق": 0.8,
+    "ف": 0.6, "ح": 0.5, "ع": 0.5, "ژ": 0.4, "غ": 0.3, "ڤ": 0.2,
+}
+
+legacy_converters = {
+    "AliK": AliK2Unicode,
+    "AliWeb": AliWeb2Unicode,
+    "Dylan": Dylan2Unicode,
+    "Zarnegar": Zarnegar2Unicode,
+}
+
+# Expected character frequencies of Kurdish text typed in a legacy font: each letter is written with the
+# strings which the converter turns into it (e.g. AliK "ة" => "ە"), or rarely with the letter itself.
+def encoding_signature(converter, replace_list):
+    candidates = set(kurdish_letter_frequencies)
+    for i in range(0, len(replace_list), 2):
+        for alternative in replace_list[i].split("|"):
+            candidates.add(re.split(r"[(\[]", alternative)[0])
+    sources = {}
+    for s in candidates:
+        for context in ("ب", " "):  # inside and at the end of a word
+            output = converter(s + context)
+            if s and output.endswith(context):
+                output = output[:-len(context)].replace("ھ", "ه").replace("ـ", "")
+                if output in kurdish_letter_frequencies:
+                    sources.setdefault(output, set()).add(s)
+    signature = {}
+    for letter, frequency in kurdish_letter_frequencies.items():
+        rules = sources.get(letter, set()) - {letter}
+        shares = [(s, (1 - identity_share) / len(rules)) for s in rules]
+        if letter in sources:
+            shares.append((letter, identity_share if rules else 1))
+        for s, share in shares:
+            for ch in s:
+                signature[ch] = signature.get(ch, 0) + frequency * share
+    return signature
+
+identity_share = 0.2
+encoding_signatures = {name: encoding_signature(converter, normalization_replaces[converter.__name__])
+                       for name, converter in legacy_converters.items()}
+encoding_signatures["Unicode"] = dict(kurdish_letter_frequencies)
+signature_chars = set(ch for signature in encoding_signatures.values() for ch in signature)
+
+# log-probabilities of the characters in each encoding (with additive smoothing)
+def encoding_log_probabilities(signature, alpha=0.01):
+    total = sum(signature.values()) + alpha * len(signature_chars)
+    return {ch: math.log((signature.get(ch, 0) + alpha) / total) for ch in signature_chars}
+
+encoding_models = {name: encoding_log_probabilities(signature) for name, signature in encoding_signatures.items()}
+
+# Detects the encoding of a Kurdish text ("Unicode", "AliK", "AliWeb", "Dylan" or "Zarnegar") from a sample of its beginning
+# (a naive Bayes classifier over the character histogram). returns (encoding, confidence from 0 to 1)
+def DetectKurdishEncoding(text, sampleSize=4096):
+    histogram = {}
+    for ch in text[:sampleSize]:
+        if ch in signature_chars:
+            histogram[ch] = histogram.get(ch, 0) + 1
+    if not histogram:
+        return "Unicode", 0.0
+    scores = {name: sum(count * model[ch] for ch, count in histogram.items()) for name, model in encoding_models.items()}
+    encoding = max(scores, key=scores.get)
+    confidence = 1 / sum(math.exp(score - scores[encoding]) for score in scores.values())
+    return encoding, confidence
+
+# Converts the text into Unicode standard with the converter of its detected encoding
+def AutoConvert2Unicode(text, sampleSize=4096):
+    encoding, confidence = DetectKurdishEncoding(text, sampleSize)
+    return legacy_converters[encoding](text) if encoding in legacy_converters else text
+
+# Streaming form of AutoConvert2Unicode for large files: the encoding is detected from the first
+# lines (about sampleSize characters) and the lines (with their "\n") are converted one by one.
+def AutoConvert2UnicodeLines(lines, sampleSize=4096):
+    lines = iter(lines)
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= sampleSize:
+            break
+    encoding, confidence = DetectKurdishEncoding("".join(buffer), sampleSize)
+    converter = legacy_converters.get(encoding)
+    previous = None
+    for line in itertools.chain(buffer, lines):
+        if previous is not None:
+            yield convert_line(previous, converter, False)
+        previous = line
+    if previous is not None:
+        yield convert_line(previous, converter, True)
+
+# same as the line in the converted whole text ("$" of the rules only matches at the end of the last line)
+def convert_line(line, converter, isLast):
+    if converter is None:
+        return line
+    if isLast or not line.endswith("\n"):
+        return converter(line)
+    return converter(line + "#")[:-1]
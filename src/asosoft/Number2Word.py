@@ -1,26 +1,65 @@
 import re
+from functools import lru_cache
+from .CharTranslation import translate_by_list
+from .Patterns import compile_pattern
+from .Tokenizer import apply_around, number_pattern
+from .Alignment import identity, sub_aligned, translate_aligned, spread_aligned
 # converts numerals into Central Kurdish words. It is useful in text-to-speech tools.
 
 def Number2Word(text):
     # convert numbers to latin
     text = latinize_numbers(text)
+    # a plain integer (e.g. a year or a price) needs no normalization
+    if text.isascii() and text.isdigit():
+        return integer_name(text)
     # normalization steps
-    text = re.sub("([0-9]{1,3})[,،](?=[0-9]{3})", r"\1", text)  # remove thousand separator 12,345,678 => 12345678
-    text = re.sub("(?<![0-9])-([0-9]+)", r"ناقس \1", text)  # negative
-    text = re.sub("(?<![0-9])% ?([0-9]+)", r"لە سەددا \1", text)  # percent sign before
-    text = re.sub("([0-9]+) ?%", r"\1 لە سەد", text)  # percent sign after
-    text = re.sub(r"\$ ?([0-9]+(\.[0-9]+)?)", r"\1 دۆلار", text)  # $ currency
-    text = re.sub(r"£ ?([0-9]+(\.[0-9]+)?)", r"\1 پاوەن", text)  # £ currency
-    text = re.sub(r"€ ?([0-9]+(\.[0-9]+)?)", r"\1 یۆرۆ", text)  # € currency
+    for pattern, replacement in number_normalization:
+        text = pattern.sub(replacement, text)
 
     # convert float numbers
-    text = re.sub(r"([0-9]+)\.([0-9]+)", lambda m: float_name(m.group(1), m.group(2)), text)
+    text = float_number.sub(lambda m: float_name(m.group(1), m.group(2)), text)
 
     # convert remaining integer numbers
-    text = re.sub("([0-9]+)", lambda m: integer_name(m.group(1)), text)
+    text = integer_number.sub(lambda m: integer_name(m.group(1)), text)
 
     return text
 
+# Number2Word with the alignment of the output to the text: (output, offsets) (see Alignment.py)
+def Number2WordAligned(text, offsets=None):
+    text = str(text)
+    offsets = identity(len(text)) if offsets is None else offsets
+    text, offsets = translate_aligned(text, unify_numbers, re, offsets)
+    if text.isascii() and text.isdigit():
+        return spread_aligned(text, integer_name(text), offsets)
+    for pattern, replacement in number_normalization:
+        text, offsets = sub_aligned(pattern, replacement, text, offsets)
+    text, offsets = sub_aligned(float_number, lambda m: float_name(m.group(1), m.group(2)), text, offsets)
+    return sub_aligned(integer_number, lambda m: integer_name(m.group(1)), text, offsets)
+
+# Token-stream form of Number2Word (tokens of Tokenize)
+# (the left context covers chained currency signs, e.g. "€ £ $5")
+def Number2WordTokens(tokens):
+    return apply_around(tokens, number_pattern, Number2Word, 5, 2)
+
+# Converts a batch (list, column, generator, ...) of numbers or texts; e.g. [12, "4.5", "-3"] => ["دوازدە", ...]
+def Number2WordBatch(numbers):
+    for number in numbers:
+        yield Number2Word(number)
+
+number_normalization = [
+    (compile_pattern("([0-9]{1,3})[,،](?=[0-9]{3})", re), r"\1"),  # remove thousand separator 12,345,678 => 12345678
+    (compile_pattern("(?<![0-9])-([0-9]+)", re), r"ناقس \1"),  # negative
+    (compile_pattern("(?<![0-9])% ?([0-9]+)", re), r"لە سەددا \1"),  # percent sign before
+    (compile_pattern("([0-9]+) ?%", re), r"\1 لە سەد"),  # percent sign after
+    (compile_pattern(r"\$ ?([0-9]+(\.[0-9]+)?)", re), r"\1 دۆلار"),  # $ currency
+    (compile_pattern(r"£ ?([0-9]+(\.[0-9]+)?)", re), r"\1 پاوەن"),  # £ currency
+    (compile_pattern(r"€ ?([0-9]+(\.[0-9]+)?)", re), r"\1 یۆرۆ"),  # € currency
+]
+float_number = compile_pattern(r"([0-9]+)\.([0-9]+)", re)
+integer_number = compile_pattern("([0-9]+)", re)
+decimal_zeros = compile_pattern("((?<=0)0|^0)", re)
+digits = compile_pattern("[0-9]", re)
+
 unify_numbers = [
     r"٠|۰", "0",
     r"١|۱", "1",
@@ -33,39 +72,38 @@ unify_numbers = [
     r"٨|۸", "8",
     r"٩|۹", "9"
 ]
-
 def latinize_numbers(text):
-    for i in range(0, len(unify_numbers), 2):
-        text = re.sub(unify_numbers[i], unify_numbers[i + 1], str(text))
-    return text
+    return translate_by_list(str(text), unify_numbers, re)
 
 def float_name(integerPart, decimalPart):
-    point = " پۆینت " + re.sub("((?<=0)0|^0)", " سفر ", decimalPart)
-    point = re.sub("[0-9]", "", point)
+    point = " پۆینت " + decimal_zeros.sub(" سفر ", decimalPart)
+    point = digits.sub("", point)
     return integer_name(integerPart) + point + integer_name(decimalPart)
 
+ones = ["", "یەک", "دوو", "سێ", "چوار", "پێنج", "شەش", "حەوت", "هەشت", "نۆ"]
+teens = ["دە", "یازدە", "دوازدە", "سێزدە", "چواردە", "پازدە", "شازدە", "حەڤدە", "هەژدە", "نۆزدە"]
+tens = ["", "", "بیست", "سی", "چل", "پەنجا", "شەست", "هەفتا", "هەشتا", "نەوەد"]
+hundreds = ["", "سەد", "دووسەد", "سێسەد", "چوارسەد", "پێنسەد", "شەشسەد", "حەوتسەد", "هەشتسەد", "نۆسەد"]
+thousands = ["", " هەزار", " ملیۆن", " ملیار", " تریلیۆن", " کوادرلیۆن", " کوینتیلیۆن"]
+
+def three_digit_name(C, X, I):
+    conjunction1 = " و " if (C != 0) and (X != 0 or I != 0) else ""
+    conjunction2 = " و " if X != 0 and I != 0 else ""
+    if X == 1:
+        return hundreds[C] + conjunction1 + teens[I]
+    return hundreds[C] + conjunction1 + tens[X] + conjunction2 + ones[I]
+
+# names of 0-999 (e.g. "012" => "دوازدە")
+three_digit_names = {f"{n:03}": three_digit_name(n // 100, n // 10 % 10, n % 10) for n in range(1000)}
+
+# common numbers (years, prices, ...) are cached
+@lru_cache(maxsize=10000)
 def integer_name(inputInteger):
     output = ""
     if inputInteger != "0":
-        ones = ["", "یەک", "دوو", "سێ", "چوار", "پێنج", "شەش", "حەوت", "هەشت", "نۆ"]
-        teens = ["دە", "یازدە", "دوازدە", "سێزدە", "چواردە", "پازدە", "شازدە", "حەڤدە", "هەژدە", "نۆزدە"]
-        tens = ["", "", "بیست", "سی", "چل", "پەنجا", "شەست", "هەفتا", "هەشتا", "نەوەد"]
-        hundreds = ["", "سەد", "دووسەد", "سێسەد", "چوارسەد", "پێنسەد", "شەشسەد", "حەوتسەد", "هەشتسەد", "نۆسەد"]
-        thousands = ["", " هەزار", " ملیۆن", " ملیار", " تریلیۆن", " کوادرلیۆن", " کوینتیلیۆن"]
-        temp = inputInteger
-        for i in range(0, len(inputInteger), 3):
-            currentThree = re.search("([0-9]{1,3})$", temp).group(1)
-            temp = temp[:-len(currentThree)]
-            currentThree = currentThree.zfill(3)
-            C = int(currentThree[0])
-            X = int(currentThree[1])
-            I = int(currentThree[2])
-            conjunction1 = " و " if (C != 0) and (X != 0 or I != 0) else ""
-            conjunction2 = " و " if X != 0 and I != 0 else ""
-            if X == 1:
-                currentThree = hundreds[C] + conjunction1 + teens[I]
-            else:
-                currentThree = hundreds[C] + conjunction1 + tens[X] + conjunction2 + ones[I]
+        length = len(inputInteger)
+        for i in range(0, length, 3):
+            currentThree = three_digit_names[inputInteger[max(0, length - i - 3):length - i].zfill(3)]
             M = thousands[int(i / 3)]
             currentThree += M if currentThree != "" else ""
             conjunction3 = "" if output == "" else " و "
@@ -73,4 +111,4 @@ def integer_name(inputInteger):
         output = output.replace("یەک هەزار", "هەزار")
     else:  # if input number = 0
         output = "سفر"
-    return output
\ No newline at end of file
+    return output
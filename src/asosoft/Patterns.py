@@ -0,0 +1,132 @@
+# Registry of the compiled patterns of the library: each pattern is compiled once by compile_pattern() and kept
+# here, not in the caches of re and regex (512 patterns each, which this library alone nearly fills, so the
+# patterns were evicted and compiled again under load).
+# warmup() compiles the pattern tables and loads the resources before serving (e.g. before forking workers);
+# PatternStats() reports the pattern counts and compile times.
+# A pattern can run on the other engine (re <=> regex) when SelectPatternEngines() found it faster with the same
+# matches; the choices are kept in resources/PatternEngines.json (python -m asosoft.bench engines).
+
+import os
+import re
+import json
+import time
+import regex
+
+engines = {"re": re, "regex": regex}
+registry = {}         # (engine name, pattern, flags) => compiled pattern
+compile_seconds = {}  # (engine name, pattern, flags) => seconds
+path = os.path.dirname(__file__)
+engines_file = os.path.join(path, "resources/PatternEngines.json")
+
+# the engine which runs each pattern instead of the given one
+def load_engine_choices(file=engines_file):
+    if not os.path.exists(file):
+        return {}
+    with open(file, 'r', encoding="utf-8") as f:
+        return {(c["engine"], c["pattern"], c["flags"]): c["use"] for c in json.load(f)}
+
+preferred = load_engine_choices()
+
+# Compiled pattern of the engine (the re or regex module)
+def compile_pattern(pattern, engine=regex, flags=0):
+    key = (engine.__name__, pattern, flags)
+    compiled = registry.get(key)
+    if compiled is None:
+        start = time.perf_counter()
+        compiled = engines[preferred.get(key, key[0])].compile(pattern, flags)
+        compile_seconds[key] = time.perf_counter() - start
+        registry[key] = compiled
+    return compiled
+
+# Counts and compile times of the registered patterns
+def PatternStats(slowest=10):
+    counts = {name: 0 for name in engines}
+    for key, compiled in registry.items():
+        counts["regex" if isinstance(compiled, regex.Pattern) else "re"] += 1
+    keys = sorted(compile_seconds, key=compile_seconds.get, reverse=True)[:slowest]
+    return {"patterns": len(registry), "engines": counts, "switched": sum(k in preferred for k in registry),
+            "compileSeconds": sum(compile_seconds.values()),
+            "slowest": [{"engine": k[0], "pattern": k[1], "seconds": compile_seconds[k]} for k in keys]}
+
+# Compiles the patterns and loads the resources of the library (by running each service once on a sample);
+# returns PatternStats() and the seconds of the warm-up
+def warmup():
+    from .Normalize import (Normalize, NormalizeAligned, SeperateDigits, NormalizePunctuations, CleanWebLine,
+                            Word2WordReplacement, UnifyNumerals, AutoConvert2Unicode, normalization_replaces,
+                            numeral_replaces)
+    from .Number2Word import Number2Word
+    from .G2P import KurdishG2P, KurdishG2PAligned
+    from .Transliteration import (Ar2La, Ar2LaSimple, Ar2LaFeryad, Ar2LaAligned, La2Ar, LaDigraph2Ar,
+                                  Phonemes2ASCII, Phonemes2IPA)
+    from .PoemClassifier import ClassifyKurdishPoem
+    from .CharTranslation import translate_by_list
+    start = time.perf_counter()
+    sample = " &amp; ئەی ڕەقیب هەر ماوە قەومی کورد زمان، 12کەس و ٣.٥% $5 info@asosoft.com https://asosoft.com\u200c "
+    for replace_list in normalization_replaces.values():
+        translate_by_list("", replace_list)
+    for numeralType in numeral_replaces:
+        UnifyNumerals(sample, numeralType)
+    for function in [Normalize, NormalizeAligned, SeperateDigits, CleanWebLine, AutoConvert2Unicode, Number2Word,
+                     KurdishG2PAligned, Ar2La, Ar2LaSimple, Ar2LaFeryad, Ar2LaAligned]:
+        function(sample)
+    NormalizePunctuations(sample, True)
+    NormalizePunctuations(sample, False)
+    Word2WordReplacement(sample, {})
+    phonemes = KurdishG2P(sample, True)
+    Phonemes2IPA(phonemes)
+    Phonemes2ASCII(phonemes)
+    La2Ar("çak")
+    LaDigraph2Ar("chak")
+    ClassifyKurdishPoem("ئەی ڕەقیب هەر ماوە قەومی کورد زمان\nنایشکێنێ دانەری تۆپی زەمان")
+    output = PatternStats()
+    output["seconds"] = time.perf_counter() - start
+    return output
+
+# ===== engine selection =====
+# escapes whose meaning differs between re and regex (e.g. \w and \s of some Unicode characters)
+unportable_escapes = re.compile(r"\\[wWsSbBdDpPNXmMGKLVZ]|\[\[:|\(\?[^:=!<>P]")
+
+# Benchmarks the registered patterns on both engines, on the sample texts and on their words (re is often faster
+# on short strings and regex on long ones), and returns the patterns which have the same matches and are faster
+# by at least minGain on the other engine without being slower on the texts or on the words;
+# saved in file if it is given (the choices are loaded when the library is imported)
+def SelectPatternEngines(samples=None, minGain=0.2, repeat=3, file=None):
+    if samples is None:
+        from .bench import corpora
+        # the text corpora (some corpora are token lists)
+        samples = [text for corpus in corpora(True).values() for text in corpus if isinstance(text, str)]
+    groups = [samples, [word for text in samples for word in text.split()]]
+    warmup()
+    choices = []
+    for key in list(registry):
+        name, pattern, flags = key
+        other = "regex" if name == "re" else "re"
+        if flags or unportable_escapes.search(pattern):
+            continue
+        try:
+            current, alternative = engines[name].compile(pattern), engines[other].compile(pattern)
+        except (re.error, regex.error):
+            continue
+        if any(matches(current, text) != matches(alternative, text) for group in groups for text in group):
+            continue
+        before = [pattern_seconds(current, group, repeat) for group in groups]
+        after = [pattern_seconds(alternative, group, repeat) for group in groups]
+        if sum(after) < (1 - minGain) * sum(before) and all(a <= b for a, b in zip(after, before)):
+            choices.append({"engine": name, "pattern": pattern, "flags": flags, "use": other})
+    if file:
+        with open(file, 'w', encoding="utf-8") as f:
+            json.dump(choices, f, ensure_ascii=False, indent=1)
+    return choices
+
+def matches(pattern, text):
+    return [(m.span(), m.groups()) for m in pattern.finditer(text)]
+
+def pattern_seconds(pattern, samples, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in samples:
+            pattern.sub("", text)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
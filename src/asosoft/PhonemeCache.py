@@ -0,0 +1,206 @@
+# Compact word cache of G2P (grapheme word => phonemes): an optional replacement of the dict G2P.history.
+# The entries are packed in one bytearray arena: [flags][key length][value length][key][value], where the key
+# (Kurdish letters) and the value (phonemes and ˈ ʔ ¶) are one byte per character through fixed symbol tables
+# (UTF-8 if a character is not in the table). The entries are found by an open-addressing hash index
+# (array of 4-byte offsets), so the entry of a common word takes about 50 bytes instead of about 240 bytes
+# (a dict slot and two str objects).
+# A changed or deleted entry leaves dead bytes in the arena; the arena is compacted when they are half of it.
+# The cache is thread-safe (a lock around the lookups and the updates, as a resize replaces the index and the arena).
+
+import threading
+from array import array
+from .Tokenizer import ku
+
+# fixed symbol tables; code 0 is not used
+phoneme_symbols = "ˈʔƹ¶" + "aeêouûiîüȯėôõ" + "bptcçḧxdrřzjsşẍfvqkglłmnwhyĝđŵ" + "abcdefghijklmnopqrstuvwxyz"
+grapheme_symbols = ku + "ڎڴ"
+
+def symbol_tables(symbols):
+    symbols = list(dict.fromkeys(symbols))
+    encode = {ord(ch): i + 1 for i, ch in enumerate(symbols)}
+    # the other ASCII characters are mapped to a non-ASCII character (so they are stored as UTF-8)
+    encode.update({i: 0x100 for i in range(128) if i not in encode and chr(i) not in symbols})
+    decode = {i + 1: ord(ch) for i, ch in enumerate(symbols)}
+    return encode, decode
+
+phoneme_encode, phoneme_decode = symbol_tables(phoneme_symbols)
+grapheme_encode, grapheme_decode = symbol_tables(grapheme_symbols)
+
+# returns (is UTF-8, bytes)
+def pack(text, table):
+    packed = text.translate(table)
+    if packed.isascii():
+        return False, packed.encode("ascii")
+    return True, text.encode("utf-8")
+
+def unpack(data, utf8, table):
+    return data.decode("utf-8") if utf8 else data.decode("ascii").translate(table)
+
+header = 5          # flags (1 byte), key length (2 bytes), value length (2 bytes)
+max_length = 0xFFFF  # longer entries are kept in a dict
+empty, deleted = 0, -1
+
+min_compaction = 1 << 16  # smaller arenas are not compacted for the dead bytes
+
+class PhonemeCache:
+    def __init__(self, items=()):
+        self.lock = threading.RLock()
+        self.clear()
+        self.update(items)
+
+    def clear(self):
+        with self.lock:
+            self.arena = bytearray()
+            self.index = array("i", [empty]) * 1024  # offset + 1 of each entry
+            self.count = 0
+            self.used = 0        # count of the non-empty slots (including deleted)
+            self.dead = 0        # bytes of the changed and deleted entries in the arena
+            self.overflow = {}   # very long entries
+
+    def __len__(self):
+        return self.count + len(self.overflow)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        keyUtf8, packedKey = pack(key, grapheme_encode)
+        with self.lock:
+            if key in self.overflow:
+                return self.overflow[key]
+            slot = self.find(key, keyUtf8, packedKey)[0]
+            if self.index[slot] <= 0:
+                return default
+            offset = self.index[slot] - 1
+            flags = self.arena[offset]
+            keyLength = int.from_bytes(self.arena[offset + 1:offset + 3], "little")
+            valueLength = int.from_bytes(self.arena[offset + 3:offset + 5], "little")
+            start = offset + header + keyLength
+            data = bytes(self.arena[start:start + valueLength])
+        return unpack(data, flags & 2, phoneme_decode)
+
+    def __setitem__(self, key, value):
+        keyUtf8, packedKey = pack(key, grapheme_encode)
+        valueUtf8, packedValue = pack(value, phoneme_encode)
+        with self.lock:
+            if len(packedKey) > max_length or len(packedValue) > max_length:
+                self.pop(key, None)
+                self.overflow[key] = value
+                return
+            self.overflow.pop(key, None)
+            self.store(key, keyUtf8, packedKey, valueUtf8, packedValue)
+            if self.used * 3 >= len(self.index) * 2 or self.dead * 2 > max(len(self.arena), min_compaction):
+                self.resize()
+
+    def store(self, key, keyUtf8, packedKey, valueUtf8, packedValue):
+        slot, free = self.find(key, keyUtf8, packedKey)
+        if self.index[slot] > 0:
+            # a changed entry is appended again (the old bytes are dead)
+            self.dead += self.entry_size(self.index[slot] - 1)
+        else:
+            slot = free if free is not None else slot
+            if self.index[slot] == empty:
+                self.used += 1
+            self.count += 1
+        self.index[slot] = len(self.arena) + 1
+        self.arena.append(keyUtf8 | valueUtf8 << 1)
+        self.arena += len(packedKey).to_bytes(2, "little") + len(packedValue).to_bytes(2, "little")
+        self.arena += packedKey + packedValue
+
+    def __delitem__(self, key):
+        keyUtf8, packedKey = pack(key, grapheme_encode)
+        with self.lock:
+            if key in self.overflow:
+                del self.overflow[key]
+                return
+            slot = self.find(key, keyUtf8, packedKey)[0]
+            if self.index[slot] <= 0:
+                raise KeyError(key)
+            self.dead += self.entry_size(self.index[slot] - 1)
+            self.index[slot] = deleted
+            self.count -= 1
+            if self.dead * 2 > max(len(self.arena), min_compaction):
+                self.resize()
+
+    def pop(self, key, *default):
+        with self.lock:
+            value = self.get(key)
+            if value is None:
+                if default:
+                    return default[0]
+                raise KeyError(key)
+            del self[key]
+            return value
+
+    def update(self, items=()):
+        if hasattr(items, "items"):
+            items = items.items()
+        for key, value in items:
+            self[key] = value
+
+    def keys(self):
+        return [key for key, value in self.items()]
+
+    def items(self):
+        with self.lock:
+            output = [self.entry(offset - 1) for offset in self.index if offset > 0]
+            return output + list(self.overflow.items())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def entry(self, offset):
+        flags = self.arena[offset]
+        keyLength = int.from_bytes(self.arena[offset + 1:offset + 3], "little")
+        valueLength = int.from_bytes(self.arena[offset + 3:offset + 5], "little")
+        start = offset + header
+        key = unpack(bytes(self.arena[start:start + keyLength]), flags & 1, grapheme_decode)
+        value = unpack(bytes(self.arena[start + keyLength:start + keyLength + valueLength]), flags & 2, phoneme_decode)
+        return key, value
+
+    def entry_size(self, offset):
+        keyLength = int.from_bytes(self.arena[offset + 1:offset + 3], "little")
+        valueLength = int.from_bytes(self.arena[offset + 3:offset + 5], "little")
+        return header + keyLength + valueLength
+
+    # (slot of the key or the empty slot where the probe stopped, first deleted slot on the way)
+    def find(self, key, utf8, packedKey):
+        mask = len(self.index) - 1
+        slot = hash(key) & mask
+        free = None
+        length = len(packedKey)
+        while True:
+            offset = self.index[slot]
+            if offset == empty:
+                return slot, free
+            if offset == deleted:
+                if free is None:
+                    free = slot
+            else:
+                offset -= 1
+                if (self.arena[offset] & 1) == utf8 and int.from_bytes(self.arena[offset + 1:offset + 3], "little") == length \
+                        and self.arena[offset + header:offset + header + length] == packedKey:
+                    return slot, free
+            slot = (slot + 1) & mask
+
+    # a compacted arena (and a larger index when the index is 2/3 full); called with the lock held
+    def resize(self):
+        entries = [self.entry(offset - 1) for offset in self.index if offset > 0]
+        size = len(self.index)
+        while len(entries) * 3 >= size:
+            size *= 2
+        self.arena = bytearray()
+        self.index = array("i", [empty]) * size
+        self.count = self.used = self.dead = 0
+        for key, value in entries:
+            self.store(key, *pack(key, grapheme_encode), *pack(value, phoneme_encode))
+
+    # bytes used by the arena and the index
+    def nbytes(self):
+        return len(self.arena) + self.index.itemsize * len(self.index)
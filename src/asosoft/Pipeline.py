@@ -0,0 +1,234 @@
+# Text-processing pipeline: a list of stages (e.g. ReplaceHtmlEntity => Normalize => SeperateDigits => TrimLine)
+# which is compiled once and applied on strings, iterables of strings or files.
+# The adjacent replace-list stages (e.g. the replace lists of Normalize, SeperateDigits, NormalizePunctuations
+# and UnifyNumerals) are fused into one compiled list. The output is the same as calling the functions one by one.
+# run_aligned(text) also returns the alignment of the output to the text (see Alignment.py).
+# A Pipeline is picklable (only its stages are pickled and it is compiled again), so it can be built once per worker.
+
+import os
+import time
+import regex
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from .CharTranslation import compile_replace_list
+from .Normalize import (Normalize, SeperateDigits, NormalizePunctuations, TrimLine, ReplaceHtmlEntity, ReplaceUrlEmail, CleanWebLine,
+                        Char2CharReplacment, Word2WordReplacement, UnifyNumerals, AliK2Unicode, AliWeb2Unicode,
+                        Dylan2Unicode, Zarnegar2Unicode, AutoConvert2Unicode, normalize_chars, normalization_replaces,
+                        numeral_replaces, url_email_replaces, NormalizeAligned, normalize_punctuations_aligned,
+                        trim_line_aligned, replace_html_entity_aligned)
+from .Number2Word import Number2Word, Number2WordAligned
+from .G2P import KurdishG2P, KurdishG2PAligned
+from .Alignment import identity, compose, translate_aligned, spread_aligned
+from .Transliteration import Ar2LaAligned, Ar2La, Ar2LaFeryad, Ar2LaSimple, La2Ar, LaDigraph2Ar, Phonemes2ASCII, Phonemes2Hawar, Phonemes2IPA
+
+# stages which can be given by name; a stage is a name or a function (text => text),
+# or a tuple of it and its arguments after the text, e.g. ("UnifyNumerals", "en")
+stage_functions = {f.__name__: f for f in [
+    Normalize, SeperateDigits, NormalizePunctuations, TrimLine, ReplaceHtmlEntity, ReplaceUrlEmail, CleanWebLine,
+    Char2CharReplacment, Word2WordReplacement, UnifyNumerals, AliK2Unicode, AliWeb2Unicode, Dylan2Unicode,
+    Zarnegar2Unicode, AutoConvert2Unicode, Number2Word, KurdishG2P, Ar2La, Ar2LaFeryad, Ar2LaSimple, La2Ar,
+    LaDigraph2Ar, Phonemes2ASCII, Phonemes2Hawar, Phonemes2IPA]}
+
+# ===== stages as replace lists (list) and other steps (function) =====
+def normalize_parts(isOnlyKurdish=True, changeInitialR=True, deepUnicodeCorrectios=True, additionalUnicodeCorrections=True, usersReplaceList=None):
+    replace_list = list(normalization_replaces["NormalizeKurdish1"])
+    if isOnlyKurdish:
+        replace_list += normalization_replaces["NormalizeKurdish2"]
+        if changeInitialR:
+            replace_list += normalization_replaces["NormalizeKurdish3"]
+    chars = lambda text: normalize_chars(text, deepUnicodeCorrectios, additionalUnicodeCorrections, usersReplaceList)
+    return [chars, replace_list]
+
+def punctuation_parts(seprateAllPunctuations):
+    replace_list = ['"', "\uF8FD"]  # temp replacement
+    replace_list += normalization_replaces["NormalizePunctuations1"]
+    replace_list += normalization_replaces["NormalizePunctuations3" if seprateAllPunctuations else "NormalizePunctuations2"]
+    replace_list += ["\uF8FD", '"']  # undo temp replacement
+    return [replace_list, str.strip]
+
+stage_parts = {
+    "Normalize": normalize_parts,
+    "NormalizePunctuations": punctuation_parts,
+    "SeperateDigits": lambda: [normalization_replaces["SeperateDigits"]],
+    "ReplaceUrlEmail": lambda: [url_email_replaces],
+    "UnifyNumerals": lambda NumeralType: [numeral_replaces.get(NumeralType, [])],
+    "AliK2Unicode": lambda: [normalization_replaces["AliK2Unicode"]],
+    "AliWeb2Unicode": lambda: [normalization_replaces["AliWeb2Unicode"]],
+    "Dylan2Unicode": lambda: [normalization_replaces["Dylan2Unicode"]],
+    "Zarnegar2Unicode": lambda: [normalization_replaces["Zarnegar2Unicode"]],
+}
+
+# aligned forms of the stages: text, args => (output, offsets); the other replace-list stages are aligned rule by rule
+# and the output of any other stage is spread over its input
+aligned_functions = {
+    "Normalize": NormalizeAligned,
+    "NormalizePunctuations": lambda text, seprateAllPunctuations: normalize_punctuations_aligned(text, identity(len(text)), seprateAllPunctuations),
+    "TrimLine": lambda text: trim_line_aligned(text, identity(len(text))),
+    "ReplaceHtmlEntity": lambda text: replace_html_entity_aligned(text, identity(len(text))),
+    "Number2Word": Number2WordAligned,
+    "KurdishG2P": KurdishG2PAligned,
+    "Ar2La": Ar2LaAligned,
+    "Ar2LaSimple": lambda text: Ar2LaAligned(text, "Simple"),
+    "Ar2LaFeryad": lambda text: Ar2LaAligned(text, "Feryad"),
+}
+
+class Pipeline:
+    def __init__(self, stages, timing=False):
+        self.stages = [stage if isinstance(stage, tuple) else (stage,) for stage in stages]
+        self.timing = timing
+        self.steps = compile_stages(self.stages)
+        self.reset_timings()
+
+    def __repr__(self):
+        return f"Pipeline({[stage_name(stage[0]) for stage in self.stages]!r})"
+
+    # only the stages are pickled; the steps are compiled again
+    def __getstate__(self):
+        return {"stages": self.stages, "timing": self.timing}
+
+    def __setstate__(self, state):
+        self.__init__(state["stages"], state["timing"])
+
+    def __call__(self, text):
+        if self.timing:
+            return self.run_timed(text)
+        for name, step in self.steps:
+            text = step(text)
+        return text
+
+    def run_timed(self, text):
+        for name, step in self.steps:
+            start = time.perf_counter()
+            text = step(text)
+            self.timings[name] += time.perf_counter() - start
+        self.count += 1
+        return text
+
+    # Returns (output, offsets): offsets[i] is the position in the text of the i-th output character
+    # (the output is the same as pipeline(text); the replace lists are not fused)
+    def run_aligned(self, text):
+        offsets = identity(len(text))
+        for stage in self.stages:
+            function, args = stage[0], stage[1:]
+            name = stage_name(function)
+            if isinstance(function, str):
+                function = stage_functions[name]
+            if function is stage_functions.get(name) and name in aligned_functions:
+                text, local = aligned_functions[name](text, *args)
+                offsets = compose(offsets, local)
+            elif function is stage_functions.get(name) and name in stage_parts:
+                for replace_list in stage_parts[name](*args):
+                    text, offsets = translate_aligned(text, replace_list, regex, offsets)
+            else:
+                text, offsets = spread_aligned(text, function(text, *args), offsets)
+        return text, offsets
+
+    # seconds spent in each (fused) step, e.g. {"ReplaceHtmlEntity": 0.1, "Normalize+SeperateDigits": 0.4, ...}
+    def reset_timings(self):
+        self.timings = {name: 0.0 for name, step in self.steps}
+        self.count = 0
+
+    def map(self, texts):
+        for text in texts:
+            yield self(text)
+
+    # Processes the lines of a text file; returns the number of lines
+    def run_file(self, src, dst, encoding="utf-8"):
+        count = 0
+        with open(src, 'r', encoding=encoding) as file, open(dst, 'w', encoding=encoding, newline='\n') as output:
+            for line in file:
+                output.write(self(line.rstrip("\n")) + "\n")
+                count += 1
+        return count
+
+    # Processes the texts in worker processes (in chunks, in the input order); the pipeline is sent once to each worker
+    def map_parallel(self, texts, workers=None, chunkSize=256):
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers, initializer=set_worker_pipeline, initargs=(self,)) as executor:
+            pending = deque()
+            for chunk in chunks(texts, chunkSize):
+                pending.append(executor.submit(run_worker_chunk, chunk))
+                if len(pending) > 2 * workers:
+                    yield from self.collect(pending.popleft().result())
+            while pending:
+                yield from self.collect(pending.popleft().result())
+
+    def collect(self, result):
+        outputs, timings = result
+        if self.timing:
+            for name, seconds in timings.items():
+                self.timings[name] += seconds
+            self.count += len(outputs)
+        return outputs
+
+def stage_name(function):
+    return function if isinstance(function, str) else function.__name__
+
+# fuses the adjacent replace lists into one compiled list: [(name, step), ...]
+def compile_stages(stages):
+    steps = []
+    names = []
+    replace_list = []
+    for stage in stages:
+        function, args = stage[0], stage[1:]
+        name = stage_name(function)
+        if isinstance(function, str):
+            if name not in stage_functions:
+                raise ValueError(f"unknown stage {name!r}")
+            function = stage_functions[name]
+        if name in stage_parts and function is stage_functions[name]:
+            parts = stage_parts[name](*args)
+        else:
+            parts = [stage_step(function, args)]
+        for part in parts:
+            if isinstance(part, list):
+                if not names or names[-1] != name:
+                    names.append(name)
+                replace_list += part
+                continue
+            if names:
+                steps.append(("+".join(names), replace_list_step(replace_list)))
+                names, replace_list = [], []
+            steps.append((name, part))
+    if names:
+        steps.append(("+".join(names), replace_list_step(replace_list)))
+    # the names of the steps are unique (for timings)
+    seen = {}
+    for i, (name, step) in enumerate(steps):
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            steps[i] = (f"{name}#{seen[name]}", step)
+    return steps
+
+def stage_step(function, args):
+    if not args:
+        return function
+    return lambda text: function(text, *args)
+
+def replace_list_step(replace_list):
+    compiled = compile_replace_list(replace_list, regex)
+    def step(text):
+        for s in compiled:
+            text = s(text)
+        return text
+    return step
+
+def chunks(items, size):
+    items = iter(items)
+    chunk = list(islice(items, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, size))
+
+# ===== worker processes =====
+worker_pipeline = None
+
+def set_worker_pipeline(pipeline):
+    global worker_pipeline
+    worker_pipeline = pipeline
+
+def run_worker_chunk(texts):
+    worker_pipeline.reset_timings()
+    outputs = [worker_pipeline(text) for text in texts]
+    return outputs, dict(worker_pipeline.timings)
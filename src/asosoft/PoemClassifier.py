@@ -15,19 +15,22 @@
 
 import os
 import re
-from .G2P import KurdishG2P
+from collections import Counter, OrderedDict
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from . import G2P
+from .G2P import KurdishG2P, G2P_prepare, G2P_words, words_G2P, ku
+from .Patterns import compile_pattern
 
 def ClassifyKurdishPoem(poem):
-    normalized = poem_normalization(poem)
-    syllabified = KurdishG2P(normalized, convertNumbersToWord=True, backMergeConjunction=True, singleOutputPerWord=True).split('\n')
-    classified = poem_classification(syllabified)
-    return classified
+    return default_classifier().classify(poem)
 
 class Pattern:
     def __init__(self):
         self.freq = 0
         self.weights = ""
         self.title = ""
+        self.masks = {}  # bit mask of positions for each weight (used by dist_weights)
 
 class ScannedHemistich:
     def __init__(self):
@@ -36,21 +39,6 @@ class ScannedHemistich:
         self.meterID = 0
         self.dist = 0
 
-class ResultSet:
-    def __init__(self):
-        self.syllabic = 0
-        self.syllabicConfidence = 0.0
-        self.quantitative = ""
-        self.quantitativeConfidence = 0.0
-        self.overalPattern = ""
-        self.overalMeterType = ""
-        self.details = []
-class Pattern:
-    def __init__(self):
-        self.freq = 0
-        self.weights = ""
-        self.title = ""
-
 class ResultSet:
     def __init__(self):
         self.syllabic = 0
@@ -66,103 +54,389 @@ CommonPatterns = []
 path = os.path.dirname(__file__)
 
 def load_poem_patterns():
+    CommonPatterns.extend(read_poem_patterns())
+
+def read_poem_patterns():
+    output = []
     with open(os.path.join(path, "resources/PoemPatterns.csv"), 'r', encoding="utf-8") as file:
         PoemPatterns = file.readlines()
     for i in range(1, len(PoemPatterns)):
         item = PoemPatterns[i].strip().split(',')
-        CommonPatterns.append(Pattern())
-        CommonPatterns[-1].freq = int(item[0])
-        CommonPatterns[-1].weights = item[1]
-        CommonPatterns[-1].title = item[2]
+        output.append(make_pattern(int(item[0]), item[1], item[2]))
+    return output
+
+def make_pattern(freq, weights, title):
+    pattern = Pattern()
+    pattern.freq = freq
+    pattern.weights = weights
+    pattern.title = title
+    pattern.masks = compile_weights(weights)
+    return pattern
 
 max_dist = 4
-patternScores = [0] * 27
+scans_size = 1 << 18  # pattern matches of the most recently used hemistiches
+max_expanded_paths = 32
+patternScores = [0] * 27  # patternScores of the last poem of ClassifyKurdishPoem (the default classifier)
 
-# Classifies the input Kurdish poem
+# Classifies the input Kurdish poem (lines of syllabified hemistiches)
 def poem_classification(sHemistiches):
-    if len(CommonPatterns) == 0:
-        load_poem_patterns()
-    patternScores.clear()
-    patternScores.extend([0] * 27)
-    output = ResultSet()
-    #===== syallabic analysis
-    syllableCounts = []
-    for i in range(len(sHemistiches)):
-        sCount = len(sHemistiches[i].split('ˈ')) - 1
-        if sCount > 0:
-            syllableCounts.append(sCount)
-    HemistichesCount = len(syllableCounts)
-    mode = max(set(syllableCounts), key = syllableCounts.count)
-    output.syllabic = mode
-    output.syllabicConfidence = (syllableCounts.count(mode) / HemistichesCount) * 100
-
-    #===== quantitative analysis
-    AcceptableCandidates = []
-    for i in range(len(sHemistiches)):
-        AcceptableCandidates.extend(pattern_match(convert_to_CV(sHemistiches[i]), i))
-
-    highScore = patternScores.index(max(patternScores))
-    output.quantitative = CommonPatterns[highScore].title
-    output.quantitativeConfidence = ((patternScores[highScore] / max_dist) / HemistichesCount) * 100
+    return default_classifier().classify_syllabified(sHemistiches)
+
+# ===== Poem classifier =====
+# Keeps its own patterns and caches, so it can be used from several threads.
+# classify_many() classifies a batch of poems: G2P of the new words and pattern matching of the new
+# hemistiches run once for the whole batch (in a process pool when workers > 1).
+class PoemClassifier:
+    def __init__(self, patterns=None, maxDist=max_dist):
+        self.patterns = read_poem_patterns() if patterns is None else patterns
+        self.maxDist = maxDist
+        self.scans = OrderedDict()  # syllabified hemistich => [(meterID, dist, scanned), ...]; LRU of scans_size
+
+    def classify(self, poem):
+        return self.classify_syllabified([hemistich_G2P(*h) for h in poem_hemistiches(poem)])
+
+    def classify_many(self, poems, workers=None, chunkSize=256):
+        return [self.classify_syllabified(syllabified) for syllabified in self.syllabify_many(poems, workers, chunkSize)]
+
+    # syllabified hemistiches of each poem (their pattern matches are cached in self.scans)
+    def syllabify_many(self, poems, workers=None, chunkSize=256):
+        poems = [poem_hemistiches(poem) for poem in poems]
+        hemistiches = list(dict.fromkeys(h for poem in poems for h in poem))
+        executor = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+        try:
+            if executor:
+                # G2P of the new words in the workers, merged into the shared word cache
+                words = {w for h in hemistiches for w in G2P_words(hemistich_text(*h), True)}
+                words = [w for w in words if w not in G2P.history]
+                for entries in executor.map(words_G2P, chunks(words, chunkSize)):
+                    G2P.history.update(entries)
+            syllabified = {h: hemistich_G2P(*h) for h in hemistiches}
+            if executor:
+                # pattern matching of the new hemistiches in the workers
+                new = [s for s in dict.fromkeys(syllabified.values()) if s not in self.scans]
+                weights = [pattern.weights for pattern in self.patterns]
+                jobs = chunks(new, chunkSize)
+                for job, scans in zip(jobs, executor.map(scan_hemistiches, jobs, repeat(weights), repeat(self.maxDist))):
+                    self.scans.update(zip(job, scans))
+                while len(self.scans) > scans_size:
+                    self.scans.popitem(last=False)
+        finally:
+            if executor:
+                executor.shutdown()
+        return [[syllabified[h] for h in poem] for poem in poems]
+
+    # matches of the patterns for a syllabified hemistich
+    def scan(self, syllabified):
+        matches = self.scans.get(syllabified)
+        if matches is not None:
+            try:
+                self.scans.move_to_end(syllabified)
+            except KeyError:  # removed by another thread meanwhile
+                pass
+            return matches
+        matches = self.scans[syllabified] = match_patterns(convert_to_CV_lattice(syllabified), self.patterns, self.maxDist)
+        while len(self.scans) > scans_size:
+            self.scans.popitem(last=False)
+        return matches
+
+    def classify_syllabified(self, sHemistiches):
+        scans = [self.scan(h) for h in sHemistiches]
+        syllableCounts = Counter()
+        for i in range(len(sHemistiches)):
+            sCount = len(sHemistiches[i].split('ˈ')) - 1
+            if sCount > 0:
+                syllableCounts[sCount] += 1
+        scores = [0] * len(self.patterns)
+        for matches in scans:
+            for meterID, dist, scanned in matches:
+                scores[meterID] += self.maxDist - dist
+        if self is classifier:
+            patternScores[:] = scores
+        return self.result(syllableCounts, scores, scans)
+
+    # ResultSet of a poem from its statistics
+    #   syllableCounts: syllable count => number of hemistiches
+    #   patternScores: sum of (maxDist - dist) of each pattern
+    #   scans: matches of the patterns for each hemistich
+    def result(self, syllableCounts, patternScores, scans):
+        output, highScore = self.summary(syllableCounts, patternScores)
+        output.details = self.details(scans, highScore)
+        return output
+
+    # ResultSet without its details, and the meterID of the quantitative pattern
+    def summary(self, syllableCounts, patternScores, output=None):
+        output = ResultSet() if output is None else output
+        #===== syallabic analysis
+        HemistichesCount = sum(syllableCounts.values())
+        mode = max(set(syllableCounts), key = syllableCounts.get)
+        output.syllabic = mode
+        output.syllabicConfidence = (syllableCounts[mode] / HemistichesCount) * 100
+
+        #===== quantitative analysis
+        highScore = patternScores.index(max(patternScores))
+        output.quantitative = self.patterns[highScore].title
+        output.quantitativeConfidence = ((patternScores[highScore] / self.maxDist) / HemistichesCount) * 100
+
+        # ===== overal poem classification
+        stdDev = counts_standard_deviation(syllableCounts)
+        metricalMargin = 40 if output.syllabic > 10 else 50
+        stdDevMargin = output.syllabic / 10
+        if stdDev > stdDevMargin:
+            output.overalMeterType = "Free Verse/شیعری نوێ"
+        elif output.quantitativeConfidence >= metricalMargin:
+            output.overalMeterType = "Quantitative/عەرووزی"
+            output.overalPattern = output.quantitative
+        elif output.syllabicConfidence >= 40 and stdDev < 1:
+            output.overalMeterType = "Syllabic/بڕگەیی"
+            output.overalPattern = str(output.syllabic) + "Syllabic"
+
+        return output, highScore
 
     #===== final output for each hemistich
-    final = []
-    for i in range(len(sHemistiches)):
-        highScoreMatches = [x for x in AcceptableCandidates if x.lineNo == i and x.meterID == highScore]
-        if len(highScoreMatches) > 0:
-            final.append(highScoreMatches[0])
-        else:
+    def details(self, scans, highScore):
+        final = []
+        for i in range(len(scans)):
             final.append(ScannedHemistich())
-    output.details = final
-
-    # ===== overal poem classification
-    stdDev = calculate_standard_deviation(syllableCounts)
-    metricalMargin = 40 if output.syllabic > 10 else 50
-    stdDevMargin = output.syllabic / 10
-    if stdDev > stdDevMargin:
-        output.overalMeterType = "Free Verse/شیعری نوێ"
-    elif output.quantitativeConfidence >= metricalMargin:
-        output.overalMeterType = "Quantitative/عەرووزی"
-        output.overalPattern = output.quantitative
-    elif output.syllabicConfidence >= 40 and stdDev < 1:
-        output.overalMeterType = "Syllabic/بڕگەیی"
-        output.overalPattern = str(output.syllabic) + "Syllabic"
-    
+            for meterID, dist, scanned in scans[i]:
+                if meterID == highScore:
+                    final[-1].lineNo = i
+                    final[-1].scanned = scanned
+                    final[-1].meterID = meterID
+                    final[-1].dist = dist
+        return final
+
+# ResultSet whose details are built when they are first read (from the entries of a PoemSession)
+class SessionResult(ResultSet):
+    def __init__(self, classifier, entries):
+        super().__init__()
+        self.classifier = classifier
+        self.entries = entries
+        self.highScore = 0
+        self.built = None
+
+    @property
+    def details(self):
+        if self.built is None:
+            self.built = self.classifier.details([entry[2] if entry else [] for entry in self.entries], self.highScore)
+        return self.built
+
+    @details.setter
+    def details(self, value):
+        self.built = value
+
+# ===== Incremental classification =====
+# A poem which is edited line by line (e.g. in a poetry editor). On each edit, G2P and pattern matching
+# run only for the changed line and its neighbours (their G2P depends on each other);
+# the syllable counts and patternScores of the poem are updated by the difference.
+# result() is the same as ClassifyKurdishPoem of the lines joined by '\n'; it takes O(patterns), and its details
+# are built when they are first read. A line with '\n' is inserted as several lines.
+class PoemSession:
+    def __init__(self, poem=None, classifier=None):
+        self.classifier = default_classifier() if classifier is None else classifier
+        self.lines = []     # normalized lines
+        self.entries = []   # (G2P key, syllable count, scans) of each line; None for blank lines around the poem
+        self.start = 0      # the poem is lines[start:end] (i.e. it is stripped)
+        self.end = 0
+        self.syllableCounts = Counter()
+        self.patternScores = [0] * len(self.classifier.patterns)
+        if poem is not None:
+            self.extend(poem.split('\n'))
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        return self.lines[index]
+
+    def __setitem__(self, index, line):
+        self.replace(index, line)
+
+    def __delitem__(self, index):
+        self.remove(index)
+
+    def append(self, line):
+        self.insert(len(self.lines), line)
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def insert(self, index, line):
+        index = max(0, min(len(self.lines), index + len(self.lines) if index < 0 else index))
+        self.edit(index, 0, line)
+
+    def replace(self, index, line):
+        self.edit(self.position(index), 1, line)
+
+    def remove(self, index):
+        self.edit(self.position(index), 1, None)
+
+    def position(self, index):
+        if not -len(self.lines) <= index < len(self.lines):
+            raise IndexError("line index out of range")
+        return index % len(self.lines)
+
+    def result(self):
+        syllableCounts = self.syllableCounts
+        top = max(syllableCounts.values(), default=0)
+        if list(syllableCounts.values()).count(top) > 1:
+            # a tie of the syllabic mode depends on the order of the lines (as in ClassifyKurdishPoem)
+            syllableCounts = Counter(entry[1] for entry in self.entries if entry and entry[1] > 0)
+        output = SessionResult(self.classifier, self.entries[self.start:self.end])
+        output.highScore = self.classifier.summary(syllableCounts, self.patternScores, output)[1]
+        return output
+
+    # replaces `removed` lines at index with the lines of line (None: nothing)
+    def edit(self, index, removed, line):
+        inserted = [] if line is None else poem_normalization(line).split('\n')
+        shift = len(inserted) - removed
+        old = [i if i < index else max(index, i + shift) for i in (self.start, self.end)]
+        for entry in self.entries[index:index + removed]:
+            self.count(entry, -1)
+        self.lines[index:index + removed] = inserted
+        self.entries[index:index + removed] = [None] * len(inserted)
+
+        self.start = 0
+        while self.start < len(self.lines) and not self.lines[self.start].strip():
+            self.start += 1
+        self.end = len(self.lines)
+        while self.end > self.start and not self.lines[self.end - 1].strip():
+            self.end -= 1
+        # the edited lines, their neighbours and the lines between the old and new bounds of the poem
+        dirty = set(range(index - 1, index + len(inserted) + 1))
+        dirty.update(range(min(old[0], self.start), max(old[0], self.start) + 1))
+        dirty.update(range(min(old[1], self.end) - 1, max(old[1], self.end) + 1))
+        for i in dirty:
+            if 0 <= i < len(self.lines):
+                self.refresh(i)
+
+    def refresh(self, i):
+        key = self.key(i)
+        entry = self.entries[i]
+        if (entry[0] if entry else None) != key:
+            self.count(entry, -1)
+            if key is None:
+                entry = None
+            else:
+                syllabified = hemistich_G2P(*key)
+                entry = (key, len(syllabified.split('ˈ')) - 1, self.classifier.scan(syllabified))
+            self.entries[i] = entry
+            self.count(entry, 1)
+
+    # (hemistich, is first line, next line starts with conjunction) as in poem_hemistiches
+    def key(self, i):
+        if not self.start <= i < self.end:
+            return None
+        return (self.text(i), i == self.start, i + 1 < self.end and starts_with_conjunction(self.text(i + 1)))
+
+    def text(self, i):
+        line = self.lines[i]
+        if i == self.start:
+            line = line.lstrip()
+        if i == self.end - 1:
+            line = line.rstrip()
+        return line
+
+    def count(self, entry, sign):
+        if entry:
+            key, sCount, scans = entry
+            if sCount > 0:
+                self.syllableCounts[sCount] += sign
+                if self.syllableCounts[sCount] == 0:
+                    del self.syllableCounts[sCount]
+            for meterID, dist, scanned in scans:
+                self.patternScores[meterID] += sign * (self.classifier.maxDist - dist)
+
+classifier = None
+def default_classifier():
+    global classifier
+    if classifier is None:
+        classifier = PoemClassifier()
+    return classifier
+
+# lines of the poem as (hemistich, is first line, next line starts with conjunction و)
+def poem_hemistiches(poem):
+    lines = poem_normalization(poem).strip().split('\n')
+    return [(lines[i], i == 0, i + 1 < len(lines) and starts_with_conjunction(lines[i + 1])) for i in range(len(lines))]
+
+# the conjunction و at the beginning of a line is merged into the end of the previous line (e.g. ˈdûˈ\nû)
+def starts_with_conjunction(line):
+    return line_conjunction.match(G2P_prepare("#" + line, True)) is not None
+
+line_conjunction = compile_pattern(f"# و(?![{ku}])", re)
+
+# G2P input of a hemistich with the context of its neighbour lines
+def hemistich_text(line, first, conj):
+    return ("" if first else "#\n") + line + ("\n و" if conj else "")
+
+# G2P of a hemistich, same as its line in G2P of the whole poem
+def hemistich_G2P(line, first, conj=False):
+    output = KurdishG2P(hemistich_text(line, first, conj), convertNumbersToWord=True, backMergeConjunction=True, singleOutputPerWord=True)
+    if not first:
+        output = output.partition('\n')[2]
+    if conj:
+        output = output.rpartition('\n')[0]
     return output
 
+# pattern matching in a worker process
+def scan_hemistiches(sHemistiches, weights, maxDist):
+    patterns = [make_pattern(0, w, "") for w in weights]
+    return [match_patterns(convert_to_CV_lattice(h), patterns, maxDist) for h in sHemistiches]
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 # input: "ˈgerˈçî ˈtûˈşî ˈřenˈceˈřoˈyîw ˈḧesˈreˈtû ˈderˈdim ˈʔeˈmin "
 # output: List<"∪––––∪–––∪–––∪–", "∪––––∪–––∪––∪∪–">
 def convert_to_CV(syllabified):
     if len(syllabified) > 100: # abort if line is too long
         syllabified = " "
+    return expand_CV_lattice(convert_to_CV_lattice(syllabified))
+
+# all paths of the lattice in the order of convert_to_CV
+def expand_CV_lattice(lattice):
+    output = [""]
+    for options in lattice:
+        count = len(output)
+        for j in range(count):
+            for option in options[1:]:
+                output.append(output[j] + option)
+            output[j] += options[0]
+    return output
+
+# input: "ˈgerˈçî ˈtûˈşî ˈřenˈceˈřoˈyîw ˈḧesˈreˈtû ˈderˈdim ˈʔeˈmin "
+# output: the alternative weights of each syllable, e.g. [("–", "∪"), ("–", "∪"), ("–",), ..., ("∪",), ("–",)]
+def convert_to_CV_lattice(syllabified):
     CV = syllabified
-    CV = re.sub(r"[\[\]«»]", "", CV) # remove "] [" 
-    CV = re.sub(r"[\n\r\?,;! ]+", "¤", CV + "\n")  # open junctures (punctuation and end of line) => ¤
-    CV = re.sub(" ˈ¤", "¤", CV)
-    CV = re.sub(r"îˈye", "iˈye", CV) # (ˈnîˈye => ˈniˈye)
-    CV = re.sub(r"([^ieuaêoîûˈ])([yw])", r"\1ɰ", CV)  # gyan-gîyan, xiwa-xuwa  => – or ∪–
-    CV = re.sub(r"[bcçdfghḧjklłmnpqrřsşṣtvwxẍyzʔƹ]", "C", CV)
+    CV = brackets.sub("", CV) # remove "] [" 
+    CV = open_junctures.sub("¤", CV + "\n")  # open junctures (punctuation and end of line) => ¤
+    for pattern, replacement in cv_rules:
+        CV = pattern.sub(replacement, CV)
     syllables = CV.split('ˈ')[1:]
-    output = [""]
+    output = []
     for i in range(len(syllables)):
-        count = len(output)
-        if re.search("ɰ", syllables[i]): # CVcC(C) syllable (e.g. گیان خوا)
-            for j in range(count):
-                output.append(output[j] + "–")
-                output[j] += "∪–"
-        elif re.search("([ieuaêoîû]C+|[aêoû]$|[aêo]¤$)", syllables[i]): # heavy syllable
+        if "ɰ" in syllables[i]: # CVcC(C) syllable (e.g. گیان خوا)
+            output.append(("∪–", "–"))
+        elif heavy_syllable.search(syllables[i]): # heavy syllable
             if i < 2: # at first position may be light
-                for j in range(count):
-                    output.append(output[j] + "∪")
-                    output[j] += "–"
+                output.append(("–", "∪"))
             else:
-                for j in range(count):
-                    output[j] += "–"
-        elif re.search("([ieu]$|i¤$)", syllables[i]): # light syllable
-            for j in range(count):
-                output[j] += "∪"
+                output.append(("–",))
+        elif light_syllable.search(syllables[i]): # light syllable
+            output.append(("∪",))
     return output
 
+brackets = compile_pattern(r"[\[\]«»]", re)
+open_junctures = compile_pattern(r"[\n\r\?,;! ]+", re)
+cv_rules = [(compile_pattern(pattern, re), replacement) for pattern, replacement in [
+    (" ˈ¤", "¤"),
+    (r"îˈye", "iˈye"), # (ˈnîˈye => ˈniˈye)
+    (r"([^ieuaêoîûˈ])([yw])", r"\1ɰ"),  # gyan-gîyan, xiwa-xuwa  => – or ∪–
+    (r"[bcçdfghḧjklłmnpqrřsşṣtvwxẍyzʔƹ]", "C"),
+]]
+heavy_syllable = compile_pattern("([ieuaêoîû]C+|[aêoû]$|[aêo]¤$)", re)
+light_syllable = compile_pattern("([ieu]$|i¤$)", re)
+
 # input: List of "∪–"s
 # output: List of nearests of 27 common meter patterns
 def pattern_match(cands, lineNumber):
@@ -173,7 +447,7 @@ def pattern_match(cands, lineNumber):
         for i in range(len(CommonPatterns)): # for 27 common meter patterns
             distances = {}
             for j in range(len(cands)): # for each candidate
-                distances[j] = dist_levenshtein(cands[j], CommonPatterns[i].weights)
+                distances[j] = dist_weights(cands[j], CommonPatterns[i], max_dist)
             lowestDist = min(distances.values())
             if lowestDist <= max_dist:
                 patternScores[i] += max_dist - lowestDist
@@ -185,15 +459,109 @@ def pattern_match(cands, lineNumber):
                     output[-1].dist = item[1]
     return output
 
+# input: the lattice of convert_to_CV_lattice
+# output: (meterID, dist, scanned) of the nearest path of the lattice to each pattern
+# (same result as pattern_match on all paths, but large lattices are not expanded)
+def match_patterns(lattice, patterns, maxDist):
+    output = []
+    if len(lattice) > 0:
+        paths = 1
+        for options in lattice:
+            paths *= len(options)
+        # a few paths (the usual case) are faster to compare one by one with bit-parallel distance
+        cands = expand_CV_lattice(lattice) if paths <= max_expanded_paths else None
+        for i in range(len(patterns)): # for 27 common meter patterns
+            if cands:
+                distances = [dist_weights(cand, patterns[i], maxDist) for cand in cands]
+                lowestDist = min(distances)
+                match = (lowestDist, cands[distances.index(lowestDist)]) if lowestDist <= maxDist else None
+            else:
+                match = lattice_match(lattice, patterns[i].weights, maxDist)
+            if match:
+                output.append((i, match[0], match[1]))
+    return output
+
+# Edit distance (insertion/deletion 1, substitution 2) between the nearest path of lattice and pattern.
+# Returns (distance, path) or None when distance > maxDist. Among the nearest paths, the one
+# which convert_to_CV lists first is returned.
+def lattice_match(lattice, pattern, maxDist):
+    m = len(pattern)
+    cap = maxDist + 1
+    # forward rows: rows[s][j] = distance of the nearest path of lattice[:s] and pattern[:j]
+    row = [min(j, cap) for j in range(m + 1)]
+    rows = [row]
+    for options in lattice:
+        best = None
+        for option in options:
+            r = row
+            for ch in option:
+                r = lattice_step(r, ch, pattern, cap)
+            best = r if best is None else [min(a, b) for a, b in zip(best, r)]
+        row = best
+        if min(row) >= cap: # no path can be near to the pattern
+            return None
+        rows.append(row)
+    dist = row[m]
+    if dist >= cap:
+        return None
+
+    # backward: choosing the options of the path from the last syllable
+    # back[j] = distance of the chosen suffix and pattern[j:]
+    back = [m - j for j in range(m + 1)]
+    path = []
+    for s in range(len(lattice) - 1, -1, -1):
+        for option in lattice[s]:
+            b = back
+            for ch in reversed(option):
+                b = lattice_step_back(b, ch, pattern)
+            if min(f + x for f, x in zip(rows[s], b)) == dist:
+                back = b
+                path.append(option)
+                break
+    return dist, "".join(reversed(path))
+
+# appends ch to the paths of a forward row
+def lattice_step(row, ch, pattern, cap):
+    new = [min(row[0] + 1, cap)]
+    for j in range(1, len(row)):
+        cost = row[j - 1] + (0 if pattern[j - 1] == ch else 2)
+        new.append(min(row[j] + 1, new[j - 1] + 1, cost, cap))
+    return new
+
+# prepends ch to the suffix of a backward row
+def lattice_step_back(back, ch, pattern):
+    m = len(pattern)
+    new = [0] * (m + 1)
+    new[m] = back[m] + 1
+    for j in range(m - 1, -1, -1):
+        cost = back[j + 1] + (0 if pattern[j] == ch else 2)
+        new[j] = min(back[j] + 1, new[j + 1] + 1, cost)
+    return new
+
 # ==================================================
 # Normalizes the input text for classification steps.
 def poem_normalization(text: str) -> str:
-    text = re.sub("ط", "ت", text)
-    text = re.sub("[صث]", "س", text)
-    text = re.sub("[ضذظ]", "ز", text)
-    text = re.sub("( و)([.،؟!])", r"\1", text)
+    for pattern, replacement in poem_normalization_rules:
+        text = pattern.sub(replacement, text)
     return text
 
+poem_normalization_rules = [(compile_pattern(pattern, re), replacement) for pattern, replacement in [
+    ("ط", "ت"),
+    ("[صث]", "س"),
+    ("[ضذظ]", "ز"),
+    ("( و)([.،؟!])", r"\1"),
+]]
+
+# standard deviation of the values given as value => frequency
+def counts_standard_deviation(counts) -> float:
+    standard_deviation = 0
+    n = sum(counts.values())
+    if n > 0:
+        avg = sum(value * k for value, k in counts.items()) / n
+        squared_diff = sum(k * (value - avg) ** 2 for value, k in counts.items())
+        standard_deviation = (squared_diff / n) ** 0.5
+    return standard_deviation
+
 def calculate_standard_deviation(values) -> float:
     standard_deviation = 0
     if len(values) > 0:
@@ -227,4 +595,29 @@ def dist_levenshtein(s1, s2):
             min2 = d[i][j - 1] + 1
             min3 = d[i - 1][j - 1] + cost
             d[i][j] = min(min1, min2, min3)
-    return d[m - 1][n - 1]
\ No newline at end of file
+    return d[m - 1][n - 1]
+
+# ===== bit-parallel distance for weight patterns
+# With insertion/deletion cost 1 and substitution cost 2, the Levenshtein distance above equals
+# len(s1) + len(s2) - 2 * LCS(s1, s2). The LCS is computed bit-parallel (Allison-Dix, Hyyrö),
+# one bit per position of the pattern.
+def compile_weights(weights):
+    masks = {}
+    for i, ch in enumerate(weights):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks
+
+# returns the distance of candidate and pattern, or maxDist + 1 when it is larger than maxDist
+def dist_weights(cand, pattern, maxDist):
+    n = len(cand)
+    m = len(pattern.weights)
+    if abs(n - m) > maxDist:  # each extra syllable costs 1
+        return maxDist + 1
+    full = (1 << m) - 1
+    V = full
+    masks = pattern.masks
+    for ch in cand:
+        U = V & masks.get(ch, 0)
+        V = ((V + U) | (V - U)) & full
+    dist = n + m - 2 * (m - bin(V).count("1"))
+    return dist if dist <= maxDist else maxDist + 1
@@ -0,0 +1,226 @@
+# Corpus-scale prosody statistics of poems (e.g. archives of millions of hemistiches) with NumPy
+# (an optional dependency: pip install asosoft[stats]).
+# The poems are added as a stream; for each hemistich its syllable count, its best meter pattern (the nearest one,
+# -1 if no pattern is within maxDist), its distance, its poem and its poet are kept in compact arrays.
+# The histograms, modes, standard deviations and the per-poem/per-poet/per-pattern aggregates are vectorized.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from collections import OrderedDict
+from itertools import islice
+from .PoemClassifier import PoemClassifier, default_classifier, hemistich_G2P, poem_hemistiches
+
+columns = {"syllables": "int16", "meters": "int16", "distances": "int8", "poems": "int32", "poets": "int32"}
+flush_size = 65536
+max_table = 1 << 24  # largest (groups x values) table of group_mode and distinct_count
+best_size = 1 << 18  # best meters of the most recently used hemistiches
+
+class PoemCorpusStats:
+    def __init__(self, classifier=None):
+        if np is None:
+            raise ImportError("PoemCorpusStats needs NumPy (pip install asosoft[stats])")
+        # a private classifier (with the patterns of the default one), so its scans can be dropped once they are reduced
+        self.ownClassifier = classifier is None
+        self.classifier = PoemClassifier(default_classifier().patterns) if classifier is None else classifier
+        self.poets = {}        # poet => poet ID
+        self.poemPoets = []    # poet ID of each poem (-1: unknown)
+        self.chunks = []       # arrays of the flushed hemistiches
+        self.pending = []      # (syllables, meter, distance, poem, poet) of the other hemistiches
+        self.cached = None
+        self.best = OrderedDict()  # syllabified hemistich => (meter, distance); LRU of best_size
+
+    # ===== adding poems =====
+    def add_poem(self, poem, poet=None):
+        self.add_syllabified([hemistich_G2P(*h) for h in poem_hemistiches(poem)], poet)
+
+    # poems: an iterable of poems, or of (poet, poem) pairs; they are syllabified in batches of chunkSize
+    # (with the G2P and pattern matching of the new hemistiches in a process pool if workers > 1)
+    def add_poems(self, poems, poet=None, workers=None, chunkSize=4096):
+        poems = iter(poems)
+        batch = list(islice(poems, chunkSize))
+        while batch:
+            batch = [item if isinstance(item, tuple) else (poet, item) for item in batch]
+            syllabified = self.classifier.syllabify_many([poem for _, poem in batch], workers)
+            for (poemPoet, _), sHemistiches in zip(batch, syllabified):
+                self.add_syllabified(sHemistiches, poemPoet)
+            if self.ownClassifier:
+                self.classifier.scans.clear()
+            batch = list(islice(poems, chunkSize))
+
+    # sHemistiches: syllabified hemistiches of a poem (e.g. the lines of KurdishG2P of the poem)
+    def add_syllabified(self, sHemistiches, poet=None):
+        poem = len(self.poemPoets)
+        poetID = -1 if poet is None else self.poets.setdefault(poet, len(self.poets))
+        self.poemPoets.append(poetID)
+        for h in sHemistiches:
+            meter, dist = self.best_meter(h)
+            self.pending.append((len(h.split('ˈ')) - 1, meter, dist, poem, poetID))
+        self.cached = None
+        if len(self.pending) >= flush_size:
+            self.flush()
+
+    def best_meter(self, syllabified):
+        best = self.best.get(syllabified)
+        if best is not None:
+            self.best.move_to_end(syllabified)
+            return best
+        matches = self.classifier.scan(syllabified)
+        if self.ownClassifier:
+            del self.classifier.scans[syllabified]
+        best = self.best[syllabified] = min(((dist, meterID) for meterID, dist, scanned in matches), default=(0, -1))[::-1]
+        if len(self.best) > best_size:
+            self.best.popitem(last=False)
+        return best
+
+    def flush(self):
+        if self.pending:
+            rows = list(zip(*self.pending))
+            self.chunks.append({name: np.array(rows[i], dtype) for i, (name, dtype) in enumerate(columns.items())})
+            self.pending = []
+
+    # Adds the hemistiches of another PoemCorpusStats (e.g. of another part of the archive)
+    def merge(self, other):
+        poetIDs = np.array([self.poets.setdefault(poet, len(self.poets)) for poet in other.poets] + [-1], "int32")
+        arrays = dict(other.arrays())
+        arrays["poems"] = arrays["poems"] + len(self.poemPoets)
+        arrays["poets"] = poetIDs[arrays["poets"]]
+        self.poemPoets.extend(poetIDs[other.poemPoets].tolist())
+        self.flush()
+        self.chunks.append(arrays)
+        self.cached = None
+
+    # ===== arrays =====
+    # {"syllables", "meters", "distances", "poems", "poets"}: one item for each hemistich
+    def arrays(self):
+        if self.cached is None:
+            self.flush()
+            if len(self.chunks) > 1:
+                self.chunks = [{name: np.concatenate([c[name] for c in self.chunks]) for name in columns}]
+            self.cached = self.chunks[0] if self.chunks else {name: np.zeros(0, dtype) for name, dtype in columns.items()}
+        return self.cached
+
+    def __len__(self):
+        return len(self.arrays()["syllables"])
+
+    # ===== statistics =====
+    # number of hemistiches of each syllable count (index: syllable count); the blank hemistiches are not counted
+    def syllable_histogram(self):
+        syllables = self.arrays()["syllables"]
+        return np.bincount(syllables[syllables > 0])
+
+    def syllable_mode(self):
+        histogram = self.syllable_histogram()
+        return int(histogram.argmax()) if histogram.any() else 0
+
+    def syllable_mean(self):
+        syllables = self.arrays()["syllables"]
+        syllables = syllables[syllables > 0]
+        return float(syllables.mean()) if len(syllables) else 0.0
+
+    def syllable_std(self):
+        syllables = self.arrays()["syllables"]
+        syllables = syllables[syllables > 0]
+        return float(syllables.std()) if len(syllables) else 0.0
+
+    # number of hemistiches of each best meter pattern (index: meterID)
+    def pattern_histogram(self):
+        meters = self.arrays()["meters"]
+        return np.bincount(meters[meters >= 0], minlength=len(self.classifier.patterns))
+
+    # {pattern title: number of hemistiches}, the most frequent first
+    def pattern_frequencies(self):
+        histogram = self.pattern_histogram()
+        order = np.argsort(-histogram, kind="stable")
+        return {self.classifier.patterns[i].title: int(histogram[i]) for i in order if histogram[i]}
+
+    # ===== aggregates =====
+    # arrays of each poem: hemistiches, meanSyllables, stdSyllables, modeSyllables, topPattern
+    # (stdSyllables is the dispersion which ClassifyKurdishPoem uses for free verse)
+    def by_poem(self):
+        arrays = self.arrays()
+        output = group_stats(arrays["poems"], arrays, len(self.poemPoets))
+        output["poet"] = np.array(self.poemPoets, "int32")
+        return output
+
+    # arrays of each poet (in the order of self.poets): poems, hemistiches, meanSyllables, stdSyllables,
+    # modeSyllables, topPattern
+    def by_poet(self):
+        arrays = self.arrays()
+        known = arrays["poets"] >= 0
+        output = group_stats(arrays["poets"][known], {name: a[known] for name, a in arrays.items()}, len(self.poets))
+        poemPoets = np.array(self.poemPoets, "int32")
+        output["poems"] = np.bincount(poemPoets[poemPoets >= 0], minlength=len(self.poets))
+        output["poet"] = list(self.poets)
+        return output
+
+    # arrays of each meter pattern (index: meterID): hemistiches, meanDistance, meanSyllables, poems, poets
+    def by_pattern(self):
+        arrays = self.arrays()
+        matched = arrays["meters"] >= 0
+        meters = arrays["meters"][matched].astype("int64")
+        size = len(self.classifier.patterns)
+        count = np.bincount(meters, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            meanDistance = np.bincount(meters, arrays["distances"][matched], size) / count
+            meanSyllables = np.bincount(meters, arrays["syllables"][matched], size) / count
+        return {"title": [pattern.title for pattern in self.classifier.patterns], "hemistiches": count,
+                "meanDistance": np.nan_to_num(meanDistance), "meanSyllables": np.nan_to_num(meanSyllables),
+                "poems": distinct_count(meters, arrays["poems"][matched], size),
+                "poets": distinct_count(meters, arrays["poets"][matched], size, skipNegative=True)}
+
+    # JSON-friendly summary of the corpus
+    def report(self):
+        return {"poems": len(self.poemPoets), "poets": len(self.poets), "hemistiches": len(self),
+                "syllableHistogram": self.syllable_histogram().tolist(), "syllableMode": self.syllable_mode(),
+                "syllableMean": self.syllable_mean(), "syllableStd": self.syllable_std(),
+                "patternFrequencies": self.pattern_frequencies()}
+
+# hemistiches, meanSyllables, stdSyllables, modeSyllables and topPattern of each group (groups: group of each hemistich)
+def group_stats(groups, arrays, size):
+    groups = groups.astype("int64")
+    valid = arrays["syllables"] > 0
+    g = groups[valid]
+    syllables = arrays["syllables"][valid].astype("float64")
+    count = np.bincount(g, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(g, syllables, size) / count
+        deviation = syllables - mean[g]
+        std = np.sqrt(np.bincount(g, deviation * deviation, size) / count)
+    matched = arrays["meters"] >= 0
+    return {"hemistiches": np.bincount(groups, minlength=size), "meanSyllables": np.nan_to_num(mean),
+            "stdSyllables": np.nan_to_num(std), "modeSyllables": group_mode(g, arrays["syllables"][valid], size, 0),
+            "topPattern": group_mode(groups[matched], arrays["meters"][matched], size, -1)}
+
+# the most frequent value of each group (the smallest one of a tie; empty: the default)
+def group_mode(groups, values, size, default):
+    output = np.full(size, default, "int64")
+    if len(values) == 0:
+        return output
+    span = int(values.max()) + 1
+    keys = groups * span + values
+    if size * span <= max_table:
+        # a table of the counts (argmax: the smallest value of a tie)
+        table = np.bincount(keys, minlength=size * span).reshape(size, span)
+        return np.where(table.any(axis=1), table.argmax(axis=1), default)
+    keys, counts = np.unique(keys, return_counts=True)
+    keyGroups, keyValues = keys // span, keys % span
+    order = np.lexsort((keyValues, -counts, keyGroups))
+    first = order[np.r_[True, keyGroups[order][1:] != keyGroups[order][:-1]]]
+    output[keyGroups[first]] = keyValues[first]
+    return output
+
+# number of the distinct values of each group
+def distinct_count(groups, values, size, skipNegative=False):
+    if skipNegative:
+        groups, values = groups[values >= 0], values[values >= 0]
+    if len(values) == 0:
+        return np.zeros(size, "int64")
+    span = int(values.max()) + 1
+    keys = groups * span + values
+    if size * span <= max_table:
+        table = np.zeros(size * span, bool)
+        table[keys] = True
+        return table.reshape(size, span).sum(axis=1)
+    return np.bincount(np.unique(keys) // span, minlength=size)
@@ -0,0 +1,327 @@
+# Local inference server (python -m asosoft serve) for the services which share one warm process and its caches.
+# Protocol: JSON lines over a Unix socket, e.g. {"id": 1, "method": "KurdishG2P", "params": ["text"]} =>
+# {"id": 1, "result": "..."}, or localhost HTTP (POST /KurdishG2P with the params as the JSON body,
+# POST / with JSON lines, GET /health and GET /metrics).
+# The concurrent requests are grouped into micro-batches (up to maxBatch requests or maxDelay seconds):
+# identical requests of a batch are run once, and the new G2P words of the whole batch are deduplicated and
+# converted together (in a warm process pool if workers > 1) into the shared word cache (G2P.history).
+# The batches run one after another in the batcher thread (only the G2P of the new words runs in the pool),
+# so a slow request (e.g. a long poem) delays the requests of the next batches.
+# This module is not imported by `import asosoft`; the Unix socket needs a platform with AF_UNIX.
+
+import os
+import stat
+import json
+import time
+import queue
+import threading
+import socketserver
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import G2P
+from .G2P import KurdishG2P, G2P_words, words_G2P
+from .Normalize import Normalize
+from .Number2Word import Number2Word
+from .Transliteration import Ar2La, Ar2LaFeryad, Ar2LaSimple, La2Ar
+from .PoemClassifier import ClassifyKurdishPoem, poem_hemistiches, hemistich_text
+
+server_methods = {f.__name__: f for f in [
+    KurdishG2P, Ar2La, Ar2LaFeryad, Ar2LaSimple, La2Ar, Normalize, Number2Word, ClassifyKurdishPoem]}
+
+# ===== G2P words of a request (converted before the batch runs) =====
+def request_words(method, args, kwargs):
+    if method == "KurdishG2P":
+        convert = kwargs.get("convertNumbersToWord", args[1] if len(args) > 1 else False)
+        return G2P_words(args[0], convert)
+    if method in ("Ar2La", "Ar2LaFeryad", "Ar2LaSimple"):
+        return G2P_words(args[0])
+    if method == "ClassifyKurdishPoem":
+        return [w for h in poem_hemistiches(args[0]) for w in G2P_words(hemistich_text(*h), True)]
+    return []
+
+# JSON form of the outputs (e.g. ResultSet of ClassifyKurdishPoem)
+def result_json(result):
+    if hasattr(result, "__dict__"):
+        return {key: result_json(value) for key, value in vars(result).items()}
+    if isinstance(result, list):
+        return [result_json(item) for item in result]
+    return result
+
+class MicroBatcher:
+    def __init__(self, workers=0, maxBatch=64, maxDelay=0.005, poolThreshold=32):
+        self.maxBatch = maxBatch
+        self.maxDelay = maxDelay
+        self.poolThreshold = poolThreshold  # fewer new words are converted in the batcher thread
+        self.queue = queue.Queue()
+        self.workers = workers if workers and workers > 1 else 1
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(self.workers)
+            # loading the G2P resources in each worker
+            list(self.executor.map(words_G2P, [["ئاو"]] * workers))
+        self.started = time.time()
+        self.lock = threading.Lock()  # the stats are updated by the handler threads and the batcher thread
+        self.stats = {"requests": 0, "errors": 0, "batches": 0, "maxBatchSize": 0,
+                      "deduplicatedRequests": 0, "wordHits": 0, "wordMisses": 0, "lastBatchSize": 0, "batchSeconds": 0.0}
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Returns a Future of the output; params: list of the positional arguments or dict of the keyword arguments
+    # (the text is the first argument, or "text" in the dict)
+    def submit(self, method, params=None):
+        future = Future()
+        if method not in server_methods:
+            self.count(errors=1)
+            future.set_exception(ValueError(f"unknown method {method!r}"))
+            return future
+        if isinstance(params, dict):
+            kwargs = dict(params)
+            text = kwargs.pop("text", kwargs.pop("poem", None))
+            args = [] if text is None else [text]
+        else:
+            args, kwargs = list(params or []), {}
+        if not args or not isinstance(args[0], (str, int, float)):
+            self.count(errors=1)
+            future.set_exception(ValueError("the first argument should be a text"))
+            return future
+        self.queue.put((method, args, kwargs, future))
+        return future
+
+    # adds the values to the stats
+    def count(self, **values):
+        with self.lock:
+            for name, value in values.items():
+                self.stats[name] += value
+
+    def call(self, method, params=None, timeout=None):
+        return self.submit(method, params).result(timeout)
+
+    def close(self):
+        self.running = False
+        self.queue.put(None)
+        self.thread.join()
+        if self.executor:
+            self.executor.shutdown()
+
+    def run(self):
+        while self.running:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.maxDelay
+            while len(batch) < self.maxBatch:
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.running = False
+                    break
+                batch.append(item)
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        start = time.perf_counter()
+        # identical requests are run once
+        groups = {}
+        for method, args, kwargs, future in batch:
+            key = json.dumps([method, args, kwargs], ensure_ascii=False, sort_keys=True)
+            if key in groups:
+                groups[key][3].append(future)
+            else:
+                groups[key] = (method, args, kwargs, [future])
+        # the new words of the batch are converted together
+        words = set()
+        for method, args, kwargs, futures in groups.values():
+            try:
+                words.update(request_words(method, args, kwargs))
+            except Exception:
+                pass  # the error is reported by the request itself
+        new = [w for w in words if w not in G2P.history]
+        self.count(wordHits=len(words) - len(new), wordMisses=len(new))
+        if self.executor and len(new) >= self.poolThreshold:
+            size = -(-len(new) // self.workers)
+            for entries in self.executor.map(words_G2P, [new[i:i + size] for i in range(0, len(new), size)]):
+                G2P.history.update(entries)
+        elif new:
+            G2P.history.update(words_G2P(new))
+
+        for method, args, kwargs, futures in groups.values():
+            try:
+                result = result_json(server_methods[method](*args, **kwargs))
+            except Exception as e:
+                self.count(errors=len(futures))
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future in futures:
+                future.set_result(result)
+        self.count(requests=len(batch), batches=1, deduplicatedRequests=len(batch) - len(groups),
+                   batchSeconds=time.perf_counter() - start)
+        with self.lock:
+            self.stats["lastBatchSize"] = len(batch)
+            self.stats["maxBatchSize"] = max(self.stats["maxBatchSize"], len(batch))
+
+    def health(self):
+        return {"status": "ok" if self.running and self.thread.is_alive() else "stopped",
+                "uptime": time.time() - self.started, "workers": self.workers}
+
+    def metrics(self):
+        with self.lock:
+            stats = dict(self.stats)
+        words = stats["wordHits"] + stats["wordMisses"]
+        stats["queueDepth"] = self.queue.qsize()
+        stats["meanBatchSize"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        stats["wordCacheHitRate"] = stats["wordHits"] / words if words else 0.0
+        stats["wordCacheSize"] = len(G2P.history)
+        stats["uptime"] = time.time() - self.started
+        return stats
+
+    # Future of the response of a JSON-lines request (health and metrics are answered without batching)
+    def request(self, line):
+        response = Future()
+        try:
+            request = json.loads(line)
+            response.id = request.get("id")
+            method = request.get("method")
+            if method == "health":
+                response.set_result({"id": response.id, "result": self.health()})
+                return response
+            if method == "metrics":
+                response.set_result({"id": response.id, "result": self.metrics()})
+                return response
+            future = self.submit(method, request.get("params"))
+        except Exception as e:
+            self.count(errors=1)
+            response.set_result({"id": None, "error": str(e)})
+            return response
+        def done(future):
+            try:
+                response.set_result({"id": response.id, "result": future.result()})
+            except Exception as e:
+                response.set_result({"id": response.id, "error": str(e) or type(e).__name__})
+        future.add_done_callback(done)
+        return response
+
+def wait_response(response, timeout):
+    try:
+        return response.result(timeout)
+    except TimeoutError:
+        return {"id": getattr(response, "id", None), "error": "timeout"}
+
+def json_line(response):
+    return (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+
+# ===== Unix socket (JSON lines) =====
+class JsonLinesHandler(socketserver.StreamRequestHandler):
+    # the requests of a connection are submitted as they arrive (so they can share a batch)
+    # and the responses are written in the same order
+    def handle(self):
+        batcher = self.server.batcher
+        pending = queue.Queue()
+        writer = threading.Thread(target=self.write_responses, args=(pending,))
+        writer.start()
+        try:
+            for line in self.rfile:
+                if line.strip():
+                    pending.put(batcher.request(line))
+        finally:
+            pending.put(None)
+            writer.join()
+
+    def write_responses(self, pending):
+        while True:
+            response = pending.get()
+            if response is None:
+                break
+            try:
+                self.wfile.write(json_line(wait_response(response, self.server.timeout)))
+                self.wfile.flush()
+            except OSError:
+                break
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class UnixJsonLinesServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    UnixJsonLinesServer = None
+
+# removes the socket file of a previous server (but no other kind of file)
+def remove_socket(socketPath):
+    if os.path.exists(socketPath):
+        if not stat.S_ISSOCK(os.stat(socketPath).st_mode):
+            raise FileExistsError(f"{socketPath} exists and is not a socket")
+        os.remove(socketPath)
+
+# ===== localhost HTTP =====
+class HttpHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        batcher = self.server.batcher
+        if self.path == "/health":
+            self.send_json(200, batcher.health())
+        elif self.path == "/metrics":
+            self.send_json(200, batcher.metrics())
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        batcher = self.server.batcher
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        method = self.path.strip("/")
+        if not method:
+            # JSON lines (submitted together, so they can share a batch)
+            responses = [batcher.request(line) for line in body.splitlines() if line.strip()]
+            body = b"".join(json_line(wait_response(r, self.server.timeout)) for r in responses)
+            self.send_body(200, body, "application/x-ndjson")
+            return
+        try:
+            params = json.loads(body) if body.strip() else []
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        response = wait_response(batcher.request(json.dumps({"method": method, "params": params})), self.server.timeout)
+        self.send_json(200 if "result" in response else 400, {k: v for k, v in response.items() if k != "id"})
+
+    def send_json(self, status, obj):
+        self.send_body(status, json_line(obj), "application/json")
+
+    def send_body(self, status, body, contentType):
+        self.send_response(status)
+        self.send_header("Content-Type", contentType + "; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# Creates the server (a Unix socket if socketPath is given, otherwise HTTP on host:port);
+# run it with server.serve_forever() and stop it with server.shutdown() and server.batcher.close()
+def make_server(socketPath=None, host="127.0.0.1", port=8765, workers=0, maxBatch=64, maxDelay=0.005, timeout=60):
+    if socketPath:
+        if UnixJsonLinesServer is None:
+            raise OSError("Unix sockets are not available on this platform")
+        remove_socket(socketPath)
+    batcher = MicroBatcher(workers, maxBatch, maxDelay)
+    if socketPath:
+        server = UnixJsonLinesServer(socketPath, JsonLinesHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), HttpHandler)
+        server.daemon_threads = True
+    server.batcher = batcher
+    server.timeout = timeout
+    return server
+
+def Serve(socketPath=None, host="127.0.0.1", port=8765, workers=0, maxBatch=64, maxDelay=0.005, timeout=60):
+    server = make_server(socketPath, host, port, workers, maxBatch, maxDelay, timeout)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+        if socketPath:
+            remove_socket(socketPath)
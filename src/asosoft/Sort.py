@@ -1,15 +1,285 @@
+import re
+import os
+import sys
+import time
+import heapq
+import bisect
+import itertools
+import tempfile
+
+kurdish_order = list("ئءاآأإبپتثجچحخدڎڊذرڕزژسشصضطظعغفڤقكکگڴلڵمنوۆۊۉۋهھەیێ")
+
 def KurdishSort(inputList):
-    ku = list("ئءاآأإبپتثجچحخدڎڊذرڕزژسشصضطظعغفڤقكکگڴلڵمنوۆۊۉۋهھەیێ")
-    return CustomSort(inputList, ku)
+    return CustomSort(inputList, kurdish_order)
 
 def CustomSort(inputList, inputOrder):
-    base_char = 62000
-    order = [chr(base_char + i) for i in range(len(inputOrder))]
-    for i in range(len(inputList)):
-        for j in range(len(order)):
-            inputList[i] = inputList[i].replace(inputOrder[j], order[j])
-    inputList.sort()
-    for i in range(len(inputList)):
-        for j in range(len(order)):
-            inputList[i] = inputList[i].replace(order[j], inputOrder[j])
-    return inputList
\ No newline at end of file
+    inputList.sort(key=custom_sort_key(inputOrder))
+    return inputList
+
+# Returns a new sorted list in Kurdish alphabet order (like sorted(), the input is not changed)
+#   cacheKeys: True computes the key of repeated items once (in this call);
+#   a dict owned by the caller keeps the keys for repeated sorts (one dict for each order)
+def KurdishSorted(iterable, reverse=False, cacheKeys=False):
+    return CustomSorted(iterable, kurdish_order, reverse, cacheKeys)
+
+def CustomSorted(iterable, inputOrder, reverse=False, cacheKeys=False):
+    key = custom_sort_key(inputOrder)
+    if cacheKeys is not False:
+        key = cached_sort_key(key, {} if cacheKeys is True else cacheKeys)
+    return sorted(iterable, key=key, reverse=reverse)
+
+# ===== collation keys =====
+# each collation element is replaced with a private character of its rank (e.g. ئ => chr(62000))
+base_char = 62000
+sort_keys = {}
+
+def custom_sort_key(inputOrder):
+    order = tuple(inputOrder)
+    if order not in sort_keys:
+        single = {}
+        multiple = {}
+        for i, element in enumerate(order):
+            target = single if len(element) == 1 else multiple
+            target.setdefault(element, chr(base_char + i))
+        table = str.maketrans(single)
+        if multiple:
+            # multi-character elements (e.g. "ڵا") have priority over their single characters
+            elements = re.compile("|".join(re.escape(x) for x in sorted(multiple, key=len, reverse=True)))
+            def key(s):
+                return elements.sub(lambda m: multiple[m.group(0)], s).translate(table)
+            key.elements = elements
+        else:
+            def key(s):
+                return s.translate(table)
+        key.multiple = multiple
+        sort_keys[order] = key
+    return sort_keys[order]
+
+kurdish_sort_key = custom_sort_key(kurdish_order)
+
+# keeps the computed keys of the items in history
+def cached_sort_key(key, history):
+    def cached(s):
+        k = history.get(s)
+        if k is None:
+            k = history[s] = key(s)
+        return k
+    return cached
+
+# ===== database and index helpers =====
+# Registers the Kurdish alphabet order as a collation of a sqlite3 connection,
+# e.g. "SELECT word FROM lexicon ORDER BY word COLLATE KURDISH" or "CREATE INDEX ... (word COLLATE KURDISH)"
+def RegisterKurdishCollation(connection, name="KURDISH", inputOrder=None):
+    key = kurdish_sort_key if inputOrder is None else custom_sort_key(inputOrder)
+    def collate(a, b):
+        a, b = key(a), key(b)
+        return (a > b) - (a < b)
+    connection.create_collation(name, collate)
+
+# A list which is always kept in Kurdish alphabet order (bisect insertion and range queries)
+class KurdishSortedList:
+    def __init__(self, iterable=(), inputOrder=None):
+        self.key = kurdish_sort_key if inputOrder is None else custom_sort_key(inputOrder)
+        self.items = sorted(iterable, key=self.key)
+        self.keys = [self.key(item) for item in self.items]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __contains__(self, item):
+        return self.find(item) >= 0
+
+    def __repr__(self):
+        return f"KurdishSortedList({self.items!r})"
+
+    def add(self, item):
+        k = self.key(item)
+        i = bisect.bisect_right(self.keys, k)
+        self.keys.insert(i, k)
+        self.items.insert(i, item)
+
+    def update(self, iterable):
+        for item in iterable:
+            self.add(item)
+
+    def remove(self, item):
+        i = self.find(item)
+        if i < 0:
+            raise ValueError(f"{item!r} is not in list")
+        del self.keys[i]
+        del self.items[i]
+
+    def discard(self, item):
+        if item in self:
+            self.remove(item)
+
+    def index(self, item):
+        i = self.find(item)
+        if i < 0:
+            raise ValueError(f"{item!r} is not in list")
+        return i
+
+    def find(self, item):
+        k = self.key(item)
+        i = bisect.bisect_left(self.keys, k)
+        while i < len(self.keys) and self.keys[i] == k:
+            if self.items[i] == item:
+                return i
+            i += 1
+        return -1
+
+    # items from start (inclusive) to end (exclusive) in Kurdish order
+    def irange(self, start=None, end=None):
+        lo = 0 if start is None else bisect.bisect_left(self.keys, self.key(start))
+        hi = len(self.keys) if end is None else bisect.bisect_left(self.keys, self.key(end))
+        return self.items[lo:hi]
+
+    # items which start with the prefix (e.g. all words starting with "ڕەش")
+    def prefix(self, prefix):
+        ranges = []
+        for k in prefix_keys(self.key, prefix):
+            successor = key_successor(k)
+            lo = bisect.bisect_left(self.keys, k)
+            hi = len(self.keys) if successor is None else bisect.bisect_left(self.keys, successor)
+            ranges.append((lo, hi))
+        return [item for lo, hi in sorted(ranges) for item in self.items[lo:hi]]
+
+# key prefixes of the strings which start with the prefix: the key of the prefix, and the keys where a
+# multi-character element starts in the prefix and ends after it (e.g. "لاک" starts with "ل" but its key does
+# not start with the key of "ل" when "لا" is an element)
+def prefix_keys(key, prefix):
+    keys = [key(prefix)]
+    if key.multiple:
+        inside = set()
+        for m in key.elements.finditer(prefix):
+            inside.update(range(m.start() + 1, m.end()))
+        for i in range(len(prefix)):
+            if i not in inside:
+                keys.extend(key(prefix[:i]) + c for element, c in key.multiple.items()
+                            if len(element) > len(prefix) - i and element.startswith(prefix[i:]))
+    return keys
+
+# the smallest key after all the keys which start with k (None: no such key)
+def key_successor(k):
+    k = k.rstrip("\U0010FFFF")
+    return k[:-1] + chr(ord(k[-1]) + 1) if k else None
+
+# ===== sorting files larger than memory =====
+# Sorts the lines of a text file in Kurdish alphabet order (external merge sort):
+# sorted runs of about memory_limit bytes are spilled to temporary files and merged with heapq.merge.
+#   unique: keeps only the first line of each item
+#   count: writes each item once as "item<TAB>frequency" (or the sum of count_column)
+#   key_column: sorts and groups a TSV file by this column instead of the whole line
+#   progress: a callback which receives the statistics (lines, chars, runs, elapsed, linesPerSecond)
+def kurdish_sort_file(src, dst, memory_limit=100 * 1024 * 1024, unique=False, count=False, key_column=None, count_column=None, progress=None, temp_dir=None, encoding="utf-8"):
+    stats = {"phase": "sort", "lines": 0, "chars": 0, "runs": 0, "output": 0, "elapsed": 0.0, "linesPerSecond": 0.0}
+    start = time.time()
+
+    def report(phase):
+        stats["phase"] = phase
+        stats["elapsed"] = time.time() - start
+        stats["linesPerSecond"] = stats["lines"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+        if progress:
+            progress(dict(stats))
+
+    if key_column is None:
+        item_of = lambda line: line
+    else:
+        item_of = lambda line: tsv_column(line, key_column)
+    key = lambda line: kurdish_sort_key(item_of(line))
+
+    runs = []
+    temps = []  # all temporary files, removed at the end
+    try:
+        # ===== sorted runs
+        with open(src, 'r', encoding=encoding) as file:
+            buffer = []
+            size = 0
+            for line in file:
+                line = line.rstrip("\n")
+                buffer.append(line)
+                size += 2 * sys.getsizeof(line)  # the line and its collation key
+                stats["lines"] += 1
+                stats["chars"] += len(line) + 1
+                if size >= memory_limit:
+                    runs.append(write_run(sorted(buffer, key=key), temp_dir, encoding))
+                    temps.append(runs[-1])
+                    stats["runs"] += 1
+                    buffer = []
+                    size = 0
+                    report("sort")
+        runs.append(write_run(sorted(buffer, key=key), temp_dir, encoding))
+        temps.append(runs[-1])
+        stats["runs"] += 1
+        report("sort")
+
+        # ===== merging the runs
+        while len(runs) > max_merge_files:
+            merged = []
+            for i in range(0, len(runs), max_merge_files):
+                merged.append(merge_runs(runs[i:i + max_merge_files], key, temp_dir, encoding))
+                temps.append(merged[-1])
+                for run in runs[i:i + max_merge_files]:
+                    os.remove(run)
+            runs = merged
+            report("merge")
+
+        files = [open(run, 'r', encoding=encoding) for run in runs]
+        try:
+            lines = heapq.merge(*[read_run(f) for f in files], key=key)
+            with open(dst, 'w', encoding=encoding, newline='\n') as output:
+                if unique or count:
+                    for item, group in itertools.groupby(lines, key=item_of):
+                        if count:
+                            if count_column is None:
+                                frequency = sum(1 for _ in group)
+                            else:
+                                frequency = sum(int(tsv_column(line, count_column) or 0) for line in group)
+                            output.write(f"{item}\t{frequency}\n")
+                        else:
+                            output.write(next(group) + "\n")
+                        stats["output"] += 1
+                else:
+                    for line in lines:
+                        output.write(line + "\n")
+                        stats["output"] += 1
+        finally:
+            for f in files:
+                f.close()
+        report("done")
+    finally:
+        for run in temps:
+            if os.path.exists(run):
+                os.remove(run)
+    return stats
+
+max_merge_files = 64
+
+def tsv_column(line, column):
+    columns = line.split("\t")
+    return columns[column] if -len(columns) <= column < len(columns) else ""
+
+def read_run(file):
+    for line in file:
+        yield line[:-1]
+
+def write_run(lines, temp_dir, encoding):
+    handle, run = tempfile.mkstemp(suffix=".run", prefix="kurdish_sort_", dir=temp_dir)
+    with open(handle, 'w', encoding=encoding, newline='\n') as file:
+        for line in lines:
+            file.write(line + "\n")
+    return run
+
+def merge_runs(runs, key, temp_dir, encoding):
+    files = [open(run, 'r', encoding=encoding) for run in runs]
+    try:
+        return write_run(heapq.merge(*[read_run(f) for f in files], key=key), temp_dir, encoding)
+    finally:
+        for f in files:
+            f.close()
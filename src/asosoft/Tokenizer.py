@@ -0,0 +1,87 @@
+# Kurdish tokenizer shared by the Normalize, Number2Word and G2P stages.
+# A text is split once into tokens (Kurdish words, numbers, white spaces and other characters) and the
+# token-stream stages (e.g. SeperateDigitsTokens, Number2WordTokens, KurdishG2PTokens) only process the
+# tokens which they change (with a few neighbour tokens as context), instead of re-scanning the whole text.
+# Detokenize(stage(Tokenize(text))) is the same as the string function of the stage.
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from .Patterns import compile_pattern
+
+# Central Kurdish letters
+ku = "ئابپتجچحخدرڕزژسشعغفڤقکگلڵمنوۆەهیێ" + "ۋۉۊڎڴݵݸ"
+ku_letters = set(ku)
+
+token_pattern = compile_pattern(f"[{ku}]+|\\d+|\\s+|[^{ku}\\d\\s]+", re)
+
+# Splits the text into tokens: Kurdish words, numbers, white spaces and other characters
+def Tokenize(text):
+    return token_pattern.findall(text)
+
+def Detokenize(tokens):
+    return "".join(tokens)
+
+# "w" (Kurdish word), "n" (number), "s" (white space) or "o" (other)
+def token_kind(token):
+    ch = token[0]
+    if ch in ku_letters:
+        return "w"
+    if ch.isdecimal():
+        return "n"
+    if ch.isspace():
+        return "s"
+    return "o"
+
+# Indices of the tokens where the pattern matches; the pattern is searched once in the joined text
+# (much faster than a test per token) and its matches should not cross the tokens.
+def token_indices(tokens, pattern):
+    ends = list(accumulate(map(len, tokens)))
+    indices = []
+    for m in pattern.finditer("".join(tokens)):
+        i = bisect_right(ends, m.start())
+        if not indices or indices[-1] != i:
+            indices.append(i)
+    return indices
+
+number_pattern = compile_pattern(r"\d+", re)
+
+# Applies a string function on the groups of trigger tokens (where the trigger pattern matches) and their context
+# (`left` tokens before and `right` tokens after); the other tokens are not changed.
+def apply_around(tokens, trigger, function, left, right, retokenize=True):
+    groups = []
+    for i in token_indices(tokens, trigger):
+        add_group(groups, max(0, i - left), min(len(tokens), i + right + 1))
+    return apply_to_groups(tokens, groups, function, retokenize)
+
+# adds the span [start, end) to the sorted groups (overlapping or touching groups are merged)
+def add_group(groups, start, end):
+    if groups and start <= groups[-1][1]:
+        groups[-1][1] = max(end, groups[-1][1])
+    else:
+        groups.append([start, end])
+
+# The output of each group is tokenized again (if retokenize) and joined with the neighbour tokens of the same kind.
+def apply_to_groups(tokens, groups, function, retokenize=True):
+    if not groups:
+        return tokens
+    output = []
+    last = 0
+    for start, end in groups:
+        extend_tokens(output, tokens[last:start], retokenize)
+        changed = function("".join(tokens[start:end]))
+        extend_tokens(output, Tokenize(changed) if retokenize else [changed], retokenize)
+        last = end
+    extend_tokens(output, tokens[last:], retokenize)
+    return output
+
+# the tokens are well-formed; only the boundary tokens may join (e.g. "12" + "3")
+def extend_tokens(output, tokens, merge):
+    if not tokens or not tokens[0]:
+        tokens = tokens[1:]
+        if not tokens:
+            return
+    if merge and output and token_kind(output[-1]) == token_kind(tokens[0]):
+        output[-1] += tokens[0]
+        tokens = tokens[1:]
+    output.extend(tokens)
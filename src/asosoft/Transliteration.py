@@ -1,6 +1,11 @@
 import re
 import os
-from .G2P import KurdishG2P
+from .G2P import KurdishG2P, G2P_prepare, G2P_prepare_aligned, word_G2P, ku, conjunction_start
+from .CharTranslation import translate_by_list
+from .Alignment import compose, spread
+from array import array
+from collections import OrderedDict
+from .Patterns import compile_pattern
 latin_letters = "a-zêîûçşéúıŕřĺɫƚḧẍḍṿʔ"
 
 transliteration_replaces = {
@@ -66,9 +71,7 @@ transliteration_replaces = {
 }
 
 def replace_by_list(text, replaceList):
-    for i in range(0, len(replaceList), 2):
-        text = re.sub(replaceList[i], replaceList[i + 1], text)
-    return text
+    return translate_by_list(text, replaceList, re)
 
 # Transliterating the Latin script into Arabic script of Kurdish (e.g. çak→چاک)
 def La2Ar(text):
@@ -83,59 +86,135 @@ def LaDigraph2Ar(text):
 
 #Transliterating the Arabic script into Latin script of Kurdish (e.g. چاک→çak)
 def Ar2La(text):
-    return Phonemes2Hawar(KurdishG2P(text, backMergeConjunction=False))
+    return ar2la_words(text, "Hawar")
 
 # Transliterating the Arabic script into Latin script of Kurdish (e.g. چاک→çak)
 def Ar2LaSimple(text):
-    text = Phonemes2Hawar(KurdishG2P(text, backMergeConjunction=False))
-    text = text.replace("ḧ", "h")
-    text = text.replace("ř", "r")
-    text = text.replace("ł", "l")
-    text = text.replace("ẍ", "x")
-    return text
+    return ar2la_words(text, "Simple")
 
 # Transliterating the Arabic script into Latin script of Kurdish (e.g. چاک→çak)
 def Ar2LaFeryad(text):
-    text = Phonemes2Hawar(KurdishG2P(text, backMergeConjunction=False))
-    text = text.replace("ˈ", "")
-    text = text.replace("ř", "ṟ")
-    text = text.replace("ł", "ḻ")
-    text = text.replace("ħ", "ẖ")
-    text = text.replace("ẍ", "x̱")
-    text = text.replace("ƹ", "‛")
-    text = text.replace("ʔ", "")
-    return text
+    return ar2la_words(text, "Feryad")
+
+# Ar2La (or Ar2LaSimple, Ar2LaFeryad by the scheme) with the alignment of the output to the text: (output, offsets)
+def Ar2LaAligned(text, scheme="Hawar"):
+    return ar2la_words(text, scheme, True)
+
+# Transliterating a batch (list, file, generator, ...) of texts in one of the schemes "Hawar", "Simple" or "Feryad"
+def Ar2LaBatch(texts, scheme="Hawar"):
+    for text in texts:
+        yield ar2la_words(text, scheme)
+
+# ===== word-level Arabic to Latin engine =====
+# replacements of each scheme after Phonemes2Hawar, fused into a single translate table
+ar2la_tables = {
+    "Hawar": {},
+    "Simple": str.maketrans({"ḧ": "h", "ř": "r", "ł": "l", "ẍ": "x"}),
+    "Feryad": str.maketrans({"ˈ": "", "ř": "ṟ", "ł": "ḻ", "ħ": "ẖ", "ẍ": "x̱", "ƹ": "‛", "ʔ": ""}),
+}
+
+# final Latin form of each Kurdish word, e.g. ("Simple", "ڕەش", True) => ("reş", "ş", "eş"); LRU of ar2la_history_size
+ar2la_history = OrderedDict()
+ar2la_history_size = 1 << 18
+ar2la_tokens = compile_pattern(f"[{ku}]+|[^{ku}]+", re)
+word_char = compile_pattern(r"\w", re)
+
+# Same as Phonemes2Hawar(KurdishG2P(text, backMergeConjunction=False)) with the scheme's replacements,
+# but each word is converted once and then looked up from ar2la_history (the other tokens are not cached)
+def ar2la_words(text, scheme, aligned=False):
+    table = ar2la_tables[scheme]
+    if aligned:
+        text, offsets = G2P_prepare_aligned(text)
+        local = array("i")
+        position = 0
+    else:
+        text = G2P_prepare(text)
+    tokens = ar2la_tokens.findall(text)
+    if tokens and tokens[-1][0] not in ku:
+        tokens[-1] = tokens[-1].rstrip()
+        if not tokens[-1]:
+            tokens.pop()
+    sb = []
+    phonemeTail = None  # last characters of the G2P output (None at the beginning)
+    hawarTail = ""      # last character of the G2P output without "ˈ"
+    for token in tokens:
+        # glottal stop is dropped at the beginning of text and after non-word characters
+        initial = not word_char.match(hawarTail)
+        word = token[0] in ku and token != "و"
+        key = (scheme, token, initial) if word else None
+        cached = ar2la_history.get(key) if word else None
+        if cached is not None:
+            ar2la_history.move_to_end(key)
+            latin, hawarLast, phonemeLast = cached
+        else:
+            phonemes = word_G2P(token, True) if word else token
+            if "و" in phonemes:
+                # conjunction و depends on the preceding text, so it is not cached
+                context = "" if phonemeTail is None else phonemeTail
+                phonemes = conjunction_start.sub(r"\1ˈwe", context + phonemes)[len(context):]
+                phonemes = phonemes.replace("و", "û")
+                key = None
+            hawar = Phonemes2Hawar(("" if initial else "a") + phonemes)[0 if initial else 1:]
+            latin, hawarLast, phonemeLast = hawar.translate(table), phonemes.replace("ˈ", "")[-1:], phonemes[-2:]
+            if key:
+                ar2la_history[key] = (latin, hawarLast, phonemeLast)
+                if len(ar2la_history) > ar2la_history_size:
+                    ar2la_history.popitem(last=False)
+        sb.append(latin)
+        if aligned:
+            spread(local, position, position + len(token), len(latin))
+            position += len(token)
+        if hawarLast:
+            hawarTail = hawarLast
+        if phonemeLast:
+            phonemeTail = ((phonemeTail or "") + phonemeLast)[-2:]
+    if aligned:
+        local.append(len(text))
+        return ''.join(sb), compose(offsets, local)
+    return ''.join(sb)
 
 path = os.path.dirname(__file__) 
+# replace list of a resource file (pattern,replacement lines after a header)
+def load_phoneme_replaces(file, suffix=""):
+    output = []
+    with open(os.path.join(path, file), 'r', encoding="utf-8") as f:
+        items = f.readlines()
+    for i in range(1, len(items)):
+        item = items[i].strip().split(',')
+        output += [item[0], item[1] + suffix]
+    return output
+
+phoneme_replaces = {}
+
+def phoneme_replace_list(name):
+    if name not in phoneme_replaces:
+        if name == "IPA":
+            phoneme_replaces[name] = load_phoneme_replaces("resources/Phoneme2IPA.csv")
+        else:
+            phoneme_replaces[name] = load_phoneme_replaces("resources/Phoneme2Ascii.csv", '▪')
+    return phoneme_replaces[name]
+
 # Converts the output of the G2P into IPA (e.g. ˈdeˈçê→da.t͡ʃɛ)
 def Phonemes2IPA(text):
-    text = re.sub(r'^ˈ', '', text)
-    text = re.sub(r'(?<=\W)ˈ', '', text)
-    text = re.sub(r'ˈ', '·', text) #middle dot
-    
-    with open(os.path.join(path, "resources/Phoneme2IPA.csv"), 'r', encoding="utf-8") as file:
-        Phoneme2IPA = file.readlines()
-
-    for i in range(1, len(Phoneme2IPA)):
-        item = Phoneme2IPA[i].strip().split(',')
-        text = re.sub(item[0], item[1], text)
-    return text
+    text = initial_syllable_mark.sub('', text)
+    text = word_initial_syllable_mark.sub('', text)
+    text = text.replace('ˈ', '·') #middle dot
+    return translate_by_list(text, phoneme_replace_list("IPA"), re)
 
 # Converts the output of the G2P into Hawar (e.g. ˈʔeˈłêm→ełêm)
 def Phonemes2Hawar(text):
     text = text.replace("ˈ", "")
-    text = re.sub(r'(^ʔ|(?<=\W)ʔ)', '', text)
-    text = re.sub(r'[ʔƹ]', '’', text)
+    text = initial_glottal_stop.sub('', text)
+    text = glottal_stops.sub('’', text)
     return text
 
 # Converts the output of the G2P into Jira's ASCII format (e.g. ˈdeˈçim→D▪A▪CH▪M)
 def Phonemes2ASCII(text):
-    text = re.sub(r'[iˈ]', '', text)
-    
-    with open(os.path.join(path, "resources/Phoneme2Ascii.csv"), 'r', encoding="utf-8") as file:
-        Phoneme2Ascii = file.readlines()
-
-    for i in range(1, len(Phoneme2Ascii)):
-        item = Phoneme2Ascii[i].strip().split(',')
-        text = re.sub(item[0], item[1] + '▪', text)
-    return text
\ No newline at end of file
+    text = i_and_marks.sub('', text)
+    return translate_by_list(text, phoneme_replace_list("ASCII"), re)
+
+initial_syllable_mark = compile_pattern(r'^ˈ', re)
+word_initial_syllable_mark = compile_pattern(r'(?<=\W)ˈ', re)
+initial_glottal_stop = compile_pattern(r'(^ʔ|(?<=\W)ʔ)', re)
+glottal_stops = compile_pattern(r'[ʔƹ]', re)
+i_and_marks = compile_pattern(r'[iˈ]', re)
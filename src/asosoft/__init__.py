@@ -2,13 +2,23 @@ __version__ = "0.1.0"
 
 from .Sort import (
     KurdishSort,
-    CustomSort
+    CustomSort,
+    KurdishSorted,
+    CustomSorted,
+    kurdish_sort_key,
+    kurdish_sort_file,
+    RegisterKurdishCollation,
+    KurdishSortedList
 )
 
-from .Number2Word import Number2Word
+from .Tokenizer import Tokenize, Detokenize
+
+from .Number2Word import Number2Word, Number2WordBatch, Number2WordTokens, Number2WordAligned
 
 from .Transliteration import (
     Ar2La,
+    Ar2LaBatch,
+    Ar2LaAligned,
     Ar2LaFeryad,
     Ar2LaSimple,
     La2Ar,
@@ -20,20 +30,37 @@ from .Transliteration import (
 
 from .Normalize import (
     Normalize,
+    NormalizeAligned,
     SeperateDigits,
+    SeperateDigitsTokens,
     NormalizePunctuations,
+    IncrementalNormalizer,
     TrimLine,
     ReplaceHtmlEntity,
     ReplaceUrlEmail,
+    CleanWebLine,
+    CleanWebLines,
     Char2CharReplacment,
     Word2WordReplacement,
+    WordReplacer,
     UnifyNumerals,    
     AliK2Unicode,
     AliWeb2Unicode,
     Dylan2Unicode,
-    Zarnegar2Unicode
+    Zarnegar2Unicode,
+    DetectKurdishEncoding,
+    AutoConvert2Unicode,
+    AutoConvert2UnicodeLines
 )
 
-from .G2P import KurdishG2P
+from .G2P import KurdishG2P, KurdishG2PTokens, KurdishG2PStream, KurdishG2PAligned, UseCompactG2PCache
+
+from .Pipeline import Pipeline
+
+from .Alignment import SourceSpan
+
+from .PoemClassifier import ClassifyKurdishPoem, PoemClassifier, PoemSession
+
+from .PoemStats import PoemCorpusStats
 
-from .PoemClassifier import ClassifyKurdishPoem
\ No newline at end of file
+from .Patterns import warmup, PatternStats, SelectPatternEngines
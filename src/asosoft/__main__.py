@@ -0,0 +1,28 @@
+# python -m asosoft serve [--socket /tmp/asosoft.sock | --host 127.0.0.1 --port 8765] [--workers 4]
+# (the benchmarks are in python -m asosoft.bench)
+
+import sys
+import argparse
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m asosoft")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="local micro-batching server of G2P, transliteration and normalization")
+    serve.add_argument("--socket", help="Unix socket path (JSON lines); otherwise localhost HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--workers", type=int, default=0, help="G2P worker processes")
+    serve.add_argument("--max-batch", type=int, default=64)
+    serve.add_argument("--max-delay", type=float, default=0.005, help="seconds to wait for a batch")
+    serve.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        from .Server import Serve
+        where = args.socket or f"http://{args.host}:{args.port}"
+        print(f"asosoft server on {where}", file=sys.stderr)
+        Serve(args.socket, args.host, args.port, args.workers, args.max_batch, args.max_delay, args.timeout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
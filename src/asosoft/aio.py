@@ -0,0 +1,171 @@
+# asyncio facade: the CPU-bound work (e.g. G2P of new words) runs on an executor, so the event loop is not blocked.
+#   await asosoft.aio.g2p(text), await asosoft.aio.number2word(text), ...
+# Identical in-flight requests are merged (concurrent callers share one computation), and so are the new G2P words:
+# a word which is being converted for one request is awaited by the others instead of being converted again.
+# The words are converted on the executor and merged into the shared word cache (G2P.history). The preparation of
+# the text and the composition of the output from the cache run on a thread (the executor, or a thread pool of the
+# runner if the executor is a process pool, which has no access to the cache), not in the event loop.
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from . import G2P
+from .G2P import KurdishG2P, G2P_words, words_G2P
+from .Normalize import Normalize
+from .Number2Word import Number2Word
+from .Transliteration import ar2la_words
+
+class AsyncRunner:
+    # executor: "thread", "process" or an Executor; maxConcurrency: jobs on the executor at the same time;
+    # timeout: seconds of each call (None = no limit)
+    def __init__(self, executor="thread", workers=None, maxConcurrency=None, timeout=None):
+        if executor == "thread":
+            executor = ThreadPoolExecutor(workers)
+        elif executor == "process":
+            executor = ProcessPoolExecutor(workers)
+        self.executor = executor
+        self.threads = None  # for the work on the word cache when the executor is a process pool
+        self.maxConcurrency = maxConcurrency
+        self.timeout = timeout
+        self.inflight = weakref.WeakKeyDictionary()    # loop => {key: task}
+        self.semaphores = weakref.WeakKeyDictionary()  # loop => Semaphore
+        self.stats = {"calls": 0, "computed": 0, "coalesced": 0, "words": 0, "coalescedWords": 0, "timeouts": 0}
+
+    def close(self):
+        self.executor.shutdown()
+        if self.threads:
+            self.threads.shutdown()
+
+    # ===== coroutines =====
+    async def g2p(self, text, convertNumbersToWord=False, backMergeConjunction=True, singleOutputPerWord=True):
+        key = ("KurdishG2P", text, convertNumbersToWord, backMergeConjunction, singleOutputPerWord)
+        async def compute():
+            await self.convert_words(await self.execute_local(G2P_words, text, convertNumbersToWord))
+            return await self.execute_local(KurdishG2P, text, convertNumbersToWord, backMergeConjunction, singleOutputPerWord)
+        return await self.call(key, compute)
+
+    async def ar2la(self, text, scheme="Hawar"):
+        async def compute():
+            await self.convert_words(await self.execute_local(G2P_words, text))
+            return await self.execute_local(ar2la_words, text, scheme)
+        return await self.call(("Ar2La", text, scheme), compute)
+
+    async def number2word(self, text):
+        return await self.call(("Number2Word", text), lambda: self.execute(Number2Word, text))
+
+    async def normalize(self, text, *args):
+        return await self.call(("Normalize", text) + args, lambda: self.execute(Normalize, text, *args))
+
+    # runs a function (text => output) on the executor, merged with the identical in-flight calls
+    async def run(self, function, *args):
+        return await self.call((function, args), lambda: self.execute(function, *args))
+
+    # ===== in-flight merging =====
+    async def call(self, key, compute):
+        self.stats["calls"] += 1
+        shared = asyncio.shield(self.shared(key, compute))
+        if self.timeout is None:
+            return await shared
+        try:
+            return await asyncio.wait_for(shared, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+
+    # the task of the key (created by compute() if there is no such task in flight)
+    def shared(self, key, compute):
+        inflight = self.loop_inflight()
+        task = inflight.get(key)
+        if task is None:
+            self.stats["computed"] += 1
+            task = inflight[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda t: inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return task
+
+    # the new words are converted on the executor in one job; the words in flight are awaited
+    async def convert_words(self, words):
+        inflight = self.loop_inflight()
+        tasks = set()
+        new = []
+        for word in dict.fromkeys(words):
+            if word in G2P.history:
+                continue
+            task = inflight.get(("word", word))
+            if task is None:
+                new.append(word)
+            else:
+                self.stats["coalescedWords"] += 1
+                tasks.add(task)
+        if new:
+            self.stats["words"] += len(new)
+            task = asyncio.ensure_future(self.execute(words_G2P, new))
+            task.add_done_callback(lambda t: self.merge_words(t, new, inflight))
+            for word in new:
+                inflight[("word", word)] = task
+            tasks.add(task)
+        if tasks:
+            await asyncio.gather(*[asyncio.shield(t) for t in tasks])
+
+    def merge_words(self, task, words, inflight):
+        if not task.cancelled() and task.exception() is None:
+            G2P.history.update(task.result())
+        for word in words:
+            inflight.pop(("word", word), None)
+
+    async def execute(self, function, *args, executor=None):
+        loop = asyncio.get_running_loop()
+        executor = executor or self.executor
+        if self.maxConcurrency is None:
+            return await loop.run_in_executor(executor, function, *args)
+        async with self.loop_semaphore():
+            return await loop.run_in_executor(executor, function, *args)
+
+    # runs a function which uses the word cache of this process on a thread
+    async def execute_local(self, function, *args):
+        if isinstance(self.executor, ProcessPoolExecutor):
+            return await self.execute(function, *args, executor=self.local_executor())
+        return await self.execute(function, *args)
+
+    def local_executor(self):
+        if self.threads is None:
+            self.threads = ThreadPoolExecutor()
+        return self.threads
+
+    def loop_inflight(self):
+        return self.inflight.setdefault(asyncio.get_running_loop(), {})
+
+    def loop_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.semaphores:
+            self.semaphores[loop] = asyncio.Semaphore(self.maxConcurrency)
+        return self.semaphores[loop]
+
+# ===== module-level coroutines (on the default runner) =====
+default_runner = None
+
+# Sets the default runner, e.g. configure("process", workers=4, maxConcurrency=8, timeout=2.0)
+def configure(executor="thread", workers=None, maxConcurrency=None, timeout=None):
+    global default_runner
+    if default_runner is not None:
+        default_runner.close()
+    default_runner = AsyncRunner(executor, workers, maxConcurrency, timeout)
+    return default_runner
+
+def get_runner():
+    if default_runner is None:
+        configure()
+    return default_runner
+
+async def g2p(text, convertNumbersToWord=False, backMergeConjunction=True, singleOutputPerWord=True):
+    return await get_runner().g2p(text, convertNumbersToWord, backMergeConjunction, singleOutputPerWord)
+
+async def ar2la(text, scheme="Hawar"):
+    return await get_runner().ar2la(text, scheme)
+
+async def number2word(text):
+    return await get_runner().number2word(text)
+
+async def normalize(text, *args):
+    return await get_runner().normalize(text, *args)
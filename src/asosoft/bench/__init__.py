@@ -0,0 +1,299 @@
+# Benchmark suite of the public asosoft functions (python -m asosoft.bench)
+# The corpora are fixed (synthetic texts with a fixed random seed, the sample texts of the library and
+# worst cases such as long و/ی runs, consonant-heavy words, long poems and legacy-font lines).
+# Each benchmark reports throughput, latency percentiles, peak memory and (for G2P) candidate counts as JSON,
+# and two reports can be compared with regression thresholds.
+
+import gc
+import json
+import time
+import random
+import platform
+import importlib
+import tracemalloc
+from functools import lru_cache
+from contextlib import contextmanager
+from .. import __version__
+from ..G2P import KurdishG2P, KurdishG2PTokens, KurdishG2PStream, KurdishG2PAligned, Generator, G2P_words
+from ..Normalize import (Normalize, NormalizeAligned, NormalizePunctuations, SeperateDigits, SeperateDigitsTokens,
+                         UnifyNumerals, TrimLine, ReplaceHtmlEntity, ReplaceUrlEmail, CleanWebLine, CleanWebLines,
+                         Char2CharReplacment, Word2WordReplacement, WordReplacer, IncrementalNormalizer, AliK2Unicode,
+                         AliWeb2Unicode, Dylan2Unicode, Zarnegar2Unicode, DetectKurdishEncoding, AutoConvert2Unicode,
+                         AutoConvert2UnicodeLines)
+from ..Number2Word import Number2Word, Number2WordBatch, Number2WordTokens, Number2WordAligned
+from ..Transliteration import (Ar2La, Ar2LaBatch, Ar2LaAligned, Ar2LaFeryad, Ar2LaSimple, La2Ar, LaDigraph2Ar,
+                               Phonemes2IPA, Phonemes2Hawar, Phonemes2ASCII)
+from ..Tokenizer import Tokenize, Detokenize
+from ..Pipeline import Pipeline
+from ..PoemClassifier import ClassifyKurdishPoem, PoemSession
+from ..Sort import KurdishSort, CustomSort, KurdishSorted, CustomSorted, KurdishSortedList, kurdish_order
+
+seed = 2024
+
+# ===== corpora =====
+sample_texts = [
+    "شەو و ڕۆژ بووین بە گرفت. درێژیی دیوارەکەی گرتن",
+    "گیرۆدەی خاڵی ڕەشتە؛ گوێت لە نەغمەی تویوورە؟",
+    "لە ساڵی 1999دا بڕی 40% لە پارەکەیان واتە $102.1 یان وەرگرت",
+    "دەقے شیَعري خـــۆش. ره‌نگه‌كاني خاك",
+    "بڵێین و بگەڕێین بۆ هەڵاڵەی سێیەمی فەلسەفە",
+    "لێکۆلێنەران بۆیان دەرکەوتووە کە دەتوانێ بۆ لەش بەکەڵک بێ",
+]
+legacy_texts = [
+    "ئاشناكردنى خويَندكار بة طوَرِانكاريية كوَمةلاَيةتييةكان",  # AliK
+    "هةر جةرةيانصکي مصذووُيي کة أوو دةدا",  # AliWeb
+    "لثكؤلثنةران بؤيان دةركةوتووة كة دةتوانث بؤ لةش بةكةصك بث",  # Dylan
+    "بلٌيٌين و بگه‌رٍيٌين بوٌ هه‌لاٌلٌه‌ى سىٌيه‌مى فه‌لسه‌فه",  # Zarnegar
+]
+latin_texts = [
+    "Gelî keç û xortên kurdan, hûn hemû bi xêr biçin",
+    "gîrodey xałî řeşte; gwêt le neẍmey tuyûre?",
+]
+digraph_texts = ["Chand shtêk bizanin", "Gelek zhin u mêr hatin"]
+poem_lines = [
+    "گەرچی تووشی ڕەنجەڕۆیی و حەسرەت و دەردم ئەمن",
+    "قەت لەدەس ئەم چەرخە سپڵە نابەزم مەردم ئەمن",
+    "من لە زنجیر و تەناف و دار و بەند باکم نییە",
+    "لەت لەتم کەن، بمکوژن، هێشتا دەڵێم کوردم ئەمن",
+]
+consonants = "بپتجچحخدرڕزژسشعغفڤقکگلڵمنه"
+words = sorted({w for text in sample_texts + poem_lines for w in G2P_words(text)})
+
+# Returns the fixed corpora; quick: smaller corpora (e.g. for tests)
+def corpora(quick=False):
+    rng = random.Random(seed)
+    size = 50 if quick else 1000
+    sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(5, 25))) for _ in range(size)]
+    return {
+        "words": [rng.choice(words) for _ in range(size)],
+        "sentences": sentences,
+        "samples": sample_texts * (size // 50 or 1),
+        # worst cases
+        "waw_ye_runs": [rng.choice(["ب", "د", "ک", ""]) + "".join(rng.choice("وی") for _ in range(rng.randint(4, 12)))
+                        + rng.choice(["ن", "ت", ""]) for _ in range(size // 5 or 1)],
+        "consonant_heavy": ["".join(rng.choice(consonants) for _ in range(rng.randint(6, 14))) for _ in range(size // 5 or 1)],
+        "long_poem": ["\n".join(rng.choice(poem_lines) for _ in range(40 if quick else 200)) for _ in range(2 if quick else 10)],
+        "legacy_font": [" ".join(rng.choice(legacy_texts) for _ in range(rng.randint(1, 6))) for _ in range(size)],
+        "latin": [" ".join(rng.choice(latin_texts) for _ in range(rng.randint(1, 4))) for _ in range(size)],
+        "numbers": [str(rng.randint(0, 10 ** rng.randint(1, 12))) for _ in range(size)],
+        "web": [rng.choice(["&quot;", "", "info@asosoft.com ", "https://asosoft.com/a?b=1 "]) + s for s in sentences],
+        "phonemes": [KurdishG2P(s) for s in sentences[:size // 5 or 1]],
+        "tokens": [Tokenize(s) for s in sentences],
+        "sample_tokens": [Tokenize(s) for s in sample_texts * (size // 50 or 1)],
+        "digraphs": [" ".join(rng.choice(digraph_texts) for _ in range(rng.randint(1, 4))) for _ in range(size)],
+    }
+
+word_replacer = WordReplacer({"ئەمن": "من", "شەو": "شەوی", "ڕۆژ و شەو": "شەو و ڕۆژ"})
+web_pipeline = Pipeline(["ReplaceHtmlEntity", "ReplaceUrlEmail", "Normalize", "SeperateDigits",
+                         ("NormalizePunctuations", False), "TrimLine"])
+legacy_codepage = {"ة": "ە", "ى": "ی", "ك": "ک"}
+
+# name: (function of one input, corpus); "all:" before the corpus name: the whole corpus is one input
+benchmarks = {
+    "KurdishG2P/sentences": (KurdishG2P, "sentences"),
+    "KurdishG2P/waw_ye_runs": (KurdishG2P, "waw_ye_runs"),
+    "KurdishG2P/consonant_heavy": (KurdishG2P, "consonant_heavy"),
+    "KurdishG2P/numbers": (lambda text: KurdishG2P(text, True), "samples"),
+    "KurdishG2PTokens/tokens": (KurdishG2PTokens, "tokens"),
+    "KurdishG2PStream/sentences": (lambda text: "".join(KurdishG2PStream().stream(text[i:i + 16] for i in range(0, len(text), 16))), "sentences"),
+    "KurdishG2PAligned/sentences": (KurdishG2PAligned, "sentences"),
+    "Ar2La/sentences": (Ar2La, "sentences"),
+    "Ar2LaBatch/sentences": (lambda texts: list(Ar2LaBatch(texts)), "all:sentences"),
+    "Ar2LaAligned/sentences": (Ar2LaAligned, "sentences"),
+    "Ar2LaFeryad/sentences": (Ar2LaFeryad, "sentences"),
+    "Ar2LaSimple/sentences": (Ar2LaSimple, "sentences"),
+    "La2Ar/latin": (La2Ar, "latin"),
+    "LaDigraph2Ar/digraphs": (LaDigraph2Ar, "digraphs"),
+    "Phonemes2IPA/phonemes": (Phonemes2IPA, "phonemes"),
+    "Phonemes2Hawar/phonemes": (Phonemes2Hawar, "phonemes"),
+    "Phonemes2ASCII/phonemes": (Phonemes2ASCII, "phonemes"),
+    "Normalize/samples": (Normalize, "samples"),
+    "Normalize/legacy_font": (Normalize, "legacy_font"),
+    "NormalizeAligned/samples": (NormalizeAligned, "samples"),
+    "IncrementalNormalizer/samples": (lambda text: IncrementalNormalizer(text).edit(0, 0, "و "), "samples"),
+    "NormalizePunctuations/samples": (lambda text: NormalizePunctuations(text, False), "samples"),
+    "SeperateDigits/samples": (SeperateDigits, "samples"),
+    "SeperateDigitsTokens/sample_tokens": (SeperateDigitsTokens, "sample_tokens"),
+    "UnifyNumerals/samples": (lambda text: UnifyNumerals(text, "en"), "samples"),
+    "TrimLine/web": (TrimLine, "web"),
+    "ReplaceHtmlEntity/web": (ReplaceHtmlEntity, "web"),
+    "ReplaceUrlEmail/web": (ReplaceUrlEmail, "web"),
+    "CleanWebLine/web": (CleanWebLine, "web"),
+    "CleanWebLines/web": (lambda lines: list(CleanWebLines(lines)), "all:web"),
+    "Pipeline/web": (web_pipeline, "web"),
+    "Tokenize/sentences": (Tokenize, "sentences"),
+    "Detokenize/tokens": (Detokenize, "tokens"),
+    "Char2CharReplacment/legacy_font": (lambda text: Char2CharReplacment(text, legacy_codepage), "legacy_font"),
+    "Word2WordReplacement/sentences": (lambda text: Word2WordReplacement(text, {"ئەمن": "من", "شەو": "شەوی"}), "sentences"),
+    "WordReplacer/sentences": (word_replacer.replace, "sentences"),
+    "AliK2Unicode/legacy_font": (AliK2Unicode, "legacy_font"),
+    "AliWeb2Unicode/legacy_font": (AliWeb2Unicode, "legacy_font"),
+    "Dylan2Unicode/legacy_font": (Dylan2Unicode, "legacy_font"),
+    "Zarnegar2Unicode/legacy_font": (Zarnegar2Unicode, "legacy_font"),
+    "DetectKurdishEncoding/legacy_font": (DetectKurdishEncoding, "legacy_font"),
+    "AutoConvert2Unicode/legacy_font": (AutoConvert2Unicode, "legacy_font"),
+    "AutoConvert2UnicodeLines/legacy_font": (lambda lines: list(AutoConvert2UnicodeLines(lines)), "all:legacy_font"),
+    "Number2Word/numbers": (Number2Word, "numbers"),
+    "Number2Word/samples": (Number2Word, "samples"),
+    "Number2WordBatch/numbers": (lambda numbers: list(Number2WordBatch(numbers)), "all:numbers"),
+    "Number2WordTokens/sample_tokens": (Number2WordTokens, "sample_tokens"),
+    "Number2WordAligned/samples": (Number2WordAligned, "samples"),
+    "ClassifyKurdishPoem/long_poem": (ClassifyKurdishPoem, "long_poem"),
+    "PoemSession/long_poem": (lambda poem: PoemSession(poem).result().details, "long_poem"),
+    "KurdishSort/words": (lambda items: KurdishSort(list(items)), "all:words"),
+    "CustomSort/words": (lambda items: CustomSort(list(items), kurdish_order), "all:words"),
+    "KurdishSorted/words": (KurdishSorted, "all:words"),
+    "CustomSorted/words": (lambda items: CustomSorted(items, kurdish_order), "all:words"),
+    "KurdishSortedList/words": (KurdishSortedList, "all:words"),
+}
+
+# ===== running =====
+# Runs the benchmarks (all, or the names which start with one of `only`) and returns the report (a dict)
+def RunBenchmarks(only=None, repeat=3, quick=False, progress=None):
+    with empty_caches():
+        texts = corpora(quick)
+        results = {}
+        for name, (function, corpus) in benchmarks.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            inputs = [texts[corpus[4:]]] if corpus.startswith("all:") else texts[corpus]
+            results[name] = run_benchmark(function, inputs, repeat)
+            if name.startswith("KurdishG2P/"):
+                results[name]["g2pCandidates"] = candidate_counts(inputs)
+            if progress:
+                progress(name, results[name])
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "repeat": repeat,
+        "results": results,
+    }
+
+# caches of the library (module, name, a new empty cache like the old one)
+library_caches = [
+    ("G2P", "history", lambda old: type(old)()),
+    ("G2P", "char_units", lambda old: {}),
+    ("Transliteration", "ar2la_history", lambda old: type(old)()),
+    ("Transliteration", "phoneme_replaces", lambda old: {}),
+    ("CharTranslation", "compiled_lists", lambda old: {}),
+    ("Number2Word", "integer_name", lambda old: lru_cache(old.cache_info().maxsize)(old.__wrapped__)),
+    ("Sort", "sort_keys", lambda old: {}),
+    ("PoemClassifier", "classifier", lambda old: None),
+]
+
+# Runs with new empty caches (so each benchmark starts cold, whatever ran before it) and restores the caches
+# of the process afterwards; the library should not be used by other threads meanwhile
+@contextmanager
+def empty_caches():
+    saved = []
+    try:
+        for name, attribute, empty in library_caches:
+            module = importlib.import_module(".." + name, __name__)
+            saved.append((module, attribute, getattr(module, attribute)))
+            setattr(module, attribute, empty(saved[-1][2]))
+        yield
+    finally:
+        for module, attribute, old in saved:
+            setattr(module, attribute, old)
+
+def run_benchmark(function, inputs, repeat):
+    with empty_caches():
+        return measure(function, inputs, repeat)
+
+def measure(function, inputs, repeat):
+    chars = sum(len(x) if isinstance(x, str) else sum(len(w) for w in x) for x in inputs)
+    # the first pass fills the caches (e.g. the G2P history)
+    start = time.perf_counter()
+    for x in inputs:
+        function(x)
+    cold = time.perf_counter() - start
+
+    latencies = []
+    total = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        times = []
+        start = time.perf_counter()
+        for x in inputs:
+            t = time.perf_counter()
+            function(x)
+            times.append(time.perf_counter() - t)
+        total = min(total, time.perf_counter() - start)
+        latencies += times
+
+    tracemalloc.start()
+    for x in inputs:
+        function(x)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "items": len(inputs),
+        "chars": chars,
+        "coldSeconds": cold,
+        "seconds": total,
+        "itemsPerSecond": len(inputs) / total if total > 0 else 0.0,
+        "charsPerSecond": chars / total if total > 0 else 0.0,
+        "latency": percentiles(latencies, (50, 90, 99, 100)),
+        "peakMemory": peak,
+    }
+
+# latency percentiles (in microseconds), e.g. {"p50": 12.1, "p90": ..., "p100": ...}
+def percentiles(values, points):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {f"p{p}": values[min(len(values) - 1, int(len(values) * p / 100))] * 1e6 for p in points}
+
+# number of G2P candidates (before EVAL) of the distinct words
+def candidate_counts(texts):
+    counts = [len(Generator(w)) for w in {w for text in texts for w in G2P_words(text)}]
+    if not counts:
+        return {}
+    return {"words": len(counts), "mean": sum(counts) / len(counts), "max": max(counts), "total": sum(counts)}
+
+# ===== comparing =====
+# Compares two reports; a benchmark regresses if its throughput drops (or its p50 latency or peak memory
+# grows) more than its threshold (a fraction, e.g. 0.1 = 10%), or if it is missing in the new report.
+# thresholds: {name prefix: threshold}; the longest matching prefix is used
+def CompareBenchmarks(base, new, threshold=0.1, thresholds=None):
+    thresholds = thresholds or {}
+    comparison = {}
+    for name, b in base["results"].items():
+        prefixes = [prefix for prefix in thresholds if name.startswith(prefix)]
+        limit = thresholds[max(prefixes, key=len)] if prefixes else threshold
+        n = new["results"].get(name)
+        if n is None:
+            comparison[name] = {"changes": {}, "threshold": limit, "regressions": ["missing"]}
+            continue
+        changes = {
+            "itemsPerSecond": ratio(n["itemsPerSecond"], b["itemsPerSecond"]),
+            "p50": ratio(n["latency"].get("p50", 0), b["latency"].get("p50", 0)),
+            "peakMemory": ratio(n["peakMemory"], b["peakMemory"]),
+        }
+        regressions = []
+        if changes["itemsPerSecond"] < 1 - limit:
+            regressions.append("itemsPerSecond")
+        for metric in ("p50", "peakMemory"):
+            if changes[metric] > 1 + limit:
+                regressions.append(metric)
+        comparison[name] = {"changes": changes, "threshold": limit, "regressions": regressions}
+    return comparison
+
+def ratio(new, base):
+    if base == 0:
+        return 1.0 if new == 0 else float("inf")
+    return new / base
+
+def regressed(comparison):
+    return sorted(name for name, c in comparison.items() if c["regressions"])
+
+def save_report(report, file):
+    with open(file, 'w', encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def load_report(file):
+    with open(file, 'r', encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,61 @@
+# python -m asosoft.bench run [-o report.json] [--only KurdishG2P Normalize] [--repeat 3] [--quick]
+# python -m asosoft.bench compare base.json new.json [--threshold 0.1] [--threshold-for KurdishG2P=0.2]
+# (compare exits with code 1 if a benchmark regressed)
+# python -m asosoft.bench engines [-o src/asosoft/resources/PatternEngines.json] [--min-gain 0.2]
+
+import sys
+import json
+import argparse
+from . import RunBenchmarks, CompareBenchmarks, regressed, save_report, load_report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m asosoft.bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="runs the benchmarks and writes the JSON report")
+    run.add_argument("-o", "--output", help="report file (default: stdout)")
+    run.add_argument("--only", nargs="+", help="benchmark name prefixes, e.g. KurdishG2P Normalize/")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--quick", action="store_true", help="small corpora")
+    compare = commands.add_parser("compare", help="compares two reports")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.1, help="allowed change (0.1 = 10%%)")
+    compare.add_argument("--threshold-for", action="append", default=[], metavar="PREFIX=THRESHOLD")
+    engines = commands.add_parser("engines", help="selects the faster engine (re or regex) of each pattern")
+    engines.add_argument("-o", "--output", help="choices file (default: stdout)")
+    engines.add_argument("--min-gain", type=float, default=0.2, help="least speedup (0.2 = 20%%)")
+    engines.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == "engines":
+        from ..Patterns import SelectPatternEngines
+        choices = SelectPatternEngines(minGain=args.min_gain, repeat=args.repeat, file=args.output)
+        if args.output:
+            print(f"{len(choices)} patterns switched", file=sys.stderr)
+        else:
+            print(json.dumps(choices, ensure_ascii=False, indent=1))
+        return 0
+
+    if args.command == "run":
+        progress = lambda name, result: print(f"{name}: {result['itemsPerSecond']:.1f} items/s, "
+                                              f"p50 {result['latency']['p50']:.1f} µs", file=sys.stderr)
+        report = RunBenchmarks(args.only, args.repeat, args.quick, progress)
+        if args.output:
+            save_report(report, args.output)
+        else:
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    thresholds = {}
+    for item in args.threshold_for:
+        prefix, value = item.rsplit("=", 1)
+        thresholds[prefix] = float(value)
+    comparison = CompareBenchmarks(load_report(args.base), load_report(args.new), args.threshold, thresholds)
+    for name, c in comparison.items():
+        changes = ", ".join(f"{metric} x{value:.2f}" for metric, value in c["changes"].items())
+        mark = " REGRESSED: " + ", ".join(c["regressions"]) if c["regressions"] else ""
+        print(f"{name}: {changes}{mark}")
+    return 1 if regressed(comparison) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
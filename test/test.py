@@ -1,19 +1,83 @@
 import unittest
+import os
+import sys
+import pickle
+import sqlite3
+import tempfile
+import threading
+import json
+import asyncio
+import urllib.request
 from src.asosoft import *
+from src.asosoft.bench import RunBenchmarks, CompareBenchmarks
+from src.asosoft.Server import MicroBatcher, make_server
+from src.asosoft import aio
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class TestModule(unittest.TestCase):
     def test_KurdishG2P(self):
         self.assertEqual(KurdishG2P("شەو و ڕۆژ بووین بە گرفت. درێژیی دیوارەکەی گرتن"),
                          f"ˈşeˈwû ˈřoj ˈbûyn ˈbe ˈgiˈrift. ˈdiˈrêˈjîy ˈdîˈwaˈreˈkey ˈgirˈtin")
+    def test_KurdishG2PTokens(self):
+        tokens = Tokenize("لە ساڵی1999دا 12کەس و 5 منداڵ")
+        self.assertEqual(tokens[:5], ["لە", " ", "ساڵی", "1999", "دا"])
+        tokens = KurdishG2PTokens(Number2WordTokens(SeperateDigitsTokens(tokens)))
+        self.assertEqual(Detokenize(tokens),
+                         "ˈle ˈsaˈłî ˈheˈzaˈrû ˈnoˈseˈdû ˈneˈweˈdû ˈno ˈda ˈdwazˈde ˈkeˈsû ˈpênc ˈminˈdał")
+        text = "شەو و ڕۆژ بووین بە گرفت. درێژیی دیوارەکەی گرتن"
+        self.assertEqual(Detokenize(KurdishG2PTokens(Tokenize(text))), KurdishG2P(text))
+    def test_KurdishG2PStream(self):
+        text = "شەو و ڕۆژ بووین بە گرفت. درێژیی دیوارەکەی گرتن"
+        stream = KurdishG2PStream()
+        outputs = [stream.feed(word + " ") for word in text.split(" ")]
+        self.assertEqual(outputs[:4], ["", "", "ˈşeˈwû ", "ˈřoj "])
+        self.assertEqual("".join(outputs) + stream.finish(), KurdishG2P(text))
+        fragments = ["لە ساڵی 19", "99دا\r\n$", "5 و 2 ", "چ بکە"]
+        self.assertEqual("".join(KurdishG2PStream(True).stream(fragments)), KurdishG2P("".join(fragments), True))
+    def test_KurdishG2PAligned(self):
+        text = "لە ساڵی 1999دا"
+        output, offsets = KurdishG2PAligned(text, True)
+        self.assertEqual(output, KurdishG2P(text, True))
+        self.assertEqual(len(offsets), len(output) + 1)
+        self.assertEqual(SourceSpan(offsets, output.index("ˈhe"), len(output)), (8, 14))
+        output, offsets = Ar2LaAligned("شەو و ڕۆژ")
+        self.assertEqual((output, SourceSpan(offsets, 4, 5)), ("şew û řoj", (4, 5)))
+        output, offsets = Pipeline(["ReplaceHtmlEntity", "Normalize", "TrimLine"]).run_aligned("&quot;دەقے&quot; ")
+        self.assertEqual((output, list(offsets)), ('"دەقی"', [0, 6, 7, 8, 9, 10, 17]))
+    def test_UseCompactG2PCache(self):
+        text = "شەو و ڕۆژ بووین بە گرفت. درێژیی دیوارەکەی گرتن"
+        expected = KurdishG2P(text, singleOutputPerWord=False)
+        try:
+            history = UseCompactG2PCache()
+            self.assertEqual(history["درێژیی"], "ˈdiˈrêˈjîy¶ˈdiˈrêˈjiˈyî¶ˈdiˈrêˈjyî¶ˈdiˈrêjˈyî")
+            history.clear()
+            self.assertEqual(KurdishG2P(text, singleOutputPerWord=False), expected)
+            history["ab?"] = "ئاب"  # characters out of the symbol tables
+            self.assertEqual(history.pop("ab?"), "ئاب")
+            self.assertNotIn("ab?", history)
+            for i in range(20000):  # the bytes of the changed entries are reclaimed
+                history["ئاب"] = "ˈaˈb" * (i % 3 + 1)
+            self.assertLess(len(history.arena), 1 << 17)
+        finally:
+            UseCompactG2PCache(False)
     def test_Ar2La(self):
         self.assertEqual(Ar2La("گیرۆدەی خاڵی ڕەشتە؛ گوێت لە نەغمەی تویوورە؟"),
                          f"gîrodey xałî řeşte; gwêt le neẍmey tuyûre?")
+        from src.asosoft.Transliteration import ar2la_history
+        self.assertEqual(Ar2La("$12.5 (ref#3) شەو"), "$12.5 (ref#3) şew")
+        self.assertNotIn(("Hawar", "$12.5 (ref#3) ", True), ar2la_history)  # only the Kurdish words are cached
     def test_Ar2LaFeryad(self):
         self.assertEqual(Ar2LaFeryad("گیرۆدەی خاڵی ڕەشتە؛ گوێت لە نەغمەی تویوورە؟"),
                          f"gîrodey xaḻî ṟeşte; gwêt le nex̱mey tuyûre?")
     def test_Ar2LaSimple(self):
         self.assertEqual(Ar2LaSimple("گیرۆدەی خاڵی ڕەشتە؛ گوێت لە نەغمەی تویوورە؟"),
                          "gîrodey xalî reşte; gwêt le nexmey tuyûre?")
+    def test_Ar2LaBatch(self):
+        self.assertEqual(list(Ar2LaBatch(["گیرۆدەی خاڵی ڕەشتە؛", "گوێت لە نەغمەی تویوورە؟"], "Simple")),
+                         ["gîrodey xalî reşte;", "gwêt le nexmey tuyûre?"])
     def test_La2Ar(self):
         self.assertEqual(La2Ar("Gelî keç û xortên kurdan, hûn hemû bi xêr biçin"),
                          "گەلی کەچ و خۆرتێن کوردان، هوون هەموو ب خێر بچن")
@@ -36,14 +100,52 @@ class TestModule(unittest.TestCase):
     def test_Zarnegar2Unicode(self):
         self.assertEqual(Zarnegar2Unicode("بلٌيٌين و بگه‌رٍيٌين بوٌ هه‌لاٌلٌه‌ى سىٌيه‌مى فه‌لسه‌فه"),
                          "بڵێین و بگەڕێین بۆ هەڵاڵەی سێیەمی فەلسەفە")
+    def test_DetectKurdishEncoding(self):
+        self.assertEqual(DetectKurdishEncoding("هةر جةرةيانصکي مصذووُيي کة أوو دةدا")[0], "AliWeb")
+        self.assertEqual(DetectKurdishEncoding("بلٌيٌين و بگه‌رٍيٌين بوٌ هه‌لاٌلٌه‌ى سىٌيه‌مى فه‌لسه‌فه")[0], "Zarnegar")
+        self.assertEqual(DetectKurdishEncoding("بڵێین و بگەڕێین بۆ هەڵاڵەی سێیەمی فەلسەفە")[0], "Unicode")
+    def test_AutoConvert2Unicode(self):
+        self.assertEqual(AutoConvert2Unicode("ئاشناكردنى خويَندكار بة طوَرِانكاريية كوَمةلاَيةتييةكان"),
+                         "ئاشناکردنی خوێندکار بە گۆڕانکارییە کۆمەڵایەتییەکان")
+        self.assertEqual("".join(AutoConvert2UnicodeLines(["لثكؤلثنةران بؤيان\n", "دةركةوتووة كة دةتوانث بؤ لةش بةكةصك بث"])),
+                         "لێکۆلێنەران بۆیان\nدەرکەوتووە کە دەتوانێ بۆ لەش بەکەڵک بێ")
     def test_NormalizePunctuations(self):
         self.assertEqual(NormalizePunctuations("دەقی«کوردی » و ڕێنووس ،((خاڵبەندی )) چۆنە ؟", False),
                          "دەقی «کوردی» و ڕێنووس، «خاڵبەندی» چۆنە؟")
+    def test_IncrementalNormalizer(self):
+        normalizer = IncrementalNormalizer("دەقے شیَعري خـــۆش.\nره‌نگه‌كاني خاك")
+        self.assertEqual(normalizer.text, "دەقی شێعری خۆش.\nڕەنگەکانی خاک")
+        previous = normalizer.text
+        start, end, text = normalizer.edit(20, 20, "هەموو ")
+        self.assertEqual(previous[:start] + text + previous[end:], normalizer.text)
+        self.assertEqual(normalizer.text, NormalizePunctuations(Normalize(normalizer.source), False))
+        self.assertEqual(normalizer.text, "دەقی شێعری خۆش.\nهەموو ڕەنگەکانی خاک")
+        self.assertEqual((normalizer.line_at(20), normalizer.source_offset(1), normalizer.output_offset(1)), ((1, 20), 20, 16))
     def test_TrimLine(self):
         self.assertEqual(TrimLine("   دەق\u200c  "), "دەق")
     def test_ReplaceHtmlEntity(self):
         self.assertEqual(ReplaceHtmlEntity("ئێوە &quot;دەق&quot; بە زمانی &lt;کوردی&gt; دەنووسن"),
                          'ئێوە "دەق" بە زمانی <کوردی> دەنووسن')
+    def test_CleanWebLine(self):
+        lines = ["  بۆ زانیاری: info@asosoft.com &amp; https://asosoft.com/ku\u200c ", "ئاسایی", "", "&commat;a.b\u200b"]
+        self.assertEqual(CleanWebLine(lines[0]), "بۆ زانیاری: EmailAddress & URL")
+        self.assertEqual(list(CleanWebLines("\n".join(lines))), [TrimLine(ReplaceUrlEmail(ReplaceHtmlEntity(line))) for line in lines])
+    def test_Pipeline(self):
+        texts = ["&quot;دەقے&quot; شیَعري خـــۆش،ره‌نگه‌كاني خاك ١٢کەس  ", "info@asosoft.com  ساڵی1950  "]
+        pipeline = Pipeline(["ReplaceHtmlEntity", "ReplaceUrlEmail", "Normalize", "SeperateDigits",
+                             ("NormalizePunctuations", False), "TrimLine", ("UnifyNumerals", "en")])
+        expected = [UnifyNumerals(TrimLine(NormalizePunctuations(SeperateDigits(Normalize(ReplaceUrlEmail(ReplaceHtmlEntity(t)))), False)), "en")
+                    for t in texts]
+        self.assertEqual(expected[0], '"دەقی" شێعری خۆش، ڕەنگەکانی خاک 12 کەس')
+        self.assertEqual(list(pipeline.map(texts)), expected)
+        self.assertEqual(list(pickle.loads(pickle.dumps(pipeline)).map_parallel(texts, workers=2)), expected)
+        with tempfile.TemporaryDirectory() as folder:
+            src, dst = os.path.join(folder, "src.txt"), os.path.join(folder, "dst.txt")
+            with open(src, 'w', encoding="utf-8") as f:
+                f.write("\n".join(texts) + "\n")
+            self.assertEqual(pipeline.run_file(src, dst), 2)
+            with open(dst, 'r', encoding="utf-8") as f:
+                self.assertEqual(f.read().splitlines(), expected)
     def test_UnifyNumerals(self):
         self.assertEqual(UnifyNumerals("ژمارەکانی ٤٥٦ و ۴۵۶ و 456", "en"),
                          "ژمارەکانی 456 و 456 و 456")
@@ -54,22 +156,197 @@ class TestModule(unittest.TestCase):
         self.assertEqual(Word2WordReplacement("مال، نووری مالیکی", {"مال": "ماڵ", "سلاو": "سڵاو"}),
                          "ماڵ، نووری مالیکی")
 
+    def test_WordReplacer(self):
+        replacer = WordReplacer({"مال": "ماڵ", "نووری": "نوری", "نووری مالیکی": "نوری مالکی"})
+        self.assertEqual(replacer.replace("مال، نووری مالیکی و نووری"), "ماڵ، نوری مالکی و نوری")
+        with tempfile.TemporaryDirectory() as folder:
+            file = os.path.join(folder, "replacements.tsv")
+            with open(file, 'w', encoding="utf-8") as f:
+                f.write("مال\tماڵ\nسلاو\tسڵاو\n")
+            replacer = WordReplacer.from_tsv(file)
+        self.assertEqual(list(replacer.replace_batch(["مال، نووری مالیکی", "سلاو"])), ["ماڵ، نووری مالیکی", "سڵاو"])
+        self.assertEqual(Word2WordReplacement("مال، نووری مالیکی", replacer), "ماڵ، نووری مالیکی")
+
     def test_Numeral_converter(self):
         self.assertEqual(Number2Word("لە ساڵی 1999دا بڕی 40% لە پارەکەیان واتە $102.1یان وەرگرت"),
                          "لە ساڵی هەزار و نۆسەد و نەوەد و نۆدا بڕی چل لە سەد لە پارەکەیان واتە سەد و دوو پۆینت یەک دۆلاریان وەرگرت")
     
+    def test_Number2WordBatch(self):
+        self.assertEqual(list(Number2WordBatch([2024, "12.05", "-3", "١٠٠٠"])),
+                         ["دوو هەزار و بیست و چوار", "دوازدە پۆینت  سفر پێنج", "ناقس سێ", "هەزار"])
+
     def test_KurdishSort(self):
         self.assertEqual(KurdishSort(["یەک", "ڕەنگ", "ئەو", "ئاو", "ڤەژین", "فڵان"]),
                         ["ئاو", "ئەو", "ڕەنگ", "فڵان", "ڤەژین", "یەک"])
     def test_CustomSort(self):
         self.assertEqual(CustomSort(["یەک", "ڕەنگ", "ئەو", "ئاو", "ڤەژین", "فڵان"], list("ئءاآأإبپتثجچحخدڎڊذرڕزژسشصضطظعغفڤقكکگڴلڵمنوۆۊۉۋهھەیێ")),
                         ["ئاو", "ئەو", "ڕەنگ", "فڵان", "ڤەژین", "یەک"])
+    def test_KurdishSorted(self):
+        words = ["یەک", "ڕەنگ", "ئەو", "ئاو", "ڤەژین", "فڵان"]
+        self.assertEqual(KurdishSorted(words, cacheKeys=True),
+                        ["ئاو", "ئەو", "ڕەنگ", "فڵان", "ڤەژین", "یەک"])
+        self.assertEqual(words, ["یەک", "ڕەنگ", "ئەو", "ئاو", "ڤەژین", "فڵان"])
+        keys = {}
+        self.assertEqual(KurdishSorted(words, True, keys), KurdishSorted(words, True))
+        self.assertEqual(len(keys), len(words))
+    def test_CustomSorted(self):
+        self.assertEqual(CustomSorted(["لاک", "لک", "لب"], ["ب", "لا", "ل", "ک"]),
+                        ["لاک", "لب", "لک"])
+    def test_kurdish_sort_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            src, dst = os.path.join(folder, "src.txt"), os.path.join(folder, "dst.txt")
+            with open(src, 'w', encoding="utf-8") as f:
+                f.write("یەک\nڕەنگ\nئەو\nئاو\nئەو\nفڵان\n")
+            kurdish_sort_file(src, dst, memory_limit=200, count=True)
+            with open(dst, 'r', encoding="utf-8") as f:
+                self.assertEqual(f.read(), "ئاو\t1\nئەو\t2\nڕەنگ\t1\nفڵان\t1\nیەک\t1\n")
+    def test_RegisterKurdishCollation(self):
+        connection = sqlite3.connect(":memory:")
+        RegisterKurdishCollation(connection)
+        connection.execute("CREATE TABLE lexicon (word TEXT)")
+        connection.executemany("INSERT INTO lexicon VALUES (?)", [(w,) for w in ["یەک", "ڕەنگ", "ئەو", "ئاو", "ڤەژین", "فڵان"]])
+        self.assertEqual([row[0] for row in connection.execute("SELECT word FROM lexicon ORDER BY word COLLATE KURDISH")],
+                        ["ئاو", "ئەو", "ڕەنگ", "فڵان", "ڤەژین", "یەک"])
+    def test_KurdishSortedList(self):
+        words = KurdishSortedList(["یەک", "ڕەنگ", "ئەو", "ئاو", "ڤەژین"])
+        words.add("ڕەش")
+        self.assertEqual(words.prefix("ڕە"), ["ڕەش", "ڕەنگ"])
+        custom = KurdishSortedList(["لب", "بل", "لاک", "لا", "ل", "بلا"], ["لا", "ب", "ل", "ک"])
+        self.assertEqual(custom.prefix("ل"), ["لا", "لاک", "ل", "لب"])
+        self.assertEqual(words.irange("ئەو", "ڤەژین"), ["ئەو", "ڕەش", "ڕەنگ"])
     
     def test_Poem_Meter_Classifier(self):
         poem = f"گەرچی تووشی ڕەنجەڕۆیی و حەسرەت و دەردم ئەمن\nقەت لەدەس ئەم چەرخە سپڵە نابەزم مەردم ئەمن\nمن لە زنجیر و تەناف و دار و بەند باکم نییە\nلەت لەتم کەن، بمکوژن، هێشتا دەڵێم کوردم ئەمن"
         classified = ClassifyKurdishPoem(poem)
         self.assertEqual(classified.overalMeterType, "Quantitative/عەرووزی")
         self.assertEqual(classified.overalPattern, "فاعلاتن فاعلاتن فاعلاتن فاعلن")
+        from src.asosoft.PoemClassifier import patternScores
+        self.assertEqual(max(patternScores) / 4 / 4 * 100, classified.quantitativeConfidence)
+
+    def test_PoemClassifier(self):
+        poem = f"گەرچی تووشی ڕەنجەڕۆیی و حەسرەت و دەردم ئەمن\nقەت لەدەس ئەم چەرخە سپڵە نابەزم مەردم ئەمن\nمن لە زنجیر و تەناف و دار و بەند باکم نییە\nلەت لەتم کەن، بمکوژن، هێشتا دەڵێم کوردم ئەمن"
+        classifier = PoemClassifier()
+        expected = classifier.classify(poem)
+        for classified in classifier.classify_many([poem, poem], workers=2):
+            self.assertEqual(classified.overalPattern, "فاعلاتن فاعلاتن فاعلاتن فاعلن")
+            self.assertEqual(classified.quantitativeConfidence, expected.quantitativeConfidence)
+            self.assertEqual([d.scanned for d in classified.details], [d.scanned for d in expected.details])
+        module = sys.modules["src.asosoft.PoemClassifier"]
+        size, module.scans_size = module.scans_size, 2
+        try:  # the scans are an LRU
+            classifier = PoemClassifier()
+            self.assertEqual(classifier.classify(poem).overalPattern, expected.overalPattern)
+            self.assertEqual(len(classifier.scans), 2)
+        finally:
+            module.scans_size = size
+
+    def test_PoemSession(self):
+        lines = ["گەرچی تووشی ڕەنجەڕۆیی و حەسرەت و دەردم ئەمن", "قەت لەدەس ئەم چەرخە سپڵە نابەزم مەردم ئەمن", "من لە زنجیر و تەناف و دار و بەند باکم نییە"]
+        session = PoemSession()
+        session.extend(lines)
+        session.insert(0, "و")
+        session[0] = "لەت لەتم کەن، بمکوژن، هێشتا دەڵێم کوردم ئەمن"
+        del session[2]
+        expected = ClassifyKurdishPoem("\n".join([session[i] for i in range(len(session))]))
+        classified = session.result()
+        self.assertEqual(classified.overalPattern, "فاعلاتن فاعلاتن فاعلاتن فاعلن")
+        self.assertEqual(classified.quantitativeConfidence, expected.quantitativeConfidence)
+        self.assertEqual([d.scanned for d in classified.details], [d.scanned for d in expected.details])
+        session.insert(1, lines[2] + "\n" + lines[1])  # two lines
+        self.assertEqual((len(session), session[2]), (5, lines[1]))
+        expected = ClassifyKurdishPoem("\n".join([session[i] for i in range(len(session))]))
+        self.assertEqual(session.result().syllabicConfidence, expected.syllabicConfidence)
+
+    @unittest.skipUnless(numpy, "NumPy is not installed")
+    def test_PoemCorpusStats(self):
+        poems = [("Mehwî", "گەرچی تووشی ڕەنجەڕۆیی و حەسرەت و دەردم ئەمن\nقەت لە دەس ئەم چەرخە سپڵە ناسک و دڵ تەنگم ئەمن"),
+                 ("Hejar", "شەو و ڕۆژ بووین بە گرفت\nدرێژیی دیوارەکەی گرتن")]
+        stats = PoemCorpusStats()
+        stats.add_poems(poems * 3)
+        self.assertEqual(len(stats), 12)
+        self.assertEqual(stats.syllable_mode(), 15)
+        self.assertEqual(stats.syllable_histogram().tolist(), [0] * 7 + [3, 0, 3] + [0] * 5 + [6])
+        self.assertEqual(stats.pattern_frequencies()["فاعلاتن فاعلاتن فاعلاتن فاعلن"], 3)
+        self.assertEqual(stats.by_poem()["stdSyllables"][:2].tolist(), [0.0, 1.0])
+        byPoet = stats.by_poet()
+        self.assertEqual((byPoet["poet"], byPoet["poems"].tolist()), (["Mehwî", "Hejar"], [3, 3]))
+        self.assertEqual((len(stats.best), stats.classifier.scans), (4, {}))  # the scans are reduced to the best meters
+        other = PoemCorpusStats()
+        other.add_poem(poems[0][1], "Nalî")
+        stats.merge(other)
+        self.assertEqual(stats.report()["poets"], 3)
+
+    def test_Benchmarks(self):
+        report = RunBenchmarks(["KurdishG2P/waw_ye_runs", "Normalize/"], repeat=1, quick=True)
+        self.assertEqual(sorted(report["results"]), ["KurdishG2P/waw_ye_runs", "Normalize/legacy_font", "Normalize/samples"])
+        self.assertGreater(report["results"]["KurdishG2P/waw_ye_runs"]["g2pCandidates"]["max"], 1)
+        slower = {"results": {name: dict(result, itemsPerSecond=result["itemsPerSecond"] / 2)
+                              for name, result in report["results"].items()}}
+        self.assertEqual(CompareBenchmarks(report, report)["Normalize/samples"]["regressions"], [])
+        self.assertIn("itemsPerSecond", CompareBenchmarks(report, slower)["Normalize/samples"]["regressions"])
+        self.assertEqual(CompareBenchmarks(report, slower, thresholds={"Normalize/": 0.6})["Normalize/samples"]["regressions"], [])
+        self.assertEqual(CompareBenchmarks(report, slower, thresholds={"Normalize/samples": 0.6, "Normalize/": 0.1})["Normalize/samples"]["regressions"], [])
+        missing = {"results": {"Normalize/samples": slower["results"]["Normalize/samples"]}}
+        self.assertEqual(CompareBenchmarks(report, missing)["Normalize/legacy_font"]["regressions"], ["missing"])
+
+    def test_warmup(self):
+        from src.asosoft.Patterns import compile_pattern, registry
+        output = warmup()
+        self.assertGreater(output["patterns"], 100)
+        self.assertEqual(sum(output["engines"].values()), output["patterns"])
+        count = len(registry)
+        self.assertIs(compile_pattern("(ێ+)ۆ test_warmup"), compile_pattern("(ێ+)ۆ test_warmup"))
+        self.assertEqual(PatternStats()["patterns"], count + 1)
+        self.assertEqual(SelectPatternEngines(["ڕۆژ"], minGain=1.0, repeat=1), [])
+        self.assertIsInstance(SelectPatternEngines(minGain=1.0, repeat=1), list)  # on the benchmark corpora
+
+    def test_MicroBatcher(self):
+        batcher = MicroBatcher(maxDelay=0.05)
+        texts = ["شەو و ڕۆژ بووین بە گرفت", "لە ساڵی 1999دا"] * 10
+        futures = [batcher.submit("KurdishG2P", [text, True]) for text in texts]
+        self.assertEqual([f.result(10) for f in futures], [KurdishG2P(text, True) for text in texts])
+        self.assertEqual(batcher.call("Number2Word", {"text": "12"}, 10), "دوازدە")
+        metrics = batcher.metrics()
+        batcher.close()
+        self.assertGreater(metrics["meanBatchSize"], 1)
+        self.assertGreaterEqual(metrics["deduplicatedRequests"], 1)
+
+    def test_Server(self):
+        server = make_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        try:
+            request = urllib.request.Request(url + "Ar2La", data=json.dumps(["چاک"]).encode("utf-8"))
+            self.assertEqual(json.load(urllib.request.urlopen(request)), {"result": "çak"})
+            lines = '{"id": 1, "method": "ClassifyKurdishPoem", "params": ["گەرچی تووشی ڕەنجەڕۆیی و حەسرەت و دەردم ئەمن"]}\n'
+            lines += '{"id": 2, "method": "nope", "params": ["a"]}\n'
+            responses = urllib.request.urlopen(urllib.request.Request(url, data=lines.encode("utf-8"))).read().decode("utf-8")
+            responses = [json.loads(line) for line in responses.splitlines()]
+            self.assertEqual(responses[0]["result"]["syllabic"], 15)
+            self.assertIn("error", responses[1])
+            self.assertEqual(json.load(urllib.request.urlopen(url + "health"))["status"], "ok")
+            self.assertEqual(json.load(urllib.request.urlopen(url + "metrics"))["requests"], 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.batcher.close()
+        with tempfile.NamedTemporaryFile() as file:  # not a socket: it is not removed
+            self.assertRaises((FileExistsError, OSError), make_server, file.name)
+            self.assertTrue(os.path.exists(file.name))
+
+    def test_aio(self):
+        texts = ["شەو و ڕۆژ بووین بە گرفت", "لە ساڵی 1999دا", "شەو و ڕۆژ بووین بە گرفت"]
+        runner = aio.AsyncRunner("thread", workers=2, maxConcurrency=2, timeout=30)
+        async def main():
+            outputs = await asyncio.gather(*[runner.g2p(text, True) for text in texts])
+            return outputs, await runner.number2word("12")
+        try:
+            outputs, number = asyncio.run(main())
+        finally:
+            runner.close()
+        self.assertEqual(outputs, [KurdishG2P(text, True) for text in texts])
+        self.assertEqual(number, "دوازدە")
+        self.assertEqual(runner.stats["coalesced"], 1)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file